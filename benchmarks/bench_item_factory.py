@@ -0,0 +1,44 @@
+"""Per-Item cost of create_item compared with a reused ItemFactory
+
+Usage:
+
+    python benchmarks/bench_item_factory.py [-n 1000] [source]
+"""
+import argparse
+import time
+
+from stactools.ghcnd import stac
+
+
+def per_item_seconds(create, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        create()
+    return (time.perf_counter() - start) / count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", nargs="?", default="tests/data/1763-1764.csv")
+    parser.add_argument("-n", "--count", type=int, default=1000)
+    args = parser.parse_args()
+
+    factory = stac.ItemFactory()
+    results = {
+        "ItemFactory()": stac.ItemFactory,
+        # What every create_item call cost before the templates were shared
+        "ItemFactory().create_item": lambda: stac.ItemFactory().create_item(
+            args.source, year=1763),
+        "create_item": lambda: stac.create_item(args.source, year=1763),
+        "ItemFactory.create_item": lambda: factory.create_item(args.source,
+                                                               year=1763),
+        "ItemFactory.create_item + to_dict": lambda: factory.create_item(
+            args.source, year=1763).to_dict(),
+    }
+    for name, create in results.items():
+        seconds = per_item_seconds(create, args.count)
+        print(f"{name:40s} {seconds * 1e6:10.1f} us/item")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Benchmark suite for stactools-ghcnd
+
+Times the stages of building the GHCNd STAC Collection at several Item
+counts, against a synthetic data asset, and writes the results as JSON so
+runs of different releases can be compared.
+
+Usage:
+
+    python benchmarks/run.py --rows 100000 --items 1 100 10000 \\
+        --output bench_output.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from tempfile import TemporaryDirectory
+from typing import Any, Dict, Iterator, List
+
+import pystac
+
+import stactools.ghcnd
+from stactools.ghcnd import stac
+
+sys.path.insert(0, os.path.dirname(__file__))
+from synthetic import write_csv  # noqa: E402
+
+
+class Timer:
+    def __init__(self) -> None:
+        self.results: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def stage(self, name: str, items: int) -> Iterator[None]:
+        start = time.perf_counter()
+        yield
+        seconds = time.perf_counter() - start
+        self.results.append({
+            "stage": name,
+            "items": items,
+            "seconds": seconds,
+            "seconds_per_item": seconds / max(items, 1),
+        })
+        print(f"{name:20s} {items:8d} items {seconds:10.3f} s", flush=True)
+
+
+def run(source: str, item_counts: List[int], workers: int,
+        validate: bool) -> List[Dict[str, Any]]:
+    timer = Timer()
+    for count in item_counts:
+        with timer.stage("create_collection", count):
+            collection = stac.create_collection()
+
+        with timer.stage("create_item", count):
+            items = [stac.create_item(source) for _ in range(count)]
+
+        with timer.stage("populate", count):
+            items = stac.create_items([source] * count, workers=workers)
+        for n, item in enumerate(items):
+            item.id = f"bench-{n}"
+        collection.add_items(items)
+
+        with TemporaryDirectory() as tmp_dir:
+            with timer.stage("save", count):
+                collection.normalize_hrefs(tmp_dir)
+                collection.save(dest_href=tmp_dir)
+
+            if validate:
+                with timer.stage("validate", count):
+                    collection.validate()
+                    for item in items:
+                        item.validate()
+    return timer.results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows",
+                        type=int,
+                        default=100_000,
+                        help="Rows of the synthetic data asset")
+    parser.add_argument("--items",
+                        type=int,
+                        nargs="+",
+                        default=[1, 100, 10_000],
+                        help="Item counts to benchmark")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--no-validate", action="store_true")
+    parser.add_argument("--source",
+                        help="Existing data asset to use instead of a "
+                        "synthetic one")
+    parser.add_argument("--output", help="Path of the JSON results")
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as tmp_dir:
+        source = args.source
+        if source is None:
+            source = write_csv(os.path.join(tmp_dir, "synthetic.csv"),
+                               args.rows)
+        results = run(source, args.items, args.workers, not args.no_validate)
+
+    report = {
+        "stactools_ghcnd_version": stactools.ghcnd.__version__,
+        "pystac_version": pystac.__version__,
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "rows": None if args.source else args.rows,
+        "workers": args.workers,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""Synthetic merged GHCNd data assets for benchmarks
+
+Writes a CSV with the columns of the merged data/station table (see the
+README), sorted by station and date like the real asset. Element frequencies
+follow the real archive: nearly every station reports PRCP, most report
+temperatures and snow, few report anything else.
+
+Usage:
+
+    python benchmarks/synthetic.py -n 100000 synthetic.csv
+"""
+import argparse
+import csv
+import re
+from datetime import date
+from typing import Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from stactools.ghcnd.constants import (
+    DATA_TABLE_COLUMNS,
+    ELEMENTS_VALUES,
+    PRIMARY_GEOMETRY_COLUMN,
+    STATION_TABLE_COLUMNS,
+)
+
+CORE_ELEMENT_PROBABILITIES = {
+    "PRCP": 0.95,
+    "TMAX": 0.45,
+    "TMIN": 0.45,
+    "SNOW": 0.35,
+    "SNWD": 0.3,
+}
+OTHER_ELEMENT_PROBABILITY = 0.02
+COUNTRY_CODES = ["US", "CA", "AS", "BR", "IN", "RS", "MX", "SF", "GM", "IT"]
+Q_FLAGS = list("DGIKLMNORSTWXZ")
+S_FLAGS = list("0067ABCEFGHIKMNQRSTUWXZ")
+FIRST_ORDINAL = date(1763, 1, 1).toordinal()
+LAST_ORDINAL = date(2021, 12, 31).toordinal()
+
+COLUMNS = [c["name"] for c in DATA_TABLE_COLUMNS] + [
+    c["name"] for c in STATION_TABLE_COLUMNS if c["name"] != "ID"
+] + [PRIMARY_GEOMETRY_COLUMN["name"]]
+
+
+def element_codes() -> List[str]:
+    """Concrete element codes, with the wildcards of ELEMENTS_VALUES (e.g.
+    "WT**") replaced by a valid code"""
+    codes = []
+    for code in ELEMENTS_VALUES:
+        code = code.strip()
+        code = re.sub(r"\*#$", "32", code)
+        code = re.sub(r"\*\*$", "01", code)
+        codes.append(code)
+    return codes
+
+
+def _dates(first: int, count: int) -> np.ndarray:
+    """YYYYMMDD integers for count consecutive days from ordinal first"""
+    days = np.arange(first, first + count) - date(1970, 1, 1).toordinal()
+    dt = days.astype("datetime64[D]")
+    years = dt.astype("datetime64[Y]").astype(int) + 1970
+    months = dt.astype("datetime64[M]").astype(int) % 12 + 1
+    day_of_month = (dt - dt.astype("datetime64[M]")).astype(int) + 1
+    return years * 10000 + months * 100 + day_of_month
+
+
+def _station_frame(n: int, station_id: str, elements: List[str],
+                   first: int, days: int,
+                   rng: np.random.Generator) -> pd.DataFrame:
+    dates = np.repeat(_dates(first, days), len(elements))
+    rows = len(dates)
+    element = np.tile(np.array(elements), days)
+    value = rng.integers(-300, 400, rows)
+    value[element == "PRCP"] = rng.exponential(20,
+                                               (element == "PRCP").sum())
+    q_flag = np.where(
+        rng.random(rows) < 0.01, rng.choice(Q_FLAGS, rows), "")
+    latitude = round(float(rng.uniform(-60, 80)), 4)
+    longitude = round(float(rng.uniform(-180, 180)), 4)
+    return pd.DataFrame({
+        "ID": station_id,
+        "YEAR/MONTH/DAY": dates,
+        "ELEMENT": element,
+        "DATA VALUE": value,
+        "M-FLAG": "",
+        "Q-FLAG": q_flag,
+        "S-FLAG": rng.choice(S_FLAGS, rows),
+        "OBS-TIME": np.where(rng.random(rows) < 0.3, "0700", ""),
+        "LATITUDE": latitude,
+        "LONGITUDE": longitude,
+        "ELEVATION": round(float(rng.uniform(-10, 3000)), 1),
+        "STATE": "",
+        "NAME": f"SYNTHETIC STATION {n}",
+        "GSN FLAG": "",
+        "HCN/CRN FLAT": "",
+        "WMO ID": "",
+        "geometry": f"POINT ({longitude} {latitude})",
+    })
+
+
+def generate(rows: int,
+             station_days: int = 3650,
+             seed: Optional[int] = 0) -> Iterator[pd.DataFrame]:
+    """Generate synthetic merged rows, one station at a time
+
+    Args:
+        rows (int): Total number of rows
+        station_days (int): Mean number of days reported by a station
+        seed (int, optional): Random seed, for reproducible assets
+
+    Returns:
+        Iterator[pd.DataFrame]: Rows of one station per frame
+    """
+    rng = np.random.default_rng(seed)
+    others = [
+        code for code in element_codes()
+        if code not in CORE_ELEMENT_PROBABILITIES
+    ]
+    remaining = rows
+    n = 0
+    while remaining > 0:
+        elements = [
+            code for code, p in CORE_ELEMENT_PROBABILITIES.items()
+            if rng.random() < p
+        ] + [code for code in others if rng.random() < OTHER_ELEMENT_PROBABILITY]
+        if not elements:
+            elements = ["PRCP"]
+        days = int(rng.integers(1, 2 * station_days))
+        days = min(days, LAST_ORDINAL - FIRST_ORDINAL - 1)
+        days = min(days, -(-remaining // len(elements)))
+        first = int(rng.integers(FIRST_ORDINAL, LAST_ORDINAL - days))
+        station_id = f"{COUNTRY_CODES[n % len(COUNTRY_CODES)]}{n:09d}"
+        frame = _station_frame(n, station_id, elements, first, days, rng)
+        frame = frame.iloc[:remaining]
+        remaining -= len(frame)
+        n += 1
+        yield frame
+
+
+def write_csv(path: str,
+              rows: int,
+              station_days: int = 3650,
+              seed: Optional[int] = 0) -> str:
+    """Write a synthetic merged CSV of ``rows`` rows
+
+    Memory use is bounded by the size of one station.
+
+    Args:
+        path (str): Output path
+        rows (int): Total number of rows
+        station_days (int): Mean number of days reported by a station
+        seed (int, optional): Random seed
+
+    Returns:
+        str: The output path
+    """
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(COLUMNS)
+        for frame in generate(rows, station_days=station_days, seed=seed):
+            frame[COLUMNS].to_csv(file, header=False, index=False)
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("destination")
+    parser.add_argument("-n", "--rows", type=int, default=100_000)
+    parser.add_argument("--station-days", type=int, default=3650)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_csv(args.destination,
+              args.rows,
+              station_days=args.station_days,
+              seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    wait,
+)
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import fsspec
+from pystac import Link, MediaType
+from pystac.rel_type import RelType
+
+from stactools.ghcnd import stac, validation
+from stactools.ghcnd.cache import AssetCache
+from stactools.ghcnd.constants import GHCND_ID
+from stactools.ghcnd.serialize import item_encoder
+from stactools.ghcnd.summary import CollectionSummary, reduce_summaries
+from stactools.ghcnd.timing import span
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_DIR_NAME = ".ghcnd-build"
+COLLECTION_FILE_NAME = "collection.json"
+
+
+class WorkUnit(NamedTuple):
+    """Data assets whose Items are built, and checkpointed, together"""
+    id: str
+    sources: List[str]
+
+
+def plan_units(sources: List[str],
+               sources_per_unit: int = 1) -> List[WorkUnit]:
+    """Split data assets into work units
+
+    Unit IDs are derived from their sources, so the same sources give the
+    same units on every run.
+
+    Args:
+        sources (List[str]): HREFs of the data assets, e.g. by_year files
+        sources_per_unit (int): Number of data assets per unit
+
+    Returns:
+        List[WorkUnit]: The units, in the order of sources
+    """
+    units = []
+    for start in range(0, len(sources), sources_per_unit):
+        unit_sources = list(sources[start:start + sources_per_unit])
+        digest = hashlib.sha256("\n".join(unit_sources).encode("utf-8"))
+        units.append(WorkUnit(digest.hexdigest()[:16], unit_sources))
+    return units
+
+
+def _item_path(item_id: str) -> str:
+    return f"{item_id}/{item_id}.json"
+
+
+def run_unit(unit: WorkUnit,
+             destination: str,
+             scan: bool = False,
+             validate: bool = True,
+             checksum: bool = False,
+             cache: Optional[AssetCache] = None,
+             schema_dir: Optional[str] = None,
+             offline: bool = False) -> Dict[str, Any]:
+    """Build and write the Items of a work unit
+
+    Items are written straight to their place in the Collection, linked to
+    a collection.json that is written once all units are done. Running a
+    unit again overwrites its Items, so interrupted units can be rerun.
+
+    Args:
+        unit (WorkUnit): The work unit
+        destination (str): The Collection output directory
+        scan (bool): Derive Item metadata from the content of each asset
+        validate (bool): Validate each Item
+        checksum (bool): Set file:checksum of each data asset
+        cache (AssetCache, optional): Cache for data asset sizes and
+            checksums
+        schema_dir (str, optional): Local schema directory, see
+            validation.use_schema_cache()
+        offline (bool): Raise instead of downloading schemas missing from
+            schema_dir
+
+    Returns:
+        Dict[str, Any]: The checkpoint of the unit: its sources, the IDs and
+            paths of its Items, relative to destination, and their summary
+    """
+    if validate and schema_dir is not None:
+        validation.use_schema_cache(schema_dir, offline)
+    factory = stac.default_item_factory()
+    encoder = item_encoder()
+    items = []
+    summaries = []
+    for href in unit.sources:
+        item = factory.create_item(href,
+                                   year=stac.year_from_href(href),
+                                   scan=scan,
+                                   cache=cache,
+                                   checksum=checksum)
+        item_dict = item.to_dict(include_self_link=False)
+        if validate:
+            validation.validate_dict(item_dict)
+        item_dict["collection"] = GHCND_ID
+        item_dict["links"] = [
+            link for link in item_dict["links"]
+            if link["rel"] not in ("root", "parent", "collection")
+        ] + [{
+            "rel": rel,
+            "href": f"../{COLLECTION_FILE_NAME}",
+            "type": MediaType.JSON,
+        } for rel in ("root", "parent", "collection")]
+        path = _item_path(item.id)
+        with fsspec.open(os.path.join(destination, path), "wb",
+                         auto_mkdir=True) as file:
+            file.write(encoder.encode(item_dict))
+        items.append({"id": item.id, "path": path})
+        summaries.append(CollectionSummary.from_item(item))
+    return {
+        "unit": unit.id,
+        "sources": unit.sources,
+        "items": items,
+        "summary": reduce_summaries(summaries).to_dict(),
+    }
+
+
+def checkpoint_dir(destination: str) -> str:
+    """Directory of the checkpoints of the build of a Collection"""
+    return os.path.join(destination, CHECKPOINT_DIR_NAME)
+
+
+def load_checkpoints(destination: str) -> Dict[str, Dict[str, Any]]:
+    """Checkpoints of finished work units, by unit ID
+
+    Args:
+        destination (str): The Collection output directory
+
+    Returns:
+        Dict[str, Dict[str, Any]]: The checkpoints, see run_unit()
+    """
+    fs, _, (path, ) = fsspec.get_fs_token_paths(checkpoint_dir(destination))
+    if not fs.exists(path):
+        return {}
+    checkpoints = {}
+    for checkpoint_path in fs.glob(f"{path}/*.json"):
+        with fs.open(checkpoint_path) as file:
+            checkpoint = json.load(file)
+        checkpoints[checkpoint["unit"]] = checkpoint
+    return checkpoints
+
+
+def _save_checkpoint(destination: str, checkpoint: Dict[str, Any]) -> None:
+    """Write a checkpoint, so it is either complete or absent"""
+    fs, _, (path, ) = fsspec.get_fs_token_paths(checkpoint_dir(destination))
+    fs.makedirs(path, exist_ok=True)
+    checkpoint_path = f"{path}/{checkpoint['unit']}.json"
+    with fs.open(checkpoint_path + ".tmp", "w") as file:
+        json.dump(checkpoint, file)
+    fs.mv(checkpoint_path + ".tmp", checkpoint_path)
+
+
+def run_build(sources: List[str],
+              destination: str,
+              executor: Optional[Executor] = None,
+              workers: int = 1,
+              sources_per_unit: int = 1,
+              scan: bool = False,
+              validate: bool = True,
+              checksum: bool = False,
+              cache: Optional[AssetCache] = None,
+              schema_dir: Optional[str] = None,
+              offline: bool = False) -> List[str]:
+    """Build the GHCNd Collection from its data assets, resuming a previous,
+    interrupted build of the same destination
+
+    The sources are split into work units, see plan_units(). Each unit
+    writes its Items and is checkpointed in the destination as soon as it
+    finishes. Units with a checkpoint for the same sources are skipped, so
+    a build that was stopped at any point only runs the unfinished units
+    when started again. Finally the Collection is written from the
+    checkpoints, with its extent and summaries reduced from the Item
+    summaries, without reading the Items.
+
+    Args:
+        sources (List[str]): HREFs of the data assets
+        destination (str): The Collection output directory, shared by all
+            workers
+        executor (Executor, optional): Any concurrent.futures compatible
+            executor to run the units on, e.g. of a batch cluster. By
+            default a process pool of ``workers`` processes, or the current
+            process if workers is 1.
+        workers (int): Number of worker processes if no executor is given
+        sources_per_unit (int): Number of data assets per work unit
+        scan (bool): Derive Item metadata from the content of each asset
+        validate (bool): Validate each Item and the Collection
+        checksum (bool): Set file:checksum of each data asset
+        cache (AssetCache, optional): Cache for data asset sizes and
+            checksums
+        schema_dir (str, optional): Local schema directory used by the
+            units, see validation.use_schema_cache()
+        offline (bool): Raise instead of downloading schemas missing from
+            schema_dir
+
+    Returns:
+        List[str]: IDs of the units run, excluding those already done
+
+    Raises:
+        ValueError: If two sources would get the same Item ID, see
+            stac.check_item_ids
+    """
+    stac.check_item_ids(sources)
+    if "://" not in destination:
+        destination = os.path.abspath(destination)
+    units = plan_units(sources, sources_per_unit)
+    checkpoints = load_checkpoints(destination)
+    pending = [
+        unit for unit in units
+        if checkpoints.get(unit.id, {}).get("sources") != unit.sources
+    ]
+    logger.info(f"{len(units) - len(pending)} of {len(units)} work units "
+                "already done")
+
+    failed: Dict[str, BaseException] = {}
+    with span("run_units", count=len(pending)):
+        if executor is None and workers <= 1:
+            for unit in pending:
+                checkpoint = run_unit(unit, destination, scan, validate,
+                                      checksum, cache, schema_dir, offline)
+                _save_checkpoint(destination, checkpoint)
+                checkpoints[unit.id] = checkpoint
+        else:
+            owned = executor is None
+            if executor is None:
+                executor = ProcessPoolExecutor(max_workers=workers)
+            try:
+                futures: Dict[Future, WorkUnit] = {
+                    executor.submit(run_unit, unit, destination, scan,
+                                    validate, checksum, cache, schema_dir,
+                                    offline): unit
+                    for unit in pending
+                }
+                remaining = set(futures)
+                while remaining:
+                    finished, remaining = wait(remaining,
+                                               return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        unit = futures[future]
+                        error = future.exception()
+                        if error is not None:
+                            logger.error(f"Work unit {unit.id} "
+                                         f"({unit.sources[0]}) failed: "
+                                         f"{error!r}")
+                            failed[unit.id] = error
+                            continue
+                        checkpoint = future.result()
+                        _save_checkpoint(destination, checkpoint)
+                        checkpoints[unit.id] = checkpoint
+            finally:
+                if owned:
+                    executor.shutdown()
+    if failed:
+        raise RuntimeError(
+            f"{len(failed)} of {len(pending)} work units failed, run the "
+            "build again to retry them") from next(iter(failed.values()))
+
+    with span("reduce"):
+        collection = stac.create_collection()
+        collection_href = os.path.join(destination, COLLECTION_FILE_NAME)
+        collection.set_self_href(collection_href)
+        done = [checkpoints[unit.id] for unit in units]
+        for checkpoint in done:
+            for item in checkpoint["items"]:
+                collection.add_link(
+                    Link(RelType.ITEM,
+                         target=os.path.join(destination, item["path"]),
+                         media_type=MediaType.JSON))
+        reduce_summaries(
+            CollectionSummary.from_dict(checkpoint["summary"])
+            for checkpoint in done).apply(collection)
+        if validate:
+            collection.validate()
+        collection.save_object(include_self_link=True)
+
+    return [unit.id for unit in pending]
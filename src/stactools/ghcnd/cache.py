@@ -0,0 +1,223 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+import fsspec
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 256 * 2**20
+
+# Keys of fsspec info dicts that change whenever the content changes, in
+# order of preference
+FINGERPRINT_KEYS = [
+    "ETag",
+    "etag",
+    "Last-Modified",
+    "LastModified",
+    "last_modified",
+    "mtime",
+    "updated",
+]
+
+
+def fingerprint(info: Dict[str, Any]) -> Optional[str]:
+    """Get a string that changes when the file described by info changes
+
+    Args:
+        info (Dict[str, Any]): The result of an fsspec filesystem info() call
+
+    Returns:
+        Optional[str]: The ETag or modification time with its size, or None
+            if the filesystem reports neither
+    """
+    for key in FINGERPRINT_KEYS:
+        value = info.get(key)
+        if value is not None:
+            return f"{key}={value};size={info.get('size')}"
+    return None
+
+
+def directory_fingerprint(files: Dict[str, Dict[str, Any]]) -> Optional[str]:
+    """Get a string that changes when any file in a directory changes, or is
+    added or removed
+
+    The info of a directory itself does not change with the files in its
+    subdirectories, e.g. the partitions of a Parquet dataset.
+
+    Args:
+        files (Dict[str, Dict[str, Any]]): The result of an fsspec
+            filesystem find(path, detail=True) call
+
+    Returns:
+        Optional[str]: Digest of the path and fingerprint of every file, or
+            None if the filesystem reports no fingerprint for one of them
+    """
+    sha256 = hashlib.sha256()
+    for path, info in sorted(files.items()):
+        current = fingerprint(info)
+        if current is None:
+            return None
+        sha256.update(f"{path}\0{current}\0".encode("utf-8"))
+    return f"files={len(files)};sha256={sha256.hexdigest()}"
+
+
+class AssetCache:
+    """On-disk cache of data asset metadata
+
+    Entries are keyed by asset HREF and stored with the asset's fingerprint
+    (ETag or modification time), so they are only reused while the asset is
+    unchanged. The least recently used entries are evicted once the cache
+    directory grows beyond ``max_size`` bytes.
+
+    Args:
+        cache_dir (str): Local directory holding the cache, created if needed
+        max_size (int): Maximum total size of the cache in bytes
+        max_age (float, optional): Seconds for which an entry is trusted
+            without checking the asset's fingerprint. By default the
+            fingerprint is always checked, which costs one metadata request
+            but never reads the asset itself.
+    """
+    def __init__(self,
+                 cache_dir: str,
+                 max_size: int = DEFAULT_MAX_SIZE,
+                 max_age: Optional[float] = None):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.max_age = max_age
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, key: str, suffix: str = ".json") -> str:
+        """Path of the cache file for a key"""
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest + suffix)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Read an entry
+
+        Args:
+            key (str): The entry key
+
+        Returns:
+            Optional[Dict[str, Any]]: The entry, or None if it is not cached
+        """
+        path = self.path(key)
+        try:
+            with open(path) as file:
+                entry = json.load(file)
+            # Mark as recently used for eviction
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any]) -> None:
+        """Write an entry, then evict old entries if the cache is too large
+
+        Args:
+            key (str): The entry key
+            entry (Dict[str, Any]): JSON serializable entry
+        """
+        # Write to a temporary file first so concurrent readers, e.g. other
+        # worker processes, never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as file:
+            json.dump(entry, file)
+        path = self.path(key)
+        os.replace(tmp_path, path)
+        self.evict(keep=path)
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """Remove the least recently used entries until the cache fits in
+        max_size
+
+        Args:
+            keep (str, optional): Path of an entry that is never evicted,
+                e.g. the one just written
+        """
+        entries = []
+        for dir_entry in os.scandir(self.cache_dir):
+            if dir_entry.path == keep or dir_entry.name.endswith(".tmp"):
+                continue
+            if dir_entry.is_file():
+                stat = dir_entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, dir_entry.path))
+        total = sum(size for _, size, _ in entries)
+        if keep is not None:
+            total += os.path.getsize(keep)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def stat(self, href: str) -> Dict[str, Any]:
+        """Get the size and fingerprint of an asset, from the cache if the
+        asset is unchanged
+
+        The fingerprint of a directory covers all files inside it, see
+        directory_fingerprint().
+
+        Args:
+            href (str): HREF of the asset, a file or a directory
+
+        Returns:
+            Dict[str, Any]: Entry with "href", "fingerprint", "size" and
+                "checked" (time of the last fingerprint check)
+        """
+        key = f"stat:{href}"
+        entry = self.get(key)
+        now = time.time()
+        if (entry is not None and self.max_age is not None
+                and now - entry["checked"] < self.max_age):
+            return entry
+
+        fs, _, (path, ) = fsspec.get_fs_token_paths(href)
+        info = fs.info(path)
+        if info.get("type") == "directory":
+            # One listing of all files, as for their total size
+            files = fs.find(path, detail=True)
+            current = directory_fingerprint(files)
+            size = sum(file_info.get("size") or 0
+                       for file_info in files.values())
+        else:
+            current = fingerprint(info)
+            size = info.get("size")
+        if (entry is not None and current is not None
+                and entry["fingerprint"] == current):
+            logger.debug(f"Asset stat cache hit for {href}")
+            entry["checked"] = now
+        else:
+            entry = {
+                "href": href,
+                "fingerprint": current,
+                "size": size,
+                "checked": now,
+            }
+        self.put(key, entry)
+        return entry
+
+    def update(self, href: str, **fields: Any) -> Dict[str, Any]:
+        """Add fields derived from the asset's content to its stat() entry
+
+        The fields are dropped together with the entry once the asset's
+        fingerprint changes.
+
+        Args:
+            href (str): HREF of the asset
+            **fields: JSON serializable values, e.g. a checksum
+
+        Returns:
+            Dict[str, Any]: The updated entry
+        """
+        entry = self.stat(href)
+        entry.update(fields)
+        self.put(f"stat:{href}", entry)
+        return entry
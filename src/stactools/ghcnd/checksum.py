@@ -0,0 +1,112 @@
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, NamedTuple, Optional
+
+import fsspec
+
+from stactools.ghcnd.cache import AssetCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOCK_SIZE = 4 * 2**20
+
+# Multihash code and digest length of SHA2-256
+SHA2_256_MULTIHASH_PREFIX = bytes([0x12, 0x20])
+
+
+class FileInfo(NamedTuple):
+    """Size and file:checksum of an asset"""
+    size: Optional[int]
+    checksum: Optional[str]
+
+
+def multihash_sha256(digest: bytes) -> str:
+    """Encode a SHA2-256 digest as a hex multihash, as used by file:checksum
+
+    Args:
+        digest (bytes): The 32 byte digest
+
+    Returns:
+        str: Hex encoded multihash
+    """
+    return (SHA2_256_MULTIHASH_PREFIX + digest).hex()
+
+
+def read_file_info(href: str,
+                   block_size: int = DEFAULT_BLOCK_SIZE) -> FileInfo:
+    """Get the size and checksum of a file in a single streaming read
+
+    The file is read into one fixed buffer, so memory use does not depend on
+    the size of the file. Directories, e.g. Parquet datasets, have no
+    checksum.
+
+    Args:
+        href (str): HREF of the file
+        block_size (int): Size of the read buffer in bytes
+
+    Returns:
+        FileInfo: Size and multihash checksum
+    """
+    fs, _, (path, ) = fsspec.get_fs_token_paths(href)
+    if fs.isdir(path):
+        return FileInfo(fs.du(path, total=True), None)
+    sha256 = hashlib.sha256()
+    buffer = bytearray(block_size)
+    view = memoryview(buffer)
+    with fs.open(path, "rb", block_size=block_size) as file:
+        size = file.size
+        while True:
+            count = file.readinto(view)
+            if not count:
+                break
+            sha256.update(view[:count])
+    return FileInfo(size, multihash_sha256(sha256.digest()))
+
+
+def asset_file_info(href: str,
+                    cache: Optional[AssetCache] = None,
+                    block_size: int = DEFAULT_BLOCK_SIZE) -> FileInfo:
+    """Get the size and checksum of a file, from the cache if it is unchanged
+
+    Args:
+        href (str): HREF of the file
+        cache (AssetCache, optional): Cache keyed by HREF and ETag or
+            modification time, so unchanged files are never hashed twice
+        block_size (int): Size of the read buffer in bytes
+
+    Returns:
+        FileInfo: Size and multihash checksum
+    """
+    if cache is None:
+        return read_file_info(href, block_size)
+    entry = cache.stat(href)
+    if "checksum" in entry:
+        return FileInfo(entry["size"], entry["checksum"])
+    info = read_file_info(href, block_size)
+    cache.update(href, size=info.size, checksum=info.checksum)
+    return info
+
+
+def asset_file_infos(
+        hrefs: Iterable[str],
+        cache: Optional[AssetCache] = None,
+        workers: int = 4,
+        block_size: int = DEFAULT_BLOCK_SIZE) -> Dict[str, FileInfo]:
+    """Get the sizes and checksums of many files, hashing them in parallel
+    threads
+
+    Args:
+        hrefs (Iterable[str]): HREFs of the files
+        cache (AssetCache, optional): Cache of sizes and checksums
+        workers (int): Number of threads
+        block_size (int): Size of the read buffer of each thread
+
+    Returns:
+        Dict[str, FileInfo]: Size and checksum by HREF
+    """
+    hrefs = list(hrefs)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        infos = executor.map(
+            lambda href: asset_file_info(href, cache, block_size), hrefs)
+        return dict(zip(hrefs, infos))
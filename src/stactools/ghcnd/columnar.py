@@ -0,0 +1,359 @@
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+import fsspec
+import numpy as np
+import pandas as pd
+
+from stactools.ghcnd.cache import fingerprint
+from stactools.ghcnd.constants import DATA_TABLE_COLUMNS, ELEMENTS_VALUES
+from stactools.ghcnd.scan import DEFAULT_CHUNKSIZE, iter_chunks
+
+logger = logging.getLogger(__name__)
+
+META_FILE_NAME = "meta.json"
+FORMAT_VERSION = 1
+
+ID_COLUMN = "ID"
+DATE_COLUMN = "YEAR/MONTH/DAY"
+ELEMENT_COLUMN = "ELEMENT"
+VALUE_COLUMN = "DATA VALUE"
+FLAG_COLUMNS = {
+    "m_flag": "M-FLAG",
+    "q_flag": "Q-FLAG",
+    "s_flag": "S-FLAG",
+}
+OBS_TIME_COLUMN = "OBS-TIME"
+
+# One fixed-width binary file per column
+COLUMN_DTYPES: Dict[str, np.dtype] = {
+    "station": np.dtype("<i4"),
+    "date": np.dtype("<i4"),
+    "element": np.dtype("u1"),
+    "value": np.dtype("<i2"),
+    "m_flag": np.dtype("u1"),
+    "q_flag": np.dtype("u1"),
+    "s_flag": np.dtype("u1"),
+    "obs_time": np.dtype("<i2"),
+}
+
+# Code of missing flags, and value of missing observation times
+NO_FLAG = 0
+NO_OBS_TIME = -1
+
+# Ground cover and soil depth codes of the soil temperature elements, and
+# the weather type codes, see the GHCNd readme
+_GROUND_COVERS = "012345678"
+_SOIL_DEPTHS = "1234567"
+_WEATHER_TYPES = [f"{n:02d}" for n in range(1, 23)]
+
+
+def element_dictionary() -> List[str]:
+    """Element codes in the order of their uint8 code
+
+    Built from ELEMENTS_VALUES, with the wildcard entries (e.g. "SN*#" and
+    "WT**") expanded into every concrete code.
+
+    Returns:
+        List[str]: The element codes
+    """
+    codes: List[str] = []
+    for code in ELEMENTS_VALUES:
+        code = code.strip()
+        if code.endswith("*#"):
+            codes.extend(code[:2] + cover + depth for cover in _GROUND_COVERS
+                         for depth in _SOIL_DEPTHS)
+        elif code.endswith("**"):
+            codes.extend(code[:2] + weather for weather in _WEATHER_TYPES)
+        else:
+            codes.append(code)
+    return codes
+
+
+def _flag_codes(series: pd.Series) -> np.ndarray:
+    """Encode one character flags as their ASCII code, NO_FLAG if blank"""
+    chars = series.fillna("").astype(str).to_numpy(dtype="U1")
+    return chars.view(np.uint32).astype(np.uint8)
+
+
+def _obs_times(series: pd.Series) -> np.ndarray:
+    """Parse HHMM observation times, NO_OBS_TIME if blank"""
+    times = pd.to_numeric(series, errors="coerce").fillna(NO_OBS_TIME)
+    return times.to_numpy(np.int16)
+
+
+class _Dictionary:
+    """Incrementally built mapping of strings to integer codes"""
+    def __init__(self, values: Optional[List[str]] = None):
+        self.values: List[str] = list(values or [])
+        self.codes = {value: n for n, value in enumerate(self.values)}
+
+    def encode(self, series: pd.Series, dtype: np.dtype) -> np.ndarray:
+        """Codes of all values of series, adding unseen values"""
+        codes, uniques = pd.factorize(series, sort=False)
+        lookup = np.empty(len(uniques), dtype=dtype)
+        for n, value in enumerate(uniques):
+            code = self.codes.get(value)
+            if code is None:
+                code = len(self.values)
+                if code > np.iinfo(dtype).max:
+                    raise ValueError(
+                        f"More than {code} distinct values, {value!r} does "
+                        f"not fit in {dtype}")
+                self.values.append(value)
+                self.codes[value] = code
+            lookup[n] = code
+        return lookup[codes]
+
+
+def _source_fingerprint(href: str) -> Optional[str]:
+    fs, _, (path, ) = fsspec.get_fs_token_paths(href)
+    return fingerprint(fs.info(path))
+
+
+def build_observation_cache(
+        href: str,
+        cache_dir: str,
+        chunksize: int = DEFAULT_CHUNKSIZE) -> "ObservationCache":
+    """Convert a data asset into a memory-mapped columnar cache
+
+    The asset is read once, in chunks, and each column is appended to its own
+    fixed-width binary file. Stations are stored as indexes into the station
+    list and elements as codes of element_dictionary(), extended with any
+    element not in ELEMENTS_VALUES.
+
+    Args:
+        href (str): HREF of the data asset, a merged CSV or a GeoParquet
+            dataset
+        cache_dir (str): Local output directory
+        chunksize (int): Maximum number of rows held in memory
+
+    Returns:
+        ObservationCache: The opened cache
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    meta_path = os.path.join(cache_dir, META_FILE_NAME)
+    # The cache is only valid once the metadata is written, last
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    stations = _Dictionary()
+    elements = _Dictionary(element_dictionary())
+    columns = [column["name"] for column in DATA_TABLE_COLUMNS]
+    files = {
+        name: open(os.path.join(cache_dir, f"{name}.bin"), "wb")
+        for name in COLUMN_DTYPES
+    }
+    row_count = 0
+    try:
+        for chunk in iter_chunks(href, columns, chunksize):
+            values = chunk[VALUE_COLUMN].to_numpy(np.int64)
+            limits = np.iinfo(COLUMN_DTYPES["value"])
+            if len(values) and (values.min() < limits.min
+                                or values.max() > limits.max):
+                raise ValueError(
+                    f"Values of {href} do not fit in "
+                    f"{COLUMN_DTYPES['value']}")
+            arrays = {
+                "station":
+                stations.encode(chunk[ID_COLUMN], COLUMN_DTYPES["station"]),
+                "date":
+                chunk[DATE_COLUMN].astype(np.int64).to_numpy(),
+                "element":
+                elements.encode(chunk[ELEMENT_COLUMN].astype(str),
+                                COLUMN_DTYPES["element"]),
+                "value":
+                values,
+                "obs_time":
+                _obs_times(chunk[OBS_TIME_COLUMN]),
+            }
+            for name, column in FLAG_COLUMNS.items():
+                arrays[name] = _flag_codes(chunk[column])
+            for name, dtype in COLUMN_DTYPES.items():
+                arrays[name].astype(dtype, copy=False).tofile(files[name])
+            row_count += len(chunk)
+    finally:
+        for file in files.values():
+            file.close()
+
+    meta = {
+        "version": FORMAT_VERSION,
+        "source": href,
+        "fingerprint": _source_fingerprint(href),
+        "row_count": row_count,
+        "columns": {name: dtype.str
+                    for name, dtype in COLUMN_DTYPES.items()},
+        "stations": stations.values,
+        "elements": elements.values,
+    }
+    with open(meta_path, "w") as meta_file:
+        json.dump(meta, meta_file)
+    logger.info(f"Cached {row_count} observations of {href} in {cache_dir}")
+    return ObservationCache(cache_dir)
+
+
+class ObservationCache:
+    """Memory-mapped columnar cache of GHCNd observations
+
+    Each column is a read-only numpy memmap, so opening the cache is
+    instant, only the pages that are used are read, and processes opening
+    the same cache share them through the OS page cache.
+
+    Args:
+        cache_dir (str): Directory written by build_observation_cache
+    """
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        with open(os.path.join(cache_dir, META_FILE_NAME)) as file:
+            self.meta: Dict[str, Any] = json.load(file)
+        if self.meta["version"] != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported observation cache version "
+                f"{self.meta['version']} in {cache_dir}")
+        self.stations: List[str] = self.meta["stations"]
+        self.elements: List[str] = self.meta["elements"]
+        self._station_indexes = {
+            station: n
+            for n, station in enumerate(self.stations)
+        }
+        self._element_codes = {
+            element: n
+            for n, element in enumerate(self.elements)
+        }
+        self.columns: Dict[str, np.ndarray] = {}
+        for name, dtype in self.meta["columns"].items():
+            path = os.path.join(cache_dir, f"{name}.bin")
+            if len(self):
+                self.columns[name] = np.memmap(path,
+                                               dtype=np.dtype(dtype),
+                                               mode="r",
+                                               shape=(len(self), ))
+            else:
+                # Empty files cannot be memory-mapped
+                self.columns[name] = np.empty(0, dtype=np.dtype(dtype))
+
+    def __len__(self) -> int:
+        return self.meta["row_count"]
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def is_current(self) -> bool:
+        """Whether the source data asset is unchanged since the cache was
+        built"""
+        current = _source_fingerprint(self.meta["source"])
+        return current is not None and current == self.meta["fingerprint"]
+
+    def station_index(self, station: str) -> int:
+        """Index of a station ID in the station column, -1 if unknown"""
+        return self._station_indexes.get(station, -1)
+
+    def element_code(self, element: str) -> int:
+        """Code of an element in the element column, -1 if unknown"""
+        return self._element_codes.get(element, -1)
+
+    def mask(self,
+             station: Optional[str] = None,
+             element: Optional[str] = None,
+             start: Optional[int] = None,
+             end: Optional[int] = None) -> np.ndarray:
+        """Select rows by station, element and date range
+
+        Args:
+            station (str, optional): Station ID
+            element (str, optional): Element code, e.g. "TMAX"
+            start (int, optional): First date, as YYYYMMDD
+            end (int, optional): Last date, as YYYYMMDD
+
+        Returns:
+            np.ndarray: Boolean mask of the selected rows
+        """
+        selected = np.ones(len(self), dtype=bool)
+        if station is not None:
+            selected &= self.columns["station"] == self.station_index(station)
+        if element is not None:
+            selected &= self.columns["element"] == self.element_code(element)
+        if start is not None:
+            selected &= self.columns["date"] >= start
+        if end is not None:
+            selected &= self.columns["date"] <= end
+        return selected
+
+    def select(self,
+               station: Optional[str] = None,
+               element: Optional[str] = None,
+               start: Optional[int] = None,
+               end: Optional[int] = None) -> pd.DataFrame:
+        """Decoded rows selected by station, element and date range
+
+        Args:
+            station (str, optional): Station ID
+            element (str, optional): Element code, e.g. "TMAX"
+            start (int, optional): First date, as YYYYMMDD
+            end (int, optional): Last date, as YYYYMMDD
+
+        Returns:
+            pd.DataFrame: The rows, with the columns of DATA_TABLE_COLUMNS
+        """
+        return self.to_frame(
+            np.flatnonzero(self.mask(station, element, start, end)))
+
+    def to_frame(self, rows: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """Decode rows into a DataFrame
+
+        Args:
+            rows (np.ndarray, optional): Row indexes or boolean mask, all rows
+                if not given
+
+        Returns:
+            pd.DataFrame: The rows, with the columns of DATA_TABLE_COLUMNS
+        """
+        if rows is None:
+            rows = slice(None)  # type: ignore
+        columns = {name: self.columns[name][rows] for name in self.columns}
+        frame = pd.DataFrame({
+            ID_COLUMN:
+            pd.Categorical.from_codes(columns["station"],
+                                      categories=self.stations),
+            DATE_COLUMN:
+            columns["date"],
+            ELEMENT_COLUMN:
+            pd.Categorical.from_codes(columns["element"].astype(np.int32),
+                                      categories=self.elements),
+            VALUE_COLUMN:
+            columns["value"],
+        })
+        for name, column in FLAG_COLUMNS.items():
+            codes = columns[name].astype(np.uint32)
+            values = codes.view("U1").astype(object)
+            values[codes == NO_FLAG] = None
+            # Explicitly object, pandas 3 would infer a string dtype with NaN
+            frame[column] = pd.Series(values, index=frame.index, dtype=object)
+        obs_time = pd.Series(columns["obs_time"], dtype="Int16")
+        frame[OBS_TIME_COLUMN] = obs_time.mask(obs_time == NO_OBS_TIME)
+        return frame
+
+
+def open_observation_cache(
+        href: str,
+        cache_dir: str,
+        chunksize: int = DEFAULT_CHUNKSIZE) -> ObservationCache:
+    """Open the observation cache of a data asset, building it first if it
+    does not exist or the asset changed
+
+    Args:
+        href (str): HREF of the data asset
+        cache_dir (str): Local directory of the cache
+        chunksize (int): Maximum number of rows held in memory while building
+
+    Returns:
+        ObservationCache: The opened cache
+    """
+    if os.path.exists(os.path.join(cache_dir, META_FILE_NAME)):
+        cache = ObservationCache(cache_dir)
+        if cache.meta["source"] == href and cache.is_current():
+            return cache
+        logger.info(f"Rebuilding stale observation cache {cache_dir}")
+    return build_observation_cache(href, cache_dir, chunksize)
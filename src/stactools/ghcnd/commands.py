@@ -1,11 +1,111 @@
 import logging
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
 
 import click
+from pystac import Collection
 
-from stactools.ghcnd import stac
+from stactools.ghcnd import (
+    build,
+    diff,
+    export,
+    index,
+    manifest,
+    merge,
+    mirror,
+    parquet,
+    serialize,
+    stac,
+    stations,
+    validation,
+)
+from stactools.ghcnd.cache import AssetCache
+from stactools.ghcnd.constants import GHCND_ID, STATIONS_URL
+from stactools.ghcnd.summary import CollectionSummary, reduce_summaries
+from stactools.ghcnd.timing import Profiler, span
 
 logger = logging.getLogger(__name__)
 
+profile_option = click.option(
+    "--profile",
+    help=("Write a JSON report of the time spent in each stage, in Chrome "
+          "trace format, to this HREF."),
+)
+
+validate_option = click.option(
+    "--validate",
+    "validate_mode",
+    type=click.Choice(validation.VALIDATION_MODES),
+    default="full",
+    show_default=True,
+    help=("Validate all STAC objects, a sample of the items, or nothing. "
+          "The Collection is validated in full and sample modes."),
+)
+
+schema_dir_option = click.option(
+    "--schema-dir",
+    help=("Local directory of cached JSON schemas used for validation. "
+          "Missing schemas are downloaded into it, see fetch-schemas."),
+)
+
+offline_option = click.option(
+    "--offline",
+    is_flag=True,
+    help=("Never download schemas; fail if one is missing from "
+          "--schema-dir."),
+)
+
+
+@contextmanager
+def _profiled(profile: Optional[str]) -> Iterator[None]:
+    if profile is None:
+        yield
+        return
+    with Profiler() as profiler:
+        yield
+    profiler.save(profile)
+
+
+def _asset_cache(cache_dir: Optional[str],
+                 max_age: Optional[float]) -> Optional[AssetCache]:
+    if cache_dir is None:
+        return None
+    return AssetCache(cache_dir, max_age=max_age)
+
+
+def _item_sources(source: str) -> List[str]:
+    """The data assets of a source, each becoming an Item"""
+    sources = stac.expand_sources(source)
+    if not sources:
+        raise click.BadParameter(f"No data assets found at {source}",
+                                 param_hint="--source")
+    try:
+        stac.check_item_ids(sources)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--source")
+    return sources
+
+
+def _use_schema_cache(schema_dir: Optional[str], offline: bool) -> None:
+    """Validate against the schemas in schema_dir, if given"""
+    if schema_dir is not None:
+        validation.use_schema_cache(schema_dir, offline)
+    elif offline:
+        raise click.BadParameter("Requires --schema-dir",
+                                 param_hint="--offline")
+
+
+def _save_collection(collection: Collection,
+                     destination: str,
+                     validate: bool = True) -> None:
+    with span("normalize_hrefs"):
+        collection.normalize_hrefs(destination)
+    with span("save"):
+        serialize.save_catalog(collection)
+    if validate:
+        with span("validate"):
+            collection.validate()
+
 
 def create_ghcnd_command(cli):
     """Creates the stactools-ghcnd command line utility."""
@@ -26,16 +126,29 @@ def create_ghcnd_command(cli):
         required=True,
         help="The output location for the STAC Collection.",
     )
-    def create_collection_command(destination: str):
+    @validate_option
+    @schema_dir_option
+    @offline_option
+    @profile_option
+    def create_collection_command(destination: str, validate_mode: str,
+                                  schema_dir: Optional[str], offline: bool,
+                                  profile: Optional[str]):
         """Creates a STAC Collection
 
         Args:
             destination (str): The output folder for the Collection.
+            validate_mode (str): "full", "sample" or "none"
+            schema_dir (str, optional): Local directory of cached schemas
+            offline (bool): Never download schemas missing from schema_dir
+            profile (str, optional): HREF for a timing report
         """
-        collection = stac.create_collection()
-        collection.normalize_hrefs(destination)
-        collection.save(dest_href=destination)
-        collection.validate()
+        _use_schema_cache(schema_dir, offline)
+        with _profiled(profile):
+            with span("create_collection"):
+                collection = stac.create_collection()
+            _save_collection(collection,
+                             destination,
+                             validate=validate_mode != "none")
 
         return None
 
@@ -52,16 +165,73 @@ def create_ghcnd_command(cli):
         required=True,
         help="An HREF for the STAC Collection.",
     )
-    def create_item_command(source: str, destination: str):
+    @click.option(
+        "--scan",
+        is_flag=True,
+        help=("Read the data asset to derive the datetimes, bbox and row "
+              "counts from its content."),
+    )
+    @click.option(
+        "--checksum",
+        is_flag=True,
+        help="Add the SHA2-256 multihash of the data asset as file:checksum.",
+    )
+    @click.option(
+        "--index",
+        "index_href",
+        help="HREF of a byte-offset index of the data asset, see build-index.",
+    )
+    @click.option(
+        "--cache-dir",
+        help=("Directory of a cache for data asset sizes and checksums. "
+              "Unchanged assets are not opened again."),
+    )
+    @click.option(
+        "--cache-max-age",
+        type=float,
+        help=("Seconds for which cached asset sizes are trusted without "
+              "checking the asset's ETag or modification time."),
+    )
+    @validate_option
+    @schema_dir_option
+    @offline_option
+    @profile_option
+    def create_item_command(source: str, destination: str, scan: bool,
+                            checksum: bool, index_href: Optional[str],
+                            cache_dir: Optional[str],
+                            cache_max_age: Optional[float],
+                            validate_mode: str, schema_dir: Optional[str],
+                            offline: bool, profile: Optional[str]):
         """Creates a STAC Item
 
         Args:
             source (str): HREF of the Asset associated with the Item
             destination (str): An HREF for the STAC Collection
+            scan (bool): Derive Item metadata from the content of the Asset
+            checksum (bool): Add the checksum of the Asset
+            index_href (str, optional): HREF of the byte-offset index
+            cache_dir (str, optional): Directory of the asset stat cache
+            cache_max_age (float, optional): Seconds for which cached asset
+                stats are trusted without checking the Asset
+            validate_mode (str): "full", "sample" or "none"
+            schema_dir (str, optional): Local directory of cached schemas
+            offline (bool): Never download schemas missing from schema_dir
+            profile (str, optional): HREF for a timing report
         """
-        item = stac.create_item(source)
-        item.save_object(dest_href=destination)
-        item.validate()
+        _use_schema_cache(schema_dir, offline)
+        with _profiled(profile):
+            cache = _asset_cache(cache_dir, cache_max_age)
+            with span("create_item", href=source):
+                item = stac.create_item(source,
+                                        scan=scan,
+                                        cache=cache,
+                                        checksum=checksum,
+                                        index_href=index_href)
+            with span("save"):
+                item.save_object(dest_href=destination)
+            if validate_mode != "none":
+                with span("validate"):
+                    item.validate()
 
         return None
 
@@ -72,7 +242,8 @@ def create_ghcnd_command(cli):
         "-s",
         "--source",
         required=True,
-        help="The source for the data asset.",
+        help=("The source for the data asset(s). Either a single file, or a "
+              "directory or glob of by_year files."),
     )
     @click.option(
         "-d",
@@ -80,23 +251,879 @@ def create_ghcnd_command(cli):
         required=True,
         help="The output directory for the STAC Collection.",
     )
-    def populate_collection_command(source: str, destination: str):
+    @click.option(
+        "-w",
+        "--workers",
+        default=1,
+        show_default=True,
+        type=click.IntRange(min=1),
+        help="Number of processes used to create the items.",
+    )
+    @click.option(
+        "--scan",
+        is_flag=True,
+        help=("Read each data asset to derive the datetimes, bbox and row "
+              "counts from its content."),
+    )
+    @click.option(
+        "--checksum",
+        is_flag=True,
+        help="Add the SHA2-256 multihash of the data asset as file:checksum.",
+    )
+    @click.option(
+        "--cache-dir",
+        help=("Directory of a cache for data asset sizes and checksums. "
+              "Unchanged assets are not opened again."),
+    )
+    @click.option(
+        "--cache-max-age",
+        type=float,
+        help=("Seconds for which cached asset sizes are trusted without "
+              "checking the asset's ETag or modification time."),
+    )
+    @click.option(
+        "--incremental",
+        is_flag=True,
+        help=("Only rebuild the items whose source changed since the last "
+              "incremental build into destination."),
+    )
+    @validate_option
+    @schema_dir_option
+    @offline_option
+    @profile_option
+    def populate_collection_command(source: str, destination: str,
+                                    workers: int, scan: bool,
+                                    checksum: bool,
+                                    cache_dir: Optional[str],
+                                    cache_max_age: Optional[float],
+                                    incremental: bool, validate_mode: str,
+                                    schema_dir: Optional[str], offline: bool,
+                                    profile: Optional[str]):
         """Populate the GHCNd STAC Collection with all items
 
         Args:
-            source (str): HREF of the Asset associated with the Item
+            source (str): HREF of the Asset(s) associated with the Items
             destination (str): An HREF for the STAC Collection
+            workers (int): Number of processes used to create the Items
+            scan (bool): Derive Item metadata from the content of each Asset
+            checksum (bool): Add the checksum of each Asset
+            cache_dir (str, optional): Directory of the asset stat cache
+            cache_max_age (float, optional): Seconds for which cached asset
+                stats are trusted without checking the Asset
+            incremental (bool): Only rebuild the Items whose source changed
+            validate_mode (str): "full", "sample" or "none"
+            schema_dir (str, optional): Local directory of cached schemas
+            offline (bool): Never download schemas missing from schema_dir
+            profile (str, optional): HREF for a timing report
         """
+        _use_schema_cache(schema_dir, offline)
+        sources = _item_sources(source)
+        cache = _asset_cache(cache_dir, cache_max_age)
 
-        collection = stac.create_collection()
+        with _profiled(profile):
+            if incremental:
+                changed = manifest.populate_incremental(
+                    sources,
+                    destination,
+                    workers=workers,
+                    scan=scan,
+                    cache=cache,
+                    checksum=checksum,
+                    validate_mode=validate_mode,
+                    schema_dir=schema_dir,
+                    offline=offline)
+                click.echo(f"Rebuilt {len(changed)} of {len(sources)} items")
+                return None
 
-        # Create items for all years in range
-        item = stac.create_item(source)
-        collection.add_item(item)
+            with span("create_collection"):
+                collection = stac.create_collection()
 
-        collection.normalize_hrefs(destination)
-        collection.save(dest_href=destination)
-        collection.validate()
+            # Create items for all years in range, validated by the workers
+            items = stac.create_items(sources,
+                                      workers=workers,
+                                      scan=scan,
+                                      cache=cache,
+                                      checksum=checksum,
+                                      validate_mode=validate_mode,
+                                      schema_dir=schema_dir,
+                                      offline=offline)
+            collection.add_items(items)
+            with span("summarize"):
+                reduce_summaries(map(CollectionSummary.from_item,
+                                     items)).apply(collection)
+
+            _save_collection(collection,
+                             destination,
+                             validate=validate_mode != "none")
+
+        return None
+
+    @ghcnd.command(
+        "build",
+        short_help="Build the Collection, resuming an interrupted build")
+    @click.option(
+        "-s",
+        "--source",
+        required=True,
+        help="Directory or glob of the data assets, e.g. by_year files.",
+    )
+    @click.option(
+        "-d",
+        "--destination",
+        required=True,
+        help="The output directory for the STAC Collection.",
+    )
+    @click.option(
+        "-w",
+        "--workers",
+        default=1,
+        show_default=True,
+        type=click.IntRange(min=1),
+        help="Number of processes running work units.",
+    )
+    @click.option(
+        "--sources-per-unit",
+        default=1,
+        show_default=True,
+        type=click.IntRange(min=1),
+        help="Number of data assets per checkpointed work unit.",
+    )
+    @click.option(
+        "--scan",
+        is_flag=True,
+        help="Derive Item datetimes, bbox and row counts from each Asset.",
+    )
+    @click.option(
+        "--checksum",
+        is_flag=True,
+        help="Add the SHA2-256 multihash of each Asset as file:checksum.",
+    )
+    @click.option(
+        "--cache-dir",
+        help=("Directory of a cache for data asset sizes and checksums. "
+              "Unchanged assets are not opened again."),
+    )
+    @validate_option
+    @schema_dir_option
+    @offline_option
+    @profile_option
+    def build_command(source: str, destination: str, workers: int,
+                      sources_per_unit: int, scan: bool, checksum: bool,
+                      cache_dir: Optional[str], validate_mode: str,
+                      schema_dir: Optional[str], offline: bool,
+                      profile: Optional[str]):
+        """Build the GHCNd STAC Collection from all data assets, in work
+        units checkpointed in the destination. Running it again after an
+        interruption only runs the unfinished units.
+
+        Args:
+            source (str): Directory or glob of the data assets
+            destination (str): An HREF for the STAC Collection
+            workers (int): Number of processes running work units
+            sources_per_unit (int): Number of data assets per work unit
+            scan (bool): Derive Item metadata from the content of each Asset
+            checksum (bool): Add the checksum of each Asset
+            cache_dir (str, optional): Directory of the asset stat cache
+            validate_mode (str): "full" or "sample" validate every Item,
+                "none" nothing
+            schema_dir (str, optional): Local directory of cached schemas
+            offline (bool): Never download schemas missing from schema_dir
+            profile (str, optional): HREF for a timing report
+        """
+        _use_schema_cache(schema_dir, offline)
+        sources = _item_sources(source)
+        with _profiled(profile):
+            run = build.run_build(sources,
+                                  destination,
+                                  workers=workers,
+                                  sources_per_unit=sources_per_unit,
+                                  scan=scan,
+                                  validate=validate_mode != "none",
+                                  checksum=checksum,
+                                  cache=_asset_cache(cache_dir, None),
+                                  schema_dir=schema_dir,
+                                  offline=offline)
+        click.echo(f"Ran {len(run)} of "
+                   f"{len(build.plan_units(sources, sources_per_unit))} "
+                   "work units")
+
+        return None
+
+    @ghcnd.command(
+        "populate-stations",
+        short_help="Create one item per station in a sharded catalog")
+    @click.option(
+        "-s",
+        "--source",
+        default=STATIONS_URL,
+        show_default=True,
+        help="HREF of ghcnd-stations.txt.",
+    )
+    @click.option(
+        "-i",
+        "--inventory",
+        help=("HREF of ghcnd-inventory.txt, to set the item datetimes to the "
+              "years with data of each station."),
+    )
+    @click.option(
+        "-d",
+        "--destination",
+        required=True,
+        help="The output directory for the STAC Collection.",
+    )
+    @click.option(
+        "-w",
+        "--workers",
+        default=1,
+        show_default=True,
+        type=click.IntRange(min=1),
+        help="Number of processes used to create the items.",
+    )
+    @click.option(
+        "--cache-dir",
+        help=("Directory of a cache for the parsed stations and inventory. "
+              "Unchanged files are not parsed again."),
+    )
+    @click.option(
+        "--max-shard-size",
+        default=stations.DEFAULT_MAX_SHARD_SIZE,
+        show_default=True,
+        type=click.IntRange(min=1),
+        help=("Maximum number of items per sub-catalog. Larger country "
+              "catalogs are split by station ID prefix."),
+    )
+    @validate_option
+    @schema_dir_option
+    @offline_option
+    @profile_option
+    def populate_stations_command(source: str, inventory: Optional[str],
+                                  destination: str, workers: int,
+                                  cache_dir: Optional[str],
+                                  max_shard_size: int, validate_mode: str,
+                                  schema_dir: Optional[str], offline: bool,
+                                  profile: Optional[str]):
+        """Create one item per GHCNd station, with the station location as
+        geometry, in sub-catalogs by country code
+
+        Args:
+            source (str): HREF of ghcnd-stations.txt
+            inventory (str, optional): HREF of ghcnd-inventory.txt
+            destination (str): The output directory for the STAC Collection
+            workers (int): Number of processes used to create the Items
+            cache_dir (str, optional): Directory of the parsed file cache
+            max_shard_size (int): Maximum number of Items per sub-catalog
+            validate_mode (str): "full", "sample" or "none"
+            schema_dir (str, optional): Local directory of cached schemas
+            offline (bool): Never download schemas missing from schema_dir
+            profile (str, optional): HREF for a timing report
+        """
+        _use_schema_cache(schema_dir, offline)
+        cache = _asset_cache(cache_dir, None)
+        with _profiled(profile):
+            element_years = None
+            if inventory is not None:
+                element_years = stations.read_inventory(inventory, cache)
+            count = stations.populate_stations(
+                stations.read_stations(source, cache),
+                destination,
+                workers=workers,
+                max_shard_size=max_shard_size,
+                validate_mode=validate_mode,
+                schema_dir=schema_dir,
+                inventory=element_years,
+                offline=offline)
+        click.echo(f"Wrote {count} station items to {destination}")
+
+        return None
+
+    @ghcnd.command(
+        "export-items",
+        short_help="Stream the items to NDJSON or stac-geoparquet")
+    @click.option(
+        "-s",
+        "--source",
+        required=True,
+        help=("The source for the data asset(s). Either a single file, or a "
+              "directory or glob of by_year files."),
+    )
+    @click.option(
+        "-d",
+        "--destination",
+        required=True,
+        help=("HREF of the output file, e.g. items.ndjson.gz or "
+              "items.parquet."),
+    )
+    @click.option(
+        "-f",
+        "--format",
+        "export_format",
+        type=click.Choice(export.EXPORT_FORMATS),
+        help="Output format. Defaults to the one matching the extension.",
+    )
+    @click.option(
+        "-w",
+        "--workers",
+        default=1,
+        show_default=True,
+        type=click.IntRange(min=1),
+        help="Number of processes used to create the items.",
+    )
+    @click.option(
+        "-b",
+        "--batch-size",
+        default=export.DEFAULT_BATCH_SIZE,
+        show_default=True,
+        type=click.IntRange(min=1),
+        help="Number of items written at once.",
+    )
+    @click.option(
+        "--collection-href",
+        help=("HREF of the GHCNd Collection. If given, the items get its ID "
+              "as collection and a link to it, as STAC API databases expect."),
+    )
+    @click.option(
+        "--scan",
+        is_flag=True,
+        help=("Read each data asset to derive the datetimes, bbox and row "
+              "counts from its content."),
+    )
+    @click.option(
+        "--checksum",
+        is_flag=True,
+        help="Add the SHA2-256 multihash of the data asset as file:checksum.",
+    )
+    @click.option(
+        "--cache-dir",
+        help=("Directory of a cache for data asset sizes and checksums. "
+              "Unchanged assets are not opened again."),
+    )
+    @click.option(
+        "--cache-max-age",
+        type=float,
+        help=("Seconds for which cached asset sizes are trusted without "
+              "checking the asset's ETag or modification time."),
+    )
+    @profile_option
+    def export_items_command(source: str, destination: str,
+                             export_format: Optional[str], workers: int,
+                             batch_size: int, collection_href: Optional[str],
+                             scan: bool, checksum: bool,
+                             cache_dir: Optional[str],
+                             cache_max_age: Optional[float],
+                             profile: Optional[str]):
+        """Stream the GHCNd items to a single NDJSON or stac-geoparquet file
+
+        Args:
+            source (str): HREF of the Asset(s) associated with the Items
+            destination (str): HREF of the output file
+            export_format (str, optional): "ndjson" or "geoparquet"
+            workers (int): Number of processes used to create the Items
+            batch_size (int): Number of Items written at once
+            collection_href (str, optional): HREF of the Collection
+            scan (bool): Derive Item metadata from the content of each Asset
+            checksum (bool): Add the checksum of each Asset
+            cache_dir (str, optional): Directory of the asset stat cache
+            cache_max_age (float, optional): Seconds for which cached asset
+                stats are trusted without checking the Asset
+            profile (str, optional): HREF for a timing report
+        """
+        sources = _item_sources(source)
+        cache = _asset_cache(cache_dir, cache_max_age)
+
+        with _profiled(profile):
+            item_dicts = stac.iter_item_dicts(sources,
+                                              workers=workers,
+                                              scan=scan,
+                                              cache=cache,
+                                              checksum=checksum)
+            if collection_href is not None:
+                item_dicts = export.with_collection(item_dicts, GHCND_ID,
+                                                    collection_href)
+            with span("export_items", href=destination):
+                count = export.export_items(item_dicts,
+                                            destination,
+                                            format=export_format,
+                                            batch_size=batch_size)
+        click.echo(f"Exported {count} items to {destination}")
+
+        return None
+
+    @ghcnd.command("mirror",
+                   short_help="Download the GHCNd archive concurrently")
+    @click.option(
+        "-d",
+        "--destination",
+        required=True,
+        help="Local directory of the mirror.",
+    )
+    @click.option(
+        "-y",
+        "--year",
+        "years",
+        multiple=True,
+        type=int,
+        help="Year of a by_year file to mirror. Defaults to all years.",
+    )
+    @click.option(
+        "--base-url",
+        default=mirror.BASE_URL,
+        show_default=True,
+        help="Root URL of the archive.",
+    )
+    @click.option(
+        "-c",
+        "--concurrency",
+        default=mirror.DEFAULT_CONCURRENCY,
+        show_default=True,
+        type=click.IntRange(min=1),
+        help="Maximum number of simultaneous downloads.",
+    )
+    @click.option(
+        "--max-bandwidth",
+        type=float,
+        help="Maximum download rate over all files, in MB/s.",
+    )
+    @click.option(
+        "--retries",
+        default=mirror.DEFAULT_RETRIES,
+        show_default=True,
+        type=click.IntRange(min=0),
+        help="Number of times an interrupted download is resumed.",
+    )
+    def mirror_command(destination: str, years: Tuple[int, ...],
+                       base_url: str, concurrency: int,
+                       max_bandwidth: Optional[float], retries: int):
+        """Mirror the by_year files, stations, inventory and readme files.
+        Running it again only downloads changed files and resumes
+        interrupted downloads.
+
+        Args:
+            destination (str): Local directory of the mirror
+            years (Tuple[int]): Years to mirror, all years if empty
+            base_url (str): Root URL of the archive
+            concurrency (int): Maximum number of simultaneous downloads
+            max_bandwidth (float, optional): Maximum rate in MB/s
+            retries (int): Number of times a download is resumed
+        """
+        rate = None if max_bandwidth is None else max_bandwidth * 1e6
+        result = mirror.mirror(
+            destination,
+            base_url=base_url,
+            years=years or None,
+            concurrency=concurrency,
+            max_bandwidth=rate,
+            retries=retries)
+        click.echo(f"{len(result.downloaded)} downloaded, "
+                   f"{len(result.resumed)} resumed, "
+                   f"{len(result.not_modified)} not modified")
+        if result.failed:
+            raise click.ClickException("Failed to mirror " +
+                                       ", ".join(sorted(result.failed)))
+
+        return None
+
+    @ghcnd.command(
+        "build-asset",
+        short_help="Build the merged data asset from by_year files")
+    @click.option(
+        "-s",
+        "--source",
+        required=True,
+        help="Directory or glob of the by_year .csv.gz files.",
+    )
+    @click.option(
+        "--stations",
+        default=STATIONS_URL,
+        show_default=True,
+        help="HREF of ghcnd-stations.txt.",
+    )
+    @click.option(
+        "-d",
+        "--destination",
+        required=True,
+        help="HREF of the merged CSV, compressed if it ends with e.g. .gz.",
+    )
+    @click.option(
+        "-w",
+        "--workers",
+        default=1,
+        show_default=True,
+        type=click.IntRange(min=1),
+        help="Number of processes merging years.",
+    )
+    @click.option(
+        "-c",
+        "--chunksize",
+        default=merge.DEFAULT_CHUNKSIZE,
+        show_default=True,
+        type=click.IntRange(min=1),
+        help="Number of rows held in memory at once by each process.",
+    )
+    @click.option(
+        "--cache-dir",
+        help=("Directory of a cache for the parsed stations file. An "
+              "unchanged file is not parsed again."),
+    )
+    @click.option(
+        "--tmp-dir",
+        help="Local directory for the temporary per-year files.",
+    )
+    @profile_option
+    def build_asset_command(source: str, stations: str, destination: str,
+                            workers: int, chunksize: int,
+                            cache_dir: Optional[str], tmp_dir: Optional[str],
+                            profile: Optional[str]):
+        """Build the merged data asset: all by_year files, in year order,
+        left merged on the stations by ID, with a WKT geometry column
+
+        Args:
+            source (str): Directory or glob of the by_year files
+            stations (str): HREF of ghcnd-stations.txt
+            destination (str): HREF of the merged CSV
+            workers (int): Number of processes merging years
+            chunksize (int): Number of rows held in memory per process
+            cache_dir (str, optional): Directory of the parsed file cache
+            tmp_dir (str, optional): Directory for temporary files
+            profile (str, optional): HREF for a timing report
+        """
+        sources = stac.expand_sources(source)
+        if not sources:
+            raise click.BadParameter(f"No data assets found at {source}",
+                                     param_hint="--source")
+        with _profiled(profile):
+            merge.build_asset(sources,
+                              destination,
+                              stations_href=stations,
+                              workers=workers,
+                              chunksize=chunksize,
+                              cache=_asset_cache(cache_dir, None),
+                              tmp_dir=tmp_dir)
+        click.echo(f"Merged {len(sources)} files into {destination}")
+
+        return None
+
+    @ghcnd.command(
+        "convert",
+        short_help="Convert the data asset to partitioned GeoParquet")
+    @click.option(
+        "-s",
+        "--source",
+        required=True,
+        help=("HREF of the merged data/station CSV, or a directory or glob "
+              "of them, or of by_year files with --stations."),
+    )
+    @click.option(
+        "-d",
+        "--destination",
+        required=True,
+        help="HREF of the output GeoParquet dataset directory.",
+    )
+    @click.option(
+        "--stations",
+        help=("HREF of ghcnd-stations.txt. The sources are then headerless "
+              "by_year files, joined with the station table."),
+    )
+    @click.option(
+        "-e",
+        "--partition-element",
+        is_flag=True,
+        help="Partition by ELEMENT as well as by year.",
+    )
+    @click.option(
+        "-c",
+        "--chunksize",
+        default=parquet.DEFAULT_CHUNKSIZE,
+        show_default=True,
+        type=click.IntRange(min=1),
+        help="Number of CSV rows held in memory at once.",
+    )
+    @click.option(
+        "-w",
+        "--workers",
+        default=1,
+        show_default=True,
+        type=click.IntRange(min=1),
+        help=("Number of processes decompressing and parsing source files "
+              "in parallel. Each one holds a whole file in memory."),
+    )
+    @click.option(
+        "-i",
+        "--item",
+        help="Optional HREF for a STAC Item describing the dataset.",
+    )
+    @validate_option
+    @schema_dir_option
+    @offline_option
+    @profile_option
+    def convert_command(source: str, destination: str,
+                        stations: Optional[str], partition_element: bool,
+                        chunksize: int, workers: int, item: Optional[str],
+                        validate_mode: str, schema_dir: Optional[str],
+                        offline: bool, profile: Optional[str]):
+        """Convert the data asset to partitioned GeoParquet
+
+        Args:
+            source (str): HREF of the merged data/station CSV, or of the
+                by_year files
+            destination (str): HREF of the output dataset directory
+            stations (str, optional): HREF of ghcnd-stations.txt to join the
+                by_year files with
+            partition_element (bool): Partition by ELEMENT as well as by year
+            chunksize (int): Number of CSV rows held in memory at once
+            workers (int): Number of processes reading source files
+            item (str, optional): HREF for a STAC Item describing the dataset
+            validate_mode (str): "full" or "sample" validate the Item, "none"
+                nothing
+            schema_dir (str, optional): Local directory of cached schemas
+            offline (bool): Never download schemas missing from schema_dir
+            profile (str, optional): HREF for a timing report
+        """
+        _use_schema_cache(schema_dir, offline)
+        sources = stac.expand_sources(source)
+        if not sources:
+            raise click.BadParameter(f"No data assets found at {source}",
+                                     param_hint="--source")
+        with _profiled(profile):
+            with span("convert", href=source):
+                parquet.convert_to_parquet(
+                    sources,
+                    destination,
+                    partition_by_element=partition_element,
+                    chunksize=chunksize,
+                    workers=workers,
+                    stations=stations)
+            if item is not None:
+                with span("create_item", href=destination):
+                    stac_item = stac.create_item(destination)
+                with span("save"):
+                    stac_item.save_object(dest_href=item)
+                if validate_mode != "none":
+                    with span("validate"):
+                        validation.validate_dict(stac_item.to_dict())
+
+        return None
+
+    @ghcnd.command(
+        "apply-diff",
+        short_help="Apply a superghcnd diff to the GeoParquet dataset")
+    @click.option(
+        "-s",
+        "--source",
+        required=True,
+        help=("HREF of a superghcnd_diff_*.tar.gz file, or a directory of "
+              "its insert.csv, update.csv and delete.csv."),
+    )
+    @click.option(
+        "-d",
+        "--destination",
+        required=True,
+        help="HREF of the GeoParquet dataset directory, see convert.",
+    )
+    @click.option(
+        "--stations",
+        default=STATIONS_URL,
+        show_default=True,
+        help="HREF of ghcnd-stations.txt.",
+    )
+    @click.option(
+        "-i",
+        "--item",
+        "items",
+        multiple=True,
+        help=("HREF of a STAC Item of the dataset or of a year partition, "
+              "updated if its data asset changed. May be repeated."),
+    )
+    @click.option(
+        "--cache-dir",
+        help="Directory of a cache of the parsed stations file.",
+    )
+    @profile_option
+    def apply_diff_command(source: str, destination: str, stations: str,
+                           items: Tuple[str, ...], cache_dir: Optional[str],
+                           profile: Optional[str]):
+        """Apply a superghcnd diff to the GeoParquet dataset, rewriting the
+        changed year partitions only
+
+        Args:
+            source (str): HREF of the diff
+            destination (str): HREF of the dataset directory
+            stations (str): HREF of ghcnd-stations.txt
+            items (Tuple[str, ...]): HREFs of Items of the dataset
+            cache_dir (str, optional): Directory of the stations cache
+            profile (str, optional): HREF for a timing report
+        """
+        with _profiled(profile):
+            with span("apply_diff", href=source):
+                changes = diff.apply_diff(source,
+                                          destination,
+                                          stations_href=stations,
+                                          cache=_asset_cache(cache_dir, None))
+            with span("update_items", count=len(items)):
+                updated = diff.update_items(items, destination, changes)
+        click.echo(f"Rewrote {len(changes)} year partitions of {destination} "
+                   f"and updated {len(updated)} items")
+
+        return None
+
+    @ghcnd.command(
+        "convert-zarr",
+        short_help="Convert the data asset to a Zarr datacube")
+    @click.option(
+        "-s",
+        "--source",
+        required=True,
+        help="HREF of the data asset, e.g. a by_year or merged CSV file.",
+    )
+    @click.option(
+        "-d",
+        "--destination",
+        required=True,
+        help="HREF of the output Zarr store.",
+    )
+    @click.option(
+        "-e",
+        "--element",
+        "elements",
+        multiple=True,
+        help="Element of the datacube. Defaults to all elements present.",
+    )
+    @click.option(
+        "--stations",
+        "stations_href",
+        help=("HREF of ghcnd-stations.txt, to add the latitude, longitude "
+              "and elevation of each station."),
+    )
+    @click.option(
+        "--station-chunk",
+        default=8,
+        show_default=True,
+        type=click.IntRange(min=1),
+        help="Number of stations per chunk.",
+    )
+    @click.option(
+        "--time-chunk",
+        default=36525,
+        show_default=True,
+        type=click.IntRange(min=1),
+        help="Number of days per chunk.",
+    )
+    @click.option(
+        "--cache-dir",
+        help=("Directory of the columnar observation cache of the source, "
+              "reused while the source is unchanged."),
+    )
+    @click.option(
+        "-i",
+        "--item",
+        help="Optional HREF for a STAC Item describing the datacube.",
+    )
+    @validate_option
+    @schema_dir_option
+    @offline_option
+    @profile_option
+    def convert_zarr_command(source: str, destination: str,
+                             elements: Tuple[str, ...],
+                             stations_href: Optional[str],
+                             station_chunk: int, time_chunk: int,
+                             cache_dir: Optional[str], item: Optional[str],
+                             validate_mode: str, schema_dir: Optional[str],
+                             offline: bool, profile: Optional[str]):
+        """Convert the data asset to a Zarr datacube, see datacube.py
+
+        Requires the zarr extra.
+
+        Args:
+            source (str): HREF of the data asset
+            destination (str): HREF of the output Zarr store
+            elements (Tuple[str, ...]): Elements of the datacube, all
+                present if empty
+            stations_href (str, optional): HREF of ghcnd-stations.txt
+            station_chunk (int): Number of stations per chunk
+            time_chunk (int): Number of days per chunk
+            cache_dir (str, optional): Directory of the observation cache
+            item (str, optional): HREF for a STAC Item describing the
+                datacube
+            validate_mode (str): "full" or "sample" validate the Item, "none"
+                nothing
+            schema_dir (str, optional): Local directory of cached schemas
+            offline (bool): Never download schemas missing from schema_dir
+            profile (str, optional): HREF for a timing report
+        """
+        from stactools.ghcnd import datacube
+
+        _use_schema_cache(schema_dir, offline)
+
+        with _profiled(profile):
+            with span("convert_zarr", href=source):
+                datacube.convert_to_datacube(source,
+                                             destination,
+                                             cache_dir=cache_dir,
+                                             elements=elements or None,
+                                             stations_href=stations_href,
+                                             station_chunk=station_chunk,
+                                             time_chunk=time_chunk)
+            if item is not None:
+                with span("create_item", href=destination):
+                    stac_item = datacube.create_datacube_item(destination)
+                with span("save"):
+                    stac_item.save_object(dest_href=item)
+                if validate_mode != "none":
+                    with span("validate"):
+                        validation.validate_dict(stac_item.to_dict())
+
+        return None
+
+    @ghcnd.command(
+        "build-index",
+        short_help="Index the byte ranges of each station and year")
+    @click.option(
+        "-s",
+        "--source",
+        required=True,
+        help="HREF of the uncompressed merged data/station CSV.",
+    )
+    @click.option(
+        "-d",
+        "--destination",
+        help=("HREF of the index. Defaults to the source HREF plus "
+              f"{index.INDEX_SUFFIX}."),
+    )
+    @profile_option
+    def build_index_command(source: str, destination: Optional[str],
+                            profile: Optional[str]):
+        """Index the byte ranges of each station and year of the data asset
+
+        Args:
+            source (str): HREF of the merged data/station CSV
+            destination (str, optional): HREF of the index
+            profile (str, optional): HREF for a timing report
+        """
+        with _profiled(profile):
+            with span("build_index", href=source):
+                index_href = index.build_index(source, destination)
+        click.echo(f"Wrote index {index_href}")
+
+        return None
+
+    @ghcnd.command(
+        "fetch-schemas",
+        short_help="Download the JSON schemas needed for offline validation")
+    @click.option(
+        "-d",
+        "--destination",
+        required=True,
+        help="Local directory for the schemas, used as --schema-dir.",
+    )
+    def fetch_schemas_command(destination: str):
+        """Download the JSON schemas used by GHCNd STAC objects, and every
+        schema they reference
+
+        Args:
+            destination (str): Local directory for the schemas
+        """
+        schema_cache = validation.SchemaCache(destination)
+        uris = schema_cache.preload(validation.schema_uris())
+        click.echo(f"Stored {len(uris)} schemas in {destination}")
 
         return None
 
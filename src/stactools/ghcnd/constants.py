@@ -1,6 +1,7 @@
 # flake8: noqa
 
 from datetime import datetime
+from functools import lru_cache
 from typing import Any, Dict, List
 
 from pyproj import CRS
@@ -8,7 +9,6 @@ from pystac import Link, Provider, ProviderRole
 
 GHCND_ID = "ghcnd"
 GHCND_EPSG = 4326
-GHCND_CRS = CRS.from_epsg(GHCND_EPSG)
 GHCND_EXTENT = [-180., 90., 180., -90.]
 GHCND_TITLE = "Global Historical Climatology Network daily"
 GHCND_DESCRIPTION = "The Global Historical Climatology Network daily (GHCNd) is an integrated database of daily climate summaries from land surface stations across the globe. GHCNd is made up of daily climate records from numerous sources that have been integrated and subjected to a common suite of quality assurance reviews."
@@ -20,11 +20,28 @@ LICENSE_LINK = Link(
     title="Attribution 4.0 International (CC BY 4.0)",
 )
 
+
+@lru_cache(maxsize=None)
+def ghcnd_crs() -> CRS:
+    """The GHCNd CRS, created on first use as building it from the EPSG
+    database is slow"""
+    return CRS.from_epsg(GHCND_EPSG)
+
+
+def __getattr__(name: str) -> Any:
+    # GHCND_CRS is kept for backwards compatibility, but created lazily
+    if name == "GHCND_CRS":
+        return ghcnd_crs()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 HOMEPAGE_URL = "https://www.ncei.noaa.gov/metadata/geoportal/rest/metadata/item/gov.noaa.ncdc:C00861/html"
 METADATA_URL = "https://www1.ncdc.noaa.gov/pub/data/ghcn/daily/readme.txt"
 ADDITIONAL_METADATA_URL = "https://www1.ncdc.noaa.gov/pub/data/ghcn/daily/by_year/readme-by_year.txt"
 STATIONS_URL = "https://www1.ncdc.noaa.gov/pub/data/ghcn/daily/ghcnd-stations.txt"
+INVENTORY_URL = "https://www1.ncdc.noaa.gov/pub/data/ghcn/daily/ghcnd-inventory.txt"
 YEARS_URL = "https://www1.ncdc.noaa.gov/pub/data/ghcn/daily/by_year/"
+STATIONS_DATA_URL = "https://www1.ncdc.noaa.gov/pub/data/ghcn/daily/by_station/"
 
 PROVIDERS = [
     Provider(name="NOAA",
@@ -37,6 +54,8 @@ PROVIDERS = [
              url=HOMEPAGE_URL),
 ]
 
+PARQUET_MEDIA_TYPE = "application/x-parquet"
+
 KEYWORDS = ["NOAA", "ghcnd", "GHCNd", "GHCN-Daily"]
 
 TEMPORAL_EXTENT: List[Any] = [
@@ -127,6 +146,32 @@ STATION_TABLE_COLUMNS = [{
     "type": "str"
 }]
 
+INVENTORY_TABLE_COLUMNS = [{
+    "name": "ID",
+    "description": "11 character station identification code.",
+    "type": "str"
+}, {
+    "name": "LATITUDE",
+    "description": "Latitude of the station (in decimal degrees).",
+    "type": "float"
+}, {
+    "name": "LONGITUDE",
+    "description": "Longitude of the station (in decimal degrees).",
+    "type": "float"
+}, {
+    "name": "ELEMENT",
+    "description": "4 character indicator of element type.",
+    "type": "str"
+}, {
+    "name": "FIRSTYEAR",
+    "description": "First year of unflagged data for the given element.",
+    "type": "int"
+}, {
+    "name": "LASTYEAR",
+    "description": "Last year of unflagged data for the given element.",
+    "type": "int"
+}]
+
 PRIMARY_GEOMETRY_COLUMN = {
     "name": "geometry",
     "description": "Location of measurement.",
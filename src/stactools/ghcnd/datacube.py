@@ -0,0 +1,350 @@
+import logging
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import zarr
+from numcodecs import Blosc
+from pystac import Asset, Item
+from pystac.extensions.projection import ProjectionExtension
+from pystac.utils import datetime_to_str
+
+from stactools.ghcnd.cache import AssetCache
+from stactools.ghcnd.columnar import (
+    COLUMN_DTYPES,
+    NO_FLAG,
+    NO_OBS_TIME,
+    ObservationCache,
+    open_observation_cache,
+)
+from stactools.ghcnd.constants import (
+    CITATION,
+    DOI,
+    ELEMENTS_VALUES,
+    GHCND_EPSG,
+    SPATIAL_EXTENT,
+)
+from stactools.ghcnd.stac import bbox_to_geometry
+from stactools.ghcnd.stations import read_stations
+from stactools.ghcnd.timing import span
+
+logger = logging.getLogger(__name__)
+
+DATACUBE_EXTENSION_SCHEMA = "https://stac-extensions.github.io/datacube/v2.1.0/schema.json"
+SCIENTIFIC_EXTENSION_SCHEMA = "https://stac-extensions.github.io/scientific/v1.0.0/schema.json"
+ZARR_MEDIA_TYPE = "application/vnd+zarr"
+
+DIMENSIONS = ["station", "time", "element"]
+# One chunk holds about a century of daily values of a few stations and one
+# element, so a station's series of an element is read from a few chunks
+DEFAULT_STATION_CHUNK = 8
+DEFAULT_TIME_CHUNK = 36525
+MISSING_VALUE = -9999
+
+# Variables of the cube, from the columns of the observation cache
+VARIABLES: Dict[str, Dict[str, Any]] = {
+    "value": {
+        "fill_value": MISSING_VALUE,
+        "description": "Observed value, in the unit of the element",
+    },
+    "m_flag": {
+        "fill_value": NO_FLAG,
+        "description": "ASCII code of the Measurement Flag, 0 if blank",
+    },
+    "q_flag": {
+        "fill_value": NO_FLAG,
+        "description": "ASCII code of the Quality Flag, 0 if blank",
+    },
+    "s_flag": {
+        "fill_value": NO_FLAG,
+        "description": "ASCII code of the Source Flag, 0 if blank",
+    },
+    "obs_time": {
+        "fill_value": NO_OBS_TIME,
+        "description": "Observation time as HHMM, -1 if unknown",
+    },
+}
+STATION_VARIABLES = ["latitude", "longitude", "elevation"]
+
+
+def _compressor() -> Blosc:
+    return Blosc(cname="zstd", clevel=5, shuffle=Blosc.BITSHUFFLE)
+
+
+def date_to_days(dates: np.ndarray) -> np.ndarray:
+    """Convert YYYYMMDD integers to days since 1970-01-01"""
+    dates = dates.astype(np.int64)
+    months = ((dates // 10000 - 1970) * 12 + dates // 100 % 100 - 1)
+    first_days = months.astype("M8[M]").astype("M8[D]").astype(np.int64)
+    return first_days + dates % 100 - 1
+
+
+def _days_to_datetime(days: int) -> datetime:
+    return datetime(1970, 1, 1, tzinfo=timezone.utc) + timedelta(days=days)
+
+
+def write_datacube(observations: ObservationCache,
+                   destination: str,
+                   elements: Optional[Sequence[str]] = None,
+                   stations: Optional[Dict[str, Dict[str, Any]]] = None,
+                   station_chunk: int = DEFAULT_STATION_CHUNK,
+                   time_chunk: int = DEFAULT_TIME_CHUNK) -> str:
+    """Write observations into a Zarr datacube with dimensions station,
+    time and element
+
+    The value, each flag (as uint8 ASCII codes) and the observation time are
+    separate arrays, chunked along time and compressed. Observations are
+    sorted by station once and written one block of station_chunk stations
+    at a time, so memory use depends on the chunk size and number of days,
+    not on the number of observations.
+
+    Args:
+        observations (ObservationCache): The observations, see
+            columnar.open_observation_cache
+        destination (str): HREF of the Zarr store
+        elements (Sequence[str], optional): Elements of the cube, by default
+            those present in the observations
+        stations (Dict[str, Dict[str, Any]], optional): Station table rows
+            by ID, see stations.read_stations, to add station coordinates
+        station_chunk (int): Number of stations per chunk
+        time_chunk (int): Number of days per chunk
+
+    Returns:
+        str: The destination HREF
+    """
+    if len(observations) == 0:
+        raise ValueError("Cannot write a datacube without observations")
+    station_column = observations["station"]
+    element_column = observations["element"]
+    if elements is None:
+        present = np.bincount(element_column,
+                              minlength=len(observations.elements))
+        elements = [
+            element for code, element in enumerate(observations.elements)
+            if present[code]
+        ]
+    # Cube element index of each element code, -1 if not in the cube
+    element_index = np.full(len(observations.elements), -1, dtype=np.int64)
+    for n, element in enumerate(elements):
+        code = observations.element_code(element)
+        if code >= 0:
+            element_index[code] = n
+
+    with span("sort_observations"):
+        days = date_to_days(observations["date"])
+        first_day = int(days.min())
+        day_count = int(days.max()) - first_day + 1
+        order = np.argsort(station_column, kind="stable")
+        bounds = np.searchsorted(station_column[order],
+                                 np.arange(len(observations.stations) + 1))
+
+    shape = (len(observations.stations), day_count, len(elements))
+    chunks = (station_chunk, min(time_chunk, day_count), 1)
+    root = zarr.open_group(destination, mode="w")
+    start = _days_to_datetime(first_day)
+    root.attrs.update({
+        "title": "GHCNd",
+        "source": observations.meta["source"],
+        "sci:doi": DOI,
+    })
+    arrays = {}
+    for name, variable in VARIABLES.items():
+        array = root.create_dataset(name,
+                                    shape=shape,
+                                    chunks=chunks,
+                                    dtype=COLUMN_DTYPES[name],
+                                    fill_value=variable["fill_value"],
+                                    compressor=_compressor())
+        array.attrs.update({
+            "_ARRAY_DIMENSIONS": DIMENSIONS,
+            "description": variable["description"],
+        })
+        arrays[name] = array
+
+    station_ids = np.array(observations.stations, dtype="U11")
+    coordinates = {
+        "station": station_ids,
+        "time": np.arange(day_count, dtype=np.int32),
+        "element": np.array(elements, dtype="U4"),
+    }
+    for name, values in coordinates.items():
+        array = root.create_dataset(name, data=values, chunks=values.shape)
+        array.attrs["_ARRAY_DIMENSIONS"] = [name]
+    root["time"].attrs.update({
+        "units": f"days since {start:%Y-%m-%d}",
+        "calendar": "proleptic_gregorian",
+    })
+    if stations is not None:
+        for name in STATION_VARIABLES:
+            # Blank values are None, stored as NaN
+            values = np.array([
+                stations.get(station, {}).get(name.upper())
+                for station in observations.stations
+            ], dtype=np.float64)
+            array = root.create_dataset(name, data=values)
+            array.attrs["_ARRAY_DIMENSIONS"] = ["station"]
+
+    with span("write_datacube", stations=shape[0], days=shape[1]):
+        for block_start in range(0, shape[0], station_chunk):
+            block_end = min(block_start + station_chunk, shape[0])
+            rows = order[bounds[block_start]:bounds[block_end]]
+            cube_elements = element_index[element_column[rows]]
+            rows = rows[cube_elements >= 0]
+            index = (station_column[rows] - block_start,
+                     days[rows] - first_day,
+                     cube_elements[cube_elements >= 0])
+            block_shape = (block_end - block_start, ) + shape[1:]
+            for name, array in arrays.items():
+                block = np.full(block_shape,
+                                VARIABLES[name]["fill_value"],
+                                dtype=COLUMN_DTYPES[name])
+                block[index] = observations[name][rows]
+                array[block_start:block_end] = block
+
+    zarr.consolidate_metadata(destination)
+    logger.info(f"Wrote a {shape} datacube to {destination}")
+    return destination
+
+
+def convert_to_datacube(href: str,
+                        destination: str,
+                        cache_dir: Optional[str] = None,
+                        elements: Optional[Sequence[str]] = None,
+                        stations_href: Optional[str] = None,
+                        station_chunk: int = DEFAULT_STATION_CHUNK,
+                        time_chunk: int = DEFAULT_TIME_CHUNK) -> str:
+    """Convert a data asset to a Zarr datacube
+
+    Args:
+        href (str): HREF of the data asset
+        destination (str): HREF of the Zarr store
+        cache_dir (str, optional): Directory of the observation cache of the
+            asset, reused if current. A temporary directory by default.
+        elements (Sequence[str], optional): Elements of the cube
+        stations_href (str, optional): HREF of ghcnd-stations.txt, to add
+            station coordinates
+        station_chunk (int): Number of stations per chunk
+        time_chunk (int): Number of days per chunk
+
+    Returns:
+        str: The destination HREF
+    """
+    stations = None
+    if stations_href is not None:
+        cache = None
+        if cache_dir is not None:
+            cache = AssetCache(os.path.join(cache_dir, "tables"))
+        stations = {
+            station["ID"]: station
+            for station in read_stations(stations_href, cache)
+        }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        observations = open_observation_cache(href, cache_dir or tmp_dir)
+        return write_datacube(observations,
+                              destination,
+                              elements=elements,
+                              stations=stations,
+                              station_chunk=station_chunk,
+                              time_chunk=time_chunk)
+
+
+def create_datacube_item(href: str, item_id: str = "GHCNd-datacube") -> Item:
+    """Create a STAC Item for a Zarr datacube, described with the datacube
+    extension
+
+    Args:
+        href (str): HREF of a Zarr store written by write_datacube
+        item_id (str): ID of the Item
+
+    Returns:
+        Item: STAC Item object
+    """
+    root = zarr.open_consolidated(href, mode="r")
+    time = root["time"]
+    start = datetime.strptime(time.attrs["units"],
+                              "days since %Y-%m-%d").replace(
+                                  tzinfo=timezone.utc)
+    end = start + timedelta(days=time.shape[0] - 1, hours=23, minutes=59,
+                            seconds=59)
+    elements: List[str] = [str(e) for e in root["element"][:]]
+
+    bbox = SPATIAL_EXTENT
+    if "longitude" in root:
+        longitude = root["longitude"][:]
+        latitude = root["latitude"][:]
+        located = ~(np.isnan(longitude) | np.isnan(latitude))
+        if located.any():
+            bbox = [
+                float(longitude[located].min()),
+                float(latitude[located].min()),
+                float(longitude[located].max()),
+                float(latitude[located].max()),
+            ]
+
+    dimensions: Dict[str, Any] = {
+        "station": {
+            "type": "station",
+            "description": "GHCNd station, see the station variable",
+            "extent": [0, root["station"].shape[0] - 1],
+        },
+        "time": {
+            "type": "temporal",
+            "extent": [datetime_to_str(start),
+                       datetime_to_str(end)],
+            "step": "P1D",
+        },
+        "element": {
+            "type": "element",
+            "description": "GHCNd element code",
+            "values": elements,
+        },
+    }
+    variables: Dict[str, Any] = {
+        name: {
+            "dimensions": DIMENSIONS,
+            "type": "data",
+            "description": variable["description"],
+        }
+        for name, variable in VARIABLES.items()
+    }
+    variables["value"]["description"] += ": " + "; ".join(
+        f"{element}: {ELEMENTS_VALUES[element]}" for element in elements
+        if element in ELEMENTS_VALUES)
+    for name in STATION_VARIABLES:
+        if name in root:
+            variables[name] = {
+                "dimensions": ["station"],
+                "type": "auxiliary",
+                "description": f"Station {name}",
+            }
+
+    geometry = bbox_to_geometry(bbox)
+    item = Item(id=item_id,
+                geometry=geometry,
+                bbox=bbox,
+                datetime=start,
+                properties={
+                    "title": "GHCNd datacube",
+                    "description":
+                    "Global Historical Climate Network-daily observations "
+                    "by station, date and element",
+                    "start_datetime": datetime_to_str(start),
+                    "end_datetime": datetime_to_str(end),
+                    "cube:dimensions": dimensions,
+                    "cube:variables": variables,
+                    "sci:doi": DOI,
+                    "sci:citation": CITATION,
+                },
+                stac_extensions=[
+                    DATACUBE_EXTENSION_SCHEMA,
+                    SCIENTIFIC_EXTENSION_SCHEMA,
+                ])
+    asset = Asset(href=href,
+                  media_type=ZARR_MEDIA_TYPE,
+                  roles=["data"],
+                  title="GHCNd datacube")
+    item.add_asset("data", asset)
+    ProjectionExtension.ext(asset, add_if_missing=True).epsg = GHCND_EPSG
+    return item
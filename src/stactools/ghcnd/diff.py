@@ -0,0 +1,359 @@
+import io
+import json
+import logging
+import os
+import tarfile
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import fsspec
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from pystac.utils import datetime_to_str, make_absolute_href, str_to_datetime
+
+from stactools.ghcnd.cache import AssetCache
+from stactools.ghcnd.checksum import read_file_info
+from stactools.ghcnd.constants import STATIONS_URL
+from stactools.ghcnd.merge import DATA_COLUMNS, merge_chunk, station_table
+from stactools.ghcnd.parquet import (
+    ELEMENT_PARTITION_COLUMN,
+    YEAR_PARTITION_COLUMN,
+    _read_options,
+    arrow_schema,
+    chunk_to_table,
+)
+from stactools.ghcnd.serialize import dumps
+from stactools.ghcnd.station_table import StationTable
+from stactools.ghcnd.timing import span
+
+logger = logging.getLogger(__name__)
+
+# Sets of a superghcnd_diff_*.tar.gz file, each a headerless CSV of rows in
+# the by_year format
+DIFF_SETS = ["insert", "update", "delete"]
+KEY_COLUMNS = ["ID", "YEAR/MONTH/DAY", "ELEMENT"]
+KEY_SEPARATOR = "|"
+TMP_DIR_NAME = ".apply-diff"
+# Scan fields of the data asset that cannot be updated from a diff
+STALE_ASSET_FIELDS = ["ghcnd:flag_counts", "ghcnd:element_statistics"]
+
+
+@dataclass
+class PartitionChange:
+    """Change of one year partition of the Parquet store"""
+    year: int
+    rows_removed: int = 0
+    rows_added: int = 0
+    element_counts: Dict[str, int] = field(default_factory=dict)
+    first_date: Optional[str] = None
+    last_date: Optional[str] = None
+
+    @property
+    def row_delta(self) -> int:
+        return self.rows_added - self.rows_removed
+
+
+def read_diff(href: str) -> Dict[str, pd.DataFrame]:
+    """Read the insert, update and delete sets of a superghcnd diff
+
+    Args:
+        href (str): HREF of a superghcnd_diff_*.tar.gz file, or of a
+            directory of insert.csv, update.csv and delete.csv
+
+    Returns:
+        Dict[str, pd.DataFrame]: Rows of each set with the DATA_COLUMNS, as
+            text, empty for sets missing from the diff
+    """
+    fs, _, (path, ) = fsspec.get_fs_token_paths(href)
+    contents: Dict[str, bytes] = {}
+    if fs.isdir(path):
+        for name in DIFF_SETS:
+            set_path = f"{path}/{name}.csv"
+            if fs.exists(set_path):
+                contents[name] = fs.cat_file(set_path)
+    else:
+        with fs.open(path) as file, tarfile.open(fileobj=file,
+                                                 mode="r:*") as archive:
+            for member in archive:
+                name, extension = os.path.splitext(
+                    os.path.basename(member.name))
+                if member.isfile() and extension == ".csv" \
+                        and name in DIFF_SETS:
+                    extracted = archive.extractfile(member)
+                    assert extracted is not None
+                    contents[name] = extracted.read()
+
+    frames = {}
+    for name in DIFF_SETS:
+        if contents.get(name):
+            frames[name] = pd.read_csv(io.BytesIO(contents[name]),
+                                       header=None,
+                                       names=DATA_COLUMNS,
+                                       dtype=str,
+                                       keep_default_na=False)
+        else:
+            frames[name] = pd.DataFrame(columns=DATA_COLUMNS, dtype=str)
+    return frames
+
+
+def _keys(table: Any) -> pa.Array:
+    """Key of each row, joining KEY_COLUMNS"""
+    return pc.binary_join_element_wise(
+        *(table.column(name) for name in KEY_COLUMNS), KEY_SEPARATOR)
+
+
+def _additions(frames: Dict[str, pd.DataFrame], stations: StationTable,
+               schema: pa.Schema) -> pa.Table:
+    """Inserted and updated rows joined with the station table, typed as
+    the rows written by convert_to_parquet"""
+    rows = pd.concat([frames["insert"], frames["update"]], ignore_index=True)
+    merged = merge_chunk(rows, stations)
+    # Parse the merged rows exactly as convert_to_parquet parses the merged
+    # CSV
+    text = io.StringIO(merged.to_csv(index=False))
+    return chunk_to_table(pd.read_csv(text, **_read_options()), schema)
+
+
+def _partition_columns(fs: fsspec.AbstractFileSystem,
+                       path: str) -> List[str]:
+    """Partition columns of an existing store, see convert_to_parquet"""
+    for year_path in fs.ls(path, detail=False):
+        if os.path.basename(year_path).startswith(f"{YEAR_PARTITION_COLUMN}="):
+            for child in fs.ls(year_path, detail=False):
+                if os.path.basename(child).startswith(
+                        f"{ELEMENT_PARTITION_COLUMN}="):
+                    return [YEAR_PARTITION_COLUMN, ELEMENT_PARTITION_COLUMN]
+            break
+    return [YEAR_PARTITION_COLUMN]
+
+
+def partition_path(path: str, year: int) -> str:
+    """Path of the directory of a year partition of the store"""
+    return f"{path.rstrip('/')}/{YEAR_PARTITION_COLUMN}={year}"
+
+
+def _count(change: PartitionChange, elements: pa.Array, sign: int) -> None:
+    for entry in pc.value_counts(elements).to_pylist():
+        element = entry["values"]
+        change.element_counts[element] = change.element_counts.get(
+            element, 0) + sign * entry["counts"]
+
+
+def apply_diff(diff_href: str,
+               destination: str,
+               stations_href: str = STATIONS_URL,
+               cache: Optional[AssetCache] = None) -> List[PartitionChange]:
+    """Apply a superghcnd diff to a Parquet store written by
+    convert_to_parquet
+
+    Only the year partitions with changed rows are read and rewritten; the
+    others are not touched. Rows of each partition are streamed in batches,
+    the rows deleted, updated or inserted by the diff are dropped by key
+    (ID, date and ELEMENT), and the updated and inserted rows are appended.
+    The new partition is written next to the store and swapped in once
+    complete. Applying the same diff again leaves the store unchanged.
+
+    Args:
+        diff_href (str): HREF of the diff, see read_diff()
+        destination (str): HREF of the Parquet store
+        stations_href (str): HREF of ghcnd-stations.txt, for the station
+            columns of inserted and updated rows
+        cache (AssetCache, optional): Cache of the parsed stations file
+
+    Returns:
+        List[PartitionChange]: Changes of the rewritten partitions, by year
+    """
+    with span("read_diff", href=diff_href):
+        frames = read_diff(diff_href)
+    schema = arrow_schema()
+    with span("read_stations", href=stations_href):
+        stations = station_table(stations_href, cache)
+    additions = _additions(frames, stations, schema)
+    diff_keys = pa.table({
+        name: pa.array(pd.concat([frame[name] for frame in frames.values()]),
+                       type=pa.string())
+        for name in KEY_COLUMNS
+    })
+    removed_keys = _keys(diff_keys).unique()
+
+    years = sorted(
+        {int(date[:4])
+         for frame in frames.values() for date in frame["YEAR/MONTH/DAY"]})
+    fs, _, (path, ) = fsspec.get_fs_token_paths(destination)
+    partition_columns = _partition_columns(fs, path)
+    partitioning = ds.partitioning(
+        pa.schema([schema.field(name) for name in partition_columns]),
+        flavor="hive")
+    dataset = ds.dataset(path,
+                         schema=schema,
+                         format="parquet",
+                         partitioning=partitioning,
+                         filesystem=fs)
+    tmp_path = f"{path}/{TMP_DIR_NAME}"
+    if fs.exists(tmp_path):
+        fs.rm(tmp_path, recursive=True)
+
+    changes = []
+    for year in years:
+        change = PartitionChange(year)
+        added = additions.filter(
+            pc.equal(additions.column(YEAR_PARTITION_COLUMN), year))
+        if added.num_rows:
+            dates = added.column("YEAR/MONTH/DAY").to_pylist()
+            change.rows_added = added.num_rows
+            change.first_date = min(dates)
+            change.last_date = max(dates)
+            _count(change, added.column("ELEMENT"), 1)
+
+        def batches() -> Iterator[pa.RecordBatch]:
+            for batch in dataset.to_batches(
+                    filter=ds.field(YEAR_PARTITION_COLUMN) == year):
+                removed = pc.is_in(_keys(batch), value_set=removed_keys)
+                change.rows_removed += pc.sum(removed).as_py() or 0
+                _count(change, batch.column("ELEMENT").filter(removed), -1)
+                yield batch.filter(pc.invert(removed))
+            yield from added.to_batches()
+
+        with span("rewrite_partition", year=year):
+            ds.write_dataset(batches(),
+                             tmp_path,
+                             schema=schema,
+                             format="parquet",
+                             partitioning=partitioning,
+                             basename_template=f"diff-{year}-{{i}}.parquet",
+                             filesystem=fs,
+                             existing_data_behavior="overwrite_or_ignore")
+            new_path = partition_path(tmp_path, year)
+            old_path = partition_path(path, year)
+            if fs.exists(old_path):
+                fs.rm(old_path, recursive=True)
+            if fs.exists(new_path):
+                fs.mv(new_path, old_path, recursive=True)
+        change.element_counts = {
+            element: count
+            for element, count in change.element_counts.items() if count
+        }
+        logger.info(f"Rewrote {old_path}: {change.rows_removed} rows "
+                    f"removed, {change.rows_added} added")
+        changes.append(change)
+    if fs.exists(tmp_path):
+        fs.rm(tmp_path, recursive=True)
+    return changes
+
+
+def _date_to_datetime(date: str, end_of_day: bool = False) -> datetime:
+    value = datetime.strptime(date, "%Y%m%d").replace(tzinfo=timezone.utc)
+    if end_of_day:
+        value = value.replace(hour=23, minute=59, second=59)
+    return value
+
+
+def update_item_dict(item_dict: Dict[str, Any],
+                     changes: Iterable[PartitionChange],
+                     size: Optional[int] = None,
+                     checksum: Optional[str] = None) -> Dict[str, Any]:
+    """Update an Item of the store, or of a year partition, for changes
+    applied by apply_diff
+
+    The data asset gets the new size and checksum, the datetimes are
+    extended to the added rows, and row and ELEMENT counts are adjusted.
+    Per-flag counts and element statistics cannot be updated from a diff
+    and are removed.
+
+    Args:
+        item_dict (Dict[str, Any]): The Item, as a dict, updated in place
+        changes (Iterable[PartitionChange]): Changes of the partitions
+            covered by the Item
+        size (int, optional): New size of the data asset
+        checksum (str, optional): New multihash of the data asset, removed
+            if None
+
+    Returns:
+        Dict[str, Any]: The Item
+    """
+    changes = list(changes)
+    properties = item_dict["properties"]
+    data_asset = item_dict["assets"]["data"]
+    if size is not None:
+        data_asset["file:size"] = size
+    if checksum is not None:
+        data_asset["file:checksum"] = checksum
+    else:
+        data_asset.pop("file:checksum", None)
+
+    first_dates = [c.first_date for c in changes if c.first_date]
+    last_dates = [c.last_date for c in changes if c.last_date]
+    if first_dates and "start_datetime" in properties:
+        start = min(str_to_datetime(properties["start_datetime"]),
+                    _date_to_datetime(min(first_dates)))
+        properties["start_datetime"] = datetime_to_str(start)
+        properties["datetime"] = datetime_to_str(start)
+    if last_dates and "end_datetime" in properties:
+        end = max(str_to_datetime(properties["end_datetime"]),
+                  _date_to_datetime(max(last_dates), end_of_day=True))
+        properties["end_datetime"] = datetime_to_str(end)
+
+    row_delta = sum(change.row_delta for change in changes)
+    for fields in (properties, data_asset):
+        if "table:row_count" in fields:
+            fields["table:row_count"] += row_delta
+    if "ghcnd:element_counts" in data_asset:
+        counts = data_asset["ghcnd:element_counts"]
+        for change in changes:
+            for element, count in change.element_counts.items():
+                counts[element] = counts.get(element, 0) + count
+        data_asset["ghcnd:element_counts"] = {
+            element: count
+            for element, count in sorted(counts.items()) if count
+        }
+    for name in STALE_ASSET_FIELDS:
+        data_asset.pop(name, None)
+    return item_dict
+
+
+def update_items(item_hrefs: Iterable[str], destination: str,
+                 changes: List[PartitionChange]) -> List[str]:
+    """Update the Items affected by apply_diff, see update_item_dict()
+
+    An Item is affected if its data asset is the store, or a rewritten year
+    partition of it. Other Items are not written.
+
+    Args:
+        item_hrefs (Iterable[str]): HREFs of Item JSON files
+        destination (str): HREF of the Parquet store
+        changes (List[PartitionChange]): Changes returned by apply_diff
+
+    Returns:
+        List[str]: HREFs of the updated Items
+    """
+    store = make_absolute_href(destination).rstrip("/")
+    by_partition = {
+        partition_path(store, change.year): change
+        for change in changes
+    }
+    updated = []
+    for item_href in item_hrefs:
+        with fsspec.open(item_href) as file:
+            item_dict = json.load(file)
+        data_asset = item_dict.get("assets", {}).get("data")
+        if data_asset is None:
+            continue
+        asset_href = make_absolute_href(data_asset["href"],
+                                        item_href).rstrip("/")
+        if asset_href == store:
+            item_changes = changes
+        elif asset_href in by_partition:
+            item_changes = [by_partition[asset_href]]
+        else:
+            continue
+        with span("asset_file_info", href=asset_href):
+            info = read_file_info(asset_href)
+        update_item_dict(item_dict, item_changes, info.size, info.checksum)
+        # Compact like the rest of the Collection, see serialize.save_catalog
+        with fsspec.open(item_href, "wb") as file:
+            file.write(dumps(item_dict))
+        updated.append(item_href)
+    return updated
@@ -0,0 +1,277 @@
+import json
+import logging
+import os
+from itertools import islice
+from tempfile import TemporaryDirectory
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import fsspec
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pystac.utils import str_to_datetime
+from shapely.geometry import shape
+
+from stactools.ghcnd.parquet import GEOPARQUET_VERSION
+from stactools.ghcnd.timing import span
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ["ndjson", "geoparquet"]
+DEFAULT_BATCH_SIZE = 1000
+
+DATETIME_PROPERTIES = [
+    "datetime", "start_datetime", "end_datetime", "created", "updated"
+]
+GEOMETRY_FIELDS = ["proj:geometry"]
+# Fields mapping data dependent keys to values, stored as lists of structs
+# so every row has the same Arrow type: the names of the keys, one per level
+# of nesting, and the name of the value, or None to merge dict values into
+# the struct
+MAP_FIELDS: Dict[str, Tuple[Tuple[str, ...], Optional[str]]] = {
+    "ghcnd:element_counts": (("element", ), "count"),
+    "ghcnd:flag_counts": (("flag", "value"), "count"),
+    "ghcnd:element_statistics": (("element", ), None),
+}
+
+
+def export_format(href: str) -> str:
+    """The export format of an output HREF, from its extension
+
+    Args:
+        href (str): Output HREF, e.g. "items.ndjson.gz" or "items.parquet"
+
+    Returns:
+        str: "geoparquet" for .parquet and .geoparquet, otherwise "ndjson"
+    """
+    if os.path.splitext(href)[1] in (".parquet", ".geoparquet"):
+        return "geoparquet"
+    return "ndjson"
+
+
+def batched(iterable: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Split an iterable into lists of at most size elements"""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def with_collection(item_dicts: Iterable[Dict[str, Any]], collection_id: str,
+                    collection_href: str) -> Iterator[Dict[str, Any]]:
+    """Set the collection of Item dicts, as required for loading into a STAC
+    API database
+
+    Args:
+        item_dicts (Iterable[Dict[str, Any]]): The Items
+        collection_id (str): ID of the Collection
+        collection_href (str): HREF of the Collection, for the collection link
+
+    Returns:
+        Iterator[Dict[str, Any]]: The Items, with the collection field and
+            link set
+    """
+    for item_dict in item_dicts:
+        item_dict["collection"] = collection_id
+        item_dict["links"] = [
+            link for link in item_dict.get("links", [])
+            if link["rel"] != "collection"
+        ] + [{
+            "rel": "collection",
+            "href": collection_href,
+            "type": "application/json",
+        }]
+        yield item_dict
+
+
+def write_ndjson(item_dicts: Iterable[Dict[str, Any]],
+                 href: str,
+                 batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Stream Items to newline-delimited JSON
+
+    Args:
+        item_dicts (Iterable[Dict[str, Any]]): The Items, as dicts
+        href (str): Output HREF, compressed if it ends with e.g. ".gz"
+        batch_size (int): Number of Items written at once
+
+    Returns:
+        int: The number of Items written
+    """
+    count = 0
+    with fsspec.open(href, "w", compression="infer") as file:
+        for batch in batched(item_dicts, batch_size):
+            with span("write_batch", count=len(batch)):
+                file.write("".join(
+                    json.dumps(item_dict, separators=(",", ":")) + "\n"
+                    for item_dict in batch))
+            count += len(batch)
+    return count
+
+
+def _map_rows(value: Dict[str, Any], key_names: Tuple[str, ...],
+              value_name: Optional[str]) -> List[Dict[str, Any]]:
+    """Flatten a (nested) mapping into rows, see MAP_FIELDS"""
+    rows: List[Dict[str, Any]] = []
+    for key, inner in value.items():
+        if len(key_names) > 1:
+            rows.extend({
+                key_names[0]: key,
+                **row
+            } for row in _map_rows(inner, key_names[1:], value_name))
+        elif value_name is None:
+            rows.append({key_names[0]: key, **inner})
+        else:
+            rows.append({key_names[0]: key, value_name: inner})
+    return rows
+
+
+def _arrow_fields(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert the geometry and map fields of properties or an asset"""
+    converted = {}
+    for key, value in fields.items():
+        if key in GEOMETRY_FIELDS and value is not None:
+            value = shape(value).wkb
+        elif key in MAP_FIELDS and value is not None:
+            value = _map_rows(value, *MAP_FIELDS[key])
+        converted[key] = value
+    return converted
+
+
+def item_to_record(item_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert an Item dict to a stac-geoparquet row
+
+    Properties become top-level columns, geometries are WKB, the bbox is a
+    struct and datetimes are timestamps.
+
+    Args:
+        item_dict (Dict[str, Any]): The Item
+
+    Returns:
+        Dict[str, Any]: The row
+    """
+    record = {
+        key: value
+        for key, value in item_dict.items()
+        if key not in ("properties", "geometry", "bbox", "assets")
+    }
+    geometry = item_dict.get("geometry")
+    record["geometry"] = None if geometry is None else shape(geometry).wkb
+    bbox = item_dict.get("bbox")
+    if bbox is not None:
+        record["bbox"] = dict(zip(("xmin", "ymin", "xmax", "ymax"), bbox))
+    record["assets"] = {
+        key: _arrow_fields(asset)
+        for key, asset in item_dict.get("assets", {}).items()
+    }
+    for key, value in _arrow_fields(item_dict["properties"]).items():
+        if key in DATETIME_PROPERTIES and value is not None:
+            value = str_to_datetime(value)
+        record[key] = value
+    return record
+
+
+def _geo_metadata() -> Dict[bytes, bytes]:
+    geo = {
+        "version": GEOPARQUET_VERSION,
+        "primary_column": "geometry",
+        "columns": {
+            "geometry": {
+                "encoding": "WKB",
+                "geometry_type": ["Point", "Polygon"],
+            }
+        },
+    }
+    return {b"geo": json.dumps(geo).encode("utf-8")}
+
+
+def _unify_schemas(schemas: List[pa.Schema]) -> pa.Schema:
+    """Unify batch schemas, promoting null and compatible types"""
+    try:
+        return pa.unify_schemas(schemas, promote_options="permissive")
+    except TypeError:
+        # pyarrow < 14 only promotes null fields
+        return pa.unify_schemas(schemas)
+
+
+def write_geoparquet(item_dicts: Iterable[Dict[str, Any]],
+                     href: str,
+                     batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Stream Items to a stac-geoparquet file
+
+    Each batch is written as one row group. Batches are first spooled to
+    local temporary files, so the schema is the union of the fields of all
+    Items, e.g. properties missing or always null in the first batch, then
+    rewritten with that schema.
+
+    Args:
+        item_dicts (Iterable[Dict[str, Any]]): The Items, as dicts
+        href (str): Output HREF
+        batch_size (int): Number of Items per row group
+
+    Returns:
+        int: The number of Items written
+    """
+    count = 0
+    with TemporaryDirectory() as tmp_dir:
+        paths: List[str] = []
+        schemas: List[pa.Schema] = []
+        for batch in batched(item_dicts, batch_size):
+            with span("spool_batch", count=len(batch)):
+                table = pa.Table.from_pylist(
+                    [item_to_record(d) for d in batch])
+                path = os.path.join(tmp_dir, f"{len(paths)}.parquet")
+                pq.write_table(table, path)
+            paths.append(path)
+            schemas.append(table.schema)
+            count += len(batch)
+        if not paths:
+            # No Items, so there is no schema to write
+            with fsspec.open(href, "wb"):
+                pass
+            return count
+
+        schema = _unify_schemas(schemas).with_metadata(_geo_metadata())
+        with fsspec.open(href, "wb") as file:
+            with pq.ParquetWriter(file, schema) as writer:
+                for path in paths:
+                    with span("write_batch"):
+                        table = pq.read_table(path)
+                        if not table.schema.equals(schema):
+                            table = pa.Table.from_pylist(table.to_pylist(),
+                                                         schema=schema)
+                        writer.write_table(table)
+    return count
+
+
+def export_items(item_dicts: Iterable[Dict[str, Any]],
+                 href: str,
+                 format: Optional[str] = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Stream Items to a single file for bulk ingestion
+
+    Items are written in batches as they arrive, so memory use does not
+    depend on the number of Items and no pystac objects are needed, e.g.
+    with stac.iter_item_dicts.
+
+    Args:
+        item_dicts (Iterable[Dict[str, Any]]): The Items, as dicts
+        href (str): Output HREF
+        format (str, optional): "ndjson" or "geoparquet", by default from the
+            extension of href
+        batch_size (int): Number of Items written at once
+
+    Returns:
+        int: The number of Items written
+    """
+    if format is None:
+        format = export_format(href)
+    if format == "ndjson":
+        count = write_ndjson(item_dicts, href, batch_size)
+    elif format == "geoparquet":
+        count = write_geoparquet(item_dicts, href, batch_size)
+    else:
+        raise ValueError(f"Invalid export format {format!r}, expected one "
+                         f"of {EXPORT_FORMATS}")
+    logger.info(f"Exported {count} Items to {href}")
+    return count
@@ -0,0 +1,261 @@
+import io
+import logging
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import fsspec
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fsspec.utils import infer_compression
+
+from stactools.ghcnd.parquet import _read_options
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOCK_SIZE = 16 * 2**20
+INDEX_SUFFIX = ".index.parquet"
+
+# Lines of the merged CSV start with the 11 character station ID, a comma
+# and the YYYYMMDD date, so the first 16 bytes hold the (station, year) key
+STATION_ID_WIDTH = 11
+KEY_WIDTH = STATION_ID_WIDTH + 5
+
+HEADER_METADATA_KEY = b"ghcnd:header"
+SOURCE_METADATA_KEY = b"ghcnd:source"
+
+INDEX_SCHEMA = pa.schema([
+    pa.field("station", pa.string()),
+    pa.field("year", pa.int16()),
+    pa.field("start", pa.int64()),
+    pa.field("end", pa.int64()),
+])
+
+
+def default_index_href(href: str) -> str:
+    """HREF of the sidecar index of a data asset"""
+    return href + INDEX_SUFFIX
+
+
+def _runs(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Indexes of the first and last element of each run of equal keys"""
+    change = np.ones(len(keys), dtype=bool)
+    change[1:] = keys[1:] != keys[:-1]
+    first = np.flatnonzero(change)
+    last = np.append(first[1:] - 1, len(keys) - 1)[:len(first)]
+    return first, last
+
+
+def _block_runs(
+        data: np.ndarray,
+        offset: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """Runs of lines with the same (station, year) key in a block
+
+    Args:
+        data (np.ndarray): Bytes of the block as uint8
+        offset (int): Position of the block in the file
+
+    Returns:
+        Tuple: Keys, start and end byte positions of the runs, and the length
+            of the complete lines in the block
+    """
+    newlines = np.flatnonzero(data == ord("\n"))
+    if len(newlines) == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return np.empty(0, dtype=f"S{KEY_WIDTH}"), empty, empty, 0
+    line_starts = np.concatenate([[0], newlines[:-1] + 1])
+    line_ends = newlines + 1
+    # Blank lines have no key
+    keyed = line_ends - line_starts > KEY_WIDTH
+    line_starts = line_starts[keyed]
+    line_ends = line_ends[keyed]
+
+    keys = data[line_starts[:, None] + np.arange(KEY_WIDTH)]
+    if (keys[:, STATION_ID_WIDTH] != ord(",")).any():
+        raise ValueError(
+            f"Lines do not start with a {STATION_ID_WIDTH} character "
+            "station ID, the data asset is not a merged GHCNd CSV")
+    keys = keys.view(f"S{KEY_WIDTH}").ravel()
+
+    first, last = _runs(keys)
+    return (keys[first], offset + line_starts[first],
+            offset + line_ends[last], int(newlines[-1]) + 1)
+
+
+def build_index(href: str,
+                index_href: Optional[str] = None,
+                block_size: int = DEFAULT_BLOCK_SIZE) -> str:
+    """Index the byte ranges of each (station, year) block of a data asset
+
+    The asset is read once, in blocks of ``block_size`` bytes. Each run of
+    consecutive lines with the same station and year becomes one row of a
+    Parquet index, so the asset should be sorted by station and date, as the
+    merged GHCNd CSV is, for the index to stay small.
+
+    Args:
+        href (str): HREF of the uncompressed merged CSV
+        index_href (str, optional): HREF of the index, by default next to the
+            asset, see default_index_href()
+        block_size (int): Number of bytes read at once
+
+    Returns:
+        str: The index HREF
+    """
+    if index_href is None:
+        index_href = default_index_href(href)
+    fs, _, (path, ) = fsspec.get_fs_token_paths(href)
+    if infer_compression(path) is not None:
+        raise ValueError(
+            f"{href} is compressed, byte ranges can only be indexed in an "
+            "uncompressed data asset")
+
+    keys: List[np.ndarray] = []
+    starts: List[np.ndarray] = []
+    ends: List[np.ndarray] = []
+    with fs.open(path, "rb", block_size=block_size) as file:
+        header = file.readline()
+        offset = len(header)
+        remainder = b""
+        while True:
+            block = file.read(block_size)
+            data = remainder + block
+            if not block:
+                if data and not data.endswith(b"\n"):
+                    data += b"\n"
+            block_keys, block_starts, block_ends, complete = _block_runs(
+                np.frombuffer(data, dtype=np.uint8), offset)
+            keys.append(block_keys)
+            starts.append(block_starts)
+            ends.append(block_ends)
+            remainder = data[complete:]
+            offset += complete
+            if not block:
+                break
+
+    all_keys = np.concatenate(keys)
+    all_starts = np.concatenate(starts)
+    all_ends = np.concatenate(ends)
+    # Merge runs split across blocks
+    first, last = _runs(all_keys)
+    key_bytes = all_keys[first].view(np.uint8).reshape(-1, KEY_WIDTH)
+    stations = key_bytes[:, :STATION_ID_WIDTH].copy().view(
+        f"S{STATION_ID_WIDTH}").ravel().astype(str)
+    years = (key_bytes[:, STATION_ID_WIDTH + 1:].astype(np.int16) -
+             ord("0")) @ np.array([1000, 100, 10, 1], dtype=np.int16)
+
+    table = pa.Table.from_arrays(
+        [
+            pa.array(stations, type=pa.string()),
+            pa.array(years, type=pa.int16()),
+            pa.array(all_starts[first], type=pa.int64()),
+            pa.array(all_ends[last], type=pa.int64()),
+        ],
+        schema=INDEX_SCHEMA.with_metadata({
+            HEADER_METADATA_KEY: header,
+            SOURCE_METADATA_KEY: href.encode("utf-8"),
+        }))
+    index_fs, _, (index_path, ) = fsspec.get_fs_token_paths(index_href)
+    pq.write_table(table, index_path, filesystem=index_fs)
+    read_index.cache_clear()
+    logger.info(f"Indexed {len(table)} station years of {href}")
+    return index_href
+
+
+@lru_cache(maxsize=8)
+def read_index(index_href: str) -> Tuple[pd.DataFrame, bytes]:
+    """Read an index written by build_index
+
+    Indexes are kept in memory, so repeated queries only read the data.
+
+    Args:
+        index_href (str): HREF of the index
+
+    Returns:
+        Tuple[pd.DataFrame, bytes]: The index rows and the CSV header line
+    """
+    fs, _, (path, ) = fsspec.get_fs_token_paths(index_href)
+    table = pq.read_table(path, filesystem=fs)
+    return table.to_pandas(), table.schema.metadata[HEADER_METADATA_KEY]
+
+
+def byte_ranges(index: pd.DataFrame,
+                station: str,
+                start_year: Optional[int] = None,
+                end_year: Optional[int] = None) -> List[Tuple[int, int]]:
+    """Byte ranges holding a station's rows in a range of years
+
+    Adjacent ranges are merged, so consecutive years are read with a single
+    request.
+
+    Args:
+        index (pd.DataFrame): Index rows, see read_index()
+        station (str): Station ID
+        start_year (int, optional): First year
+        end_year (int, optional): Last year
+
+    Returns:
+        List[Tuple[int, int]]: (start, end) byte positions, end exclusive
+    """
+    selected = index["station"] == station
+    if start_year is not None:
+        selected &= index["year"] >= start_year
+    if end_year is not None:
+        selected &= index["year"] <= end_year
+    ranges: List[Tuple[int, int]] = []
+    for start, end in sorted(
+            zip(index["start"][selected], index["end"][selected])):
+        if ranges and ranges[-1][1] == start:
+            ranges[-1] = (ranges[-1][0], int(end))
+        else:
+            ranges.append((int(start), int(end)))
+    return ranges
+
+
+def query(href: str,
+          station: str,
+          element: Optional[str] = None,
+          start: Optional[int] = None,
+          end: Optional[int] = None,
+          index_href: Optional[str] = None) -> pd.DataFrame:
+    """Read a station's time series from an indexed data asset
+
+    Only the byte ranges of the requested station and years are read, with
+    fsspec range requests, so a lookup costs a few KB of I/O instead of a
+    scan of the whole asset.
+
+    Args:
+        href (str): HREF of the data asset
+        station (str): Station ID
+        element (str, optional): Element code, e.g. "TMAX"
+        start (int, optional): First date, as YYYYMMDD
+        end (int, optional): Last date, as YYYYMMDD
+        index_href (str, optional): HREF of the index, see build_index()
+
+    Returns:
+        pd.DataFrame: The matching rows of the data asset
+    """
+    if index_href is None:
+        index_href = default_index_href(href)
+    index, header = read_index(index_href)
+    ranges = byte_ranges(index,
+                         station,
+                         start_year=None if start is None else start // 10000,
+                         end_year=None if end is None else end // 10000)
+    fs, _, (path, ) = fsspec.get_fs_token_paths(href)
+    parts = [header]
+    for range_start, range_end in ranges:
+        parts.append(fs.cat_file(path, start=range_start, end=range_end))
+    logger.debug(f"Read {sum(map(len, parts))} bytes of {href} for {station}")
+
+    frame = pd.read_csv(io.BytesIO(b"".join(parts)), **_read_options())
+    selected = frame["ID"] == station
+    if element is not None:
+        selected &= frame["ELEMENT"] == element
+    if start is not None or end is not None:
+        dates = frame["YEAR/MONTH/DAY"].astype(np.int64)
+        if start is not None:
+            selected &= dates >= start
+        if end is not None:
+            selected &= dates <= end
+    return frame[selected].reset_index(drop=True)
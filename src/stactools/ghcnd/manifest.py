@@ -0,0 +1,255 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+import fsspec
+from pystac import Extent, Item, Link, MediaType
+from pystac.rel_type import RelType
+from pystac.utils import str_to_datetime
+
+from stactools.ghcnd import stac
+from stactools.ghcnd.cache import AssetCache, fingerprint
+from stactools.ghcnd.checksum import FileInfo, asset_file_infos
+from stactools.ghcnd.summary import CollectionSummary, reduce_summaries
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE_NAME = "ghcnd-manifest.json"
+COLLECTION_FILE_NAME = "collection.json"
+
+
+def item_hash(item: Item) -> str:
+    """Hash of the content of an Item, independent of key order
+
+    Args:
+        item (Item): The Item
+
+    Returns:
+        str: Hex encoded SHA-256 digest
+    """
+    content = json.dumps(item.to_dict(include_self_link=False,
+                                      transform_hrefs=False),
+                         sort_keys=True)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def source_state(href: str,
+                 file_info: Optional[FileInfo] = None) -> Dict[str, Any]:
+    """Get the state of a source, used to tell whether it changed
+
+    Without a file_info, a source rewritten with the same size and an
+    unchanged ETag or modification time, e.g. restored with its timestamps,
+    is not told apart.
+
+    Args:
+        href (str): HREF of the source data asset
+        file_info (FileInfo, optional): Size and checksum of the source, see
+            checksum.asset_file_info, to also compare its content
+
+    Returns:
+        Dict[str, Any]: The size and fingerprint (ETag or modification
+            time), and the file:checksum if file_info is given
+    """
+    fs, _, (path, ) = fsspec.get_fs_token_paths(href)
+    info = fs.info(path)
+    state = {"size": info.get("size"), "fingerprint": fingerprint(info)}
+    if file_info is not None:
+        state["file:checksum"] = file_info.checksum
+    return state
+
+
+class BuildManifest:
+    """Record of the sources used for a Collection and the Items built from
+    them
+
+    Entries are keyed by source HREF and hold the source state along with
+    the Item ID, HREF, hash, datetimes and bbox, so the Collection can be
+    updated without reading its Items.
+
+    Args:
+        entries (Dict[str, Dict[str, Any]], optional): Existing entries
+    """
+    def __init__(self, entries: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.entries = entries or {}
+
+    @classmethod
+    def load(cls, destination: str) -> "BuildManifest":
+        """Load the manifest of a Collection, or an empty manifest if there
+        is none
+
+        Args:
+            destination (str): The Collection output directory
+        """
+        href = os.path.join(destination, MANIFEST_FILE_NAME)
+        try:
+            with fsspec.open(href, "r") as file:
+                return cls(json.load(file)["entries"])
+        except FileNotFoundError:
+            return cls()
+
+    def save(self, destination: str) -> None:
+        """Write the manifest next to the Collection
+
+        Args:
+            destination (str): The Collection output directory
+        """
+        href = os.path.join(destination, MANIFEST_FILE_NAME)
+        with fsspec.open(href, "w") as file:
+            json.dump({"entries": self.entries}, file, indent=2, sort_keys=True)
+
+    def is_changed(self, href: str, state: Dict[str, Any]) -> bool:
+        """Whether a source differs from when its Item was built
+
+        Sources without a fingerprint or checksum are always treated as
+        changed.
+        """
+        entry = self.entries.get(href)
+        return (entry is None or (state["fingerprint"] is None
+                                  and state.get("file:checksum") is None)
+                or entry["source"] != state)
+
+    def record(self, href: str, state: Dict[str, Any], item: Item,
+               digest: str) -> None:
+        """Record the Item built from a source"""
+        self.entries[href] = {
+            "source": state,
+            "item_id": item.id,
+            "item_href": item.get_self_href(),
+            "item_hash": digest,
+            "start_datetime": item.properties["start_datetime"],
+            "end_datetime": item.properties["end_datetime"],
+            "bbox": item.bbox,
+            "summary": CollectionSummary.from_item(item).to_dict(),
+        }
+
+    def summary(self) -> CollectionSummary:
+        """The summary of all recorded Items"""
+        return reduce_summaries(_entry_summary(entry)
+                                for entry in self.entries.values())
+
+    def extent(self) -> Optional[Extent]:
+        """The Collection extent covering all recorded Items"""
+        return self.summary().extent()
+
+
+def _entry_summary(entry: Dict[str, Any]) -> CollectionSummary:
+    """The summary of a manifest entry, also for manifests written before
+    summaries were recorded"""
+    if "summary" in entry:
+        return CollectionSummary.from_dict(entry["summary"])
+    return CollectionSummary(
+        item_count=1,
+        start_datetime=str_to_datetime(entry["start_datetime"]),
+        end_datetime=str_to_datetime(entry["end_datetime"]),
+        bbox=entry["bbox"])
+
+
+def populate_incremental(
+    sources: List[str],
+    destination: str,
+    workers: int = 1,
+    scan: bool = False,
+    cache: Optional[AssetCache] = None,
+    checksum: bool = False,
+    validate_mode: str = "full",
+    schema_dir: Optional[str] = None,
+    offline: bool = False,
+) -> List[str]:
+    """Bring a saved GHCNd Collection up to date with its sources
+
+    Only Items whose source changed since the last build are created and
+    written. The Collection is rewritten from the manifest, without reading
+    the unchanged Items, and Items of sources that no longer exist are
+    removed.
+
+    Args:
+        sources (List[str]): HREFs of all data assets of the Collection
+        destination (str): The Collection output directory
+        workers (int): Number of processes used to create the Items
+        scan (bool): Derive Item metadata from the content of each asset
+        cache (AssetCache, optional): Cache for data asset sizes and
+            checksums
+        checksum (bool): Set file:checksum of each rebuilt data asset, and
+            compare the checksum of each source to tell whether it changed
+        validate_mode (str): Validation of the rebuilt Items, "full",
+            "sample" or "none", see validation.select(). The Items are
+            validated by the workers creating them, the Collection unless
+            "none".
+        schema_dir (str, optional): Local schema directory, see
+            validation.use_schema_cache()
+        offline (bool): Raise instead of downloading schemas missing from
+            schema_dir
+
+    Returns:
+        List[str]: HREFs of the sources whose Items were rebuilt
+
+    Raises:
+        ValueError: If two sources would get the same Item ID, see
+            stac.check_item_ids
+    """
+    stac.check_item_ids(sources)
+    if "://" not in destination:
+        destination = os.path.abspath(destination)
+    collection_href = os.path.join(destination, COLLECTION_FILE_NAME)
+    fs, _, (collection_path, ) = fsspec.get_fs_token_paths(collection_href)
+    if fs.exists(collection_path):
+        manifest = BuildManifest.load(destination)
+    else:
+        manifest = BuildManifest()
+
+    file_infos = asset_file_infos(sources, cache=cache,
+                                  workers=workers) if checksum else {}
+    states = {
+        href: source_state(href, file_infos.get(href))
+        for href in sources
+    }
+    changed = [
+        href for href in sources if manifest.is_changed(href, states[href])
+    ]
+    removed = sorted(set(manifest.entries) - set(sources))
+    logger.info(f"{len(changed)} changed and {len(removed)} removed sources")
+
+    for href in removed:
+        item_href = manifest.entries.pop(href)["item_href"]
+        fs, _, (path, ) = fsspec.get_fs_token_paths(item_href)
+        if fs.exists(path):
+            fs.rm(path)
+
+    collection = stac.create_collection()
+    collection.set_self_href(collection_href)
+    new_items = stac.create_items(changed,
+                                  workers=workers,
+                                  scan=scan,
+                                  cache=cache,
+                                  checksum=checksum,
+                                  validate_mode=validate_mode,
+                                  schema_dir=schema_dir,
+                                  offline=offline)
+    for href, item in zip(changed, new_items):
+        collection.add_item(item)
+        item.set_self_href(
+            os.path.join(destination, item.id, f"{item.id}.json"))
+        digest = item_hash(item)
+        previous = manifest.entries.get(href)
+        if previous is None or previous["item_hash"] != digest:
+            item.save_object(include_self_link=False)
+        manifest.record(href, states[href], item, digest)
+
+    # Link the unchanged Items without reading them
+    rebuilt = set(changed)
+    for href, entry in sorted(manifest.entries.items()):
+        if href not in rebuilt:
+            collection.add_link(
+                Link(RelType.ITEM,
+                     target=entry["item_href"],
+                     media_type=MediaType.JSON))
+
+    manifest.summary().apply(collection)
+    collection.save_object(include_self_link=True)
+    if validate_mode != "none":
+        collection.validate()
+    manifest.save(destination)
+
+    return changed
@@ -0,0 +1,169 @@
+import logging
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from typing import Iterable, List, Optional
+
+import fsspec
+import pandas as pd
+import pyarrow as pa
+
+from stactools.ghcnd.cache import AssetCache
+from stactools.ghcnd.constants import (
+    DATA_TABLE_COLUMNS,
+    PRIMARY_GEOMETRY_COLUMN,
+    STATION_TABLE_COLUMNS,
+    STATIONS_URL,
+)
+from stactools.ghcnd.station_table import StationTable
+from stactools.ghcnd.stations import parse_stations, read_table
+from stactools.ghcnd.timing import span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNKSIZE = 1_000_000
+ID_COLUMN = "ID"
+DATA_COLUMNS = [column["name"] for column in DATA_TABLE_COLUMNS]
+STATION_COLUMNS = [
+    column["name"] for column in STATION_TABLE_COLUMNS
+    if column["name"] != ID_COLUMN
+]
+GEOMETRY_COLUMN = PRIMARY_GEOMETRY_COLUMN["name"]
+# Columns of the merged data asset, in order
+MERGED_COLUMNS = DATA_COLUMNS + STATION_COLUMNS + [GEOMETRY_COLUMN]
+
+# Station table of the worker processes, set once per process by
+# _init_worker
+_station_table: Optional[StationTable] = None
+
+
+def station_table(stations_href: str = STATIONS_URL,
+                  cache: Optional[AssetCache] = None) -> StationTable:
+    """The station table to join the by_year files with
+
+    Args:
+        stations_href (str): HREF of ghcnd-stations.txt
+        cache (AssetCache, optional): Cache of the parsed stations file
+
+    Returns:
+        StationTable: The station columns as text, as written to the merged
+            CSV, plus the WKT geometry
+    """
+    table = read_table(stations_href, parse_stations, cache)
+    frame = table.to_pandas()
+    longitude = frame["LONGITUDE"].map(str)
+    latitude = frame["LATITUDE"].map(str)
+    frame[GEOMETRY_COLUMN] = "POINT (" + longitude + " " + latitude + ")"
+    text = frame.astype(object).where(frame.notna(), "").astype(str)
+    columns = [ID_COLUMN] + STATION_COLUMNS + [GEOMETRY_COLUMN]
+    return StationTable.from_table(
+        pa.Table.from_pandas(text[columns], preserve_index=False))
+
+
+def merge_chunk(chunk: pd.DataFrame, stations: StationTable) -> pd.DataFrame:
+    """Left join rows of a by_year file with the station table
+
+    Args:
+        chunk (pd.DataFrame): Rows with the DATA_TABLE_COLUMNS
+        stations (StationTable): Station table, see station_table()
+
+    Returns:
+        pd.DataFrame: Rows with the MERGED_COLUMNS, blank station columns
+            for unknown stations
+    """
+    station_rows = stations.take(chunk[ID_COLUMN].to_numpy())
+    merged = chunk.reset_index(drop=True)
+    for name in STATION_COLUMNS + [GEOMETRY_COLUMN]:
+        merged[name] = station_rows.column(name).to_pandas()
+    return merged[MERGED_COLUMNS].fillna("")
+
+
+def _init_worker(stations: StationTable) -> None:
+    global _station_table
+    _station_table = stations
+
+
+def _merge_year(href: str, part_path: str, chunksize: int) -> str:
+    """Worker function streaming one by_year file through the join into a
+    part file"""
+    assert _station_table is not None
+    with span("merge_year", href=href):
+        with fsspec.open(href, "rt", compression="infer") as source, open(
+                part_path, "w", newline="") as part:
+            reader = pd.read_csv(source,
+                                 header=None,
+                                 names=DATA_COLUMNS,
+                                 dtype=str,
+                                 keep_default_na=False,
+                                 chunksize=chunksize)
+            for chunk in reader:
+                merge_chunk(chunk, _station_table).to_csv(part,
+                                                          header=False,
+                                                          index=False)
+    return part_path
+
+
+def build_asset(sources: Iterable[str],
+                destination: str,
+                stations_href: str = STATIONS_URL,
+                workers: int = 1,
+                chunksize: int = DEFAULT_CHUNKSIZE,
+                cache: Optional[AssetCache] = None,
+                tmp_dir: Optional[str] = None) -> str:
+    """Build the merged data asset from by_year files and the station table
+
+    Each by_year file is streamed in chunks of ``chunksize`` rows through a
+    join with the station table, by binary search of its sorted IDs, and the
+    WKT geometry is appended. Years are processed in parallel into temporary
+    part files, which are appended to the destination in the order of
+    sources. The workers share one memory-mapped copy of the station table,
+    so peak memory depends on the chunk size and number of workers only.
+
+    Args:
+        sources (Iterable[str]): HREFs of the by_year files, in output order
+        destination (str): HREF of the merged CSV, compressed if it ends with
+            e.g. ".gz"
+        stations_href (str): HREF of ghcnd-stations.txt
+        workers (int): Number of processes merging years
+        chunksize (int): Number of rows held in memory per process
+        cache (AssetCache, optional): Cache of the parsed stations file
+        tmp_dir (str, optional): Local directory for the part files
+
+    Returns:
+        str: The destination HREF
+    """
+    hrefs = list(sources)
+    with span("read_stations", href=stations_href):
+        stations = station_table(stations_href, cache)
+
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as parts_dir:
+        # Workers map the same file instead of each unpickling a copy
+        if workers > 1 and len(hrefs) > 1:
+            stations = stations.share(parts_dir)
+        part_paths: List[str] = [
+            os.path.join(parts_dir, f"part-{n}.csv") for n in range(len(hrefs))
+        ]
+        with fsspec.open(destination, "w", compression="infer",
+                         newline="") as output:
+            output.write(",".join(MERGED_COLUMNS) + "\n")
+            args = (hrefs, part_paths, [chunksize] * len(hrefs))
+            with ExitStack() as stack:
+                if workers > 1 and len(hrefs) > 1:
+                    executor = stack.enter_context(
+                        ProcessPoolExecutor(max_workers=workers,
+                                            initializer=_init_worker,
+                                            initargs=(stations, )))
+                    parts = executor.map(_merge_year, *args)
+                else:
+                    _init_worker(stations)
+                    parts = map(_merge_year, *args)
+                # Parts come in the order of hrefs, so each one is appended
+                # as soon as it and all earlier parts are done
+                for part_path in parts:
+                    with span("append_part"), open(part_path) as part:
+                        shutil.copyfileobj(part, output)
+                    os.remove(part_path)
+    logger.info(f"Merged {len(hrefs)} by_year files into {destination}")
+    return destination
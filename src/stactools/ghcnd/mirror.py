@@ -0,0 +1,267 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+import aiohttp
+
+from stactools.ghcnd.constants import (
+    ADDITIONAL_METADATA_URL,
+    INVENTORY_URL,
+    METADATA_URL,
+    STATIONS_URL,
+    YEARS_URL,
+)
+
+logger = logging.getLogger(__name__)
+
+# Root of the GHCNd archive; files are mirrored to the same relative paths
+BASE_URL = STATIONS_URL.rsplit("/", 1)[0] + "/"
+YEARS_PATH = YEARS_URL[len(BASE_URL):]
+METADATA_PATHS = [
+    url[len(BASE_URL):] for url in (STATIONS_URL, INVENTORY_URL,
+                                     METADATA_URL, ADDITIONAL_METADATA_URL)
+]
+YEAR_FILE_PATTERN = re.compile(r'href="(\d{4}\.csv\.gz)"')
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_RETRIES = 3
+CHUNK_SIZE = 2**20
+STATE_FILE_NAME = ".ghcnd-mirror.json"
+PART_SUFFIX = ".part"
+
+
+@dataclass
+class MirrorResult:
+    """Outcome of a mirror run, by path relative to the destination"""
+    downloaded: List[str] = field(default_factory=list)
+    resumed: List[str] = field(default_factory=list)
+    not_modified: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+
+
+class RateLimiter:
+    """Limit the average rate of bytes read by all downloads
+
+    Args:
+        rate (float, optional): Maximum bytes per second, unlimited if None
+    """
+    def __init__(self, rate: Optional[float] = None):
+        self.rate = rate
+        self._start: Optional[float] = None
+        self._count = 0
+
+    async def consume(self, size: int) -> None:
+        """Account for size bytes, sleeping while over the rate
+
+        Args:
+            size (int): Number of bytes just read
+        """
+        if self.rate is None:
+            return
+        now = time.monotonic()
+        if self._start is None:
+            self._start = now
+        self._count += size
+        delay = self._start + self._count / self.rate - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class _MirrorState:
+    """Validators (ETag, Last-Modified) of mirrored and partial files, kept
+    next to the mirror so later runs can make conditional and range
+    requests"""
+    def __init__(self, destination: str):
+        self.href = os.path.join(destination, STATE_FILE_NAME)
+        try:
+            with open(self.href) as file:
+                self.entries: Dict[str, Dict[str, Any]] = json.load(file)
+        except FileNotFoundError:
+            self.entries = {}
+
+    def save(self) -> None:
+        tmp_href = self.href + ".tmp"
+        with open(tmp_href, "w") as file:
+            json.dump(self.entries, file, indent=2, sort_keys=True)
+        os.replace(tmp_href, self.href)
+
+
+async def list_years(session: aiohttp.ClientSession,
+                     base_url: str = BASE_URL) -> List[str]:
+    """List the by_year files of the archive
+
+    Args:
+        session (aiohttp.ClientSession): The HTTP session
+        base_url (str): Root URL of the archive
+
+    Returns:
+        List[str]: Paths of the by_year files, relative to base_url
+    """
+    async with session.get(base_url + YEARS_PATH) as response:
+        response.raise_for_status()
+        listing = await response.text()
+    names = sorted(set(YEAR_FILE_PATTERN.findall(listing)))
+    return [YEARS_PATH + name for name in names]
+
+
+def _validators(headers: Any) -> Dict[str, Optional[str]]:
+    return {
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+    }
+
+
+async def _fetch(session: aiohttp.ClientSession, url: str, path: str,
+                 state: _MirrorState, key: str, limiter: RateLimiter) -> str:
+    """Download one file, returning "downloaded", "resumed" or
+    "not_modified"
+
+    A complete file is only downloaded again if the server reports a change.
+    A partial file is completed with a range request if the server still has
+    the same version, and downloaded again otherwise.
+    """
+    entry = state.entries.get(key, {})
+    part_path = path + PART_SUFFIX
+    headers = {}
+    offset = 0
+    partial = entry.get("partial")
+    if partial and os.path.exists(part_path):
+        offset = os.path.getsize(part_path)
+        validator = partial.get("etag") or partial.get("last_modified")
+        if offset and validator:
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = validator
+        else:
+            offset = 0
+    elif os.path.exists(path):
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    async with session.get(url, headers=headers) as response:
+        if response.status == 304:
+            return "not_modified"
+        response.raise_for_status()
+        resumed = response.status == 206 and response.headers.get(
+            "Content-Range", "").startswith(f"bytes {offset}-")
+        if not resumed:
+            offset = 0
+        validators = _validators(response.headers)
+        state.entries[key] = {"url": url, "partial": validators}
+        state.save()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(part_path, "ab" if resumed else "wb") as file:
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                await limiter.consume(len(chunk))
+                file.write(chunk)
+
+    os.replace(part_path, path)
+    state.entries[key] = {
+        "url": url,
+        "size": os.path.getsize(path),
+        **validators,
+    }
+    state.save()
+    return "resumed" if resumed else "downloaded"
+
+
+async def _fetch_with_retries(session: aiohttp.ClientSession, url: str,
+                              path: str, state: _MirrorState, key: str,
+                              limiter: RateLimiter,
+                              semaphore: asyncio.Semaphore,
+                              retries: int) -> str:
+    async with semaphore:
+        attempt = 0
+        while True:
+            try:
+                return await _fetch(session, url, path, state, key, limiter)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt >= retries:
+                    raise
+                attempt += 1
+                # The next attempt resumes from what was written
+                logger.warning(f"Retrying {url} after {e!r}")
+                await asyncio.sleep(2**attempt)
+
+
+async def _mirror(destination: str, base_url: str,
+                  years: Optional[Iterable[int]], paths: Iterable[str],
+                  concurrency: int, max_bandwidth: Optional[float],
+                  retries: int) -> MirrorResult:
+    state = _MirrorState(destination)
+    limiter = RateLimiter(max_bandwidth)
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=None, sock_read=60)
+    async with aiohttp.ClientSession(connector=connector,
+                                     timeout=timeout) as session:
+        all_paths = list(paths)
+        if years is None:
+            all_paths += await list_years(session, base_url)
+        else:
+            all_paths += [f"{YEARS_PATH}{year}.csv.gz" for year in years]
+
+        outcomes = await asyncio.gather(
+            *(_fetch_with_retries(session, base_url + path,
+                                  os.path.join(destination, path), state,
+                                  path, limiter, semaphore, retries)
+              for path in all_paths),
+            return_exceptions=True)
+
+    result = MirrorResult()
+    for path, outcome in zip(all_paths, outcomes):
+        if isinstance(outcome, BaseException):
+            logger.error(f"Failed to mirror {path}: {outcome!r}")
+            result.failed[path] = repr(outcome)
+        else:
+            getattr(result, outcome).append(path)
+    return result
+
+
+def mirror(destination: str,
+           base_url: str = BASE_URL,
+           years: Optional[Iterable[int]] = None,
+           paths: Iterable[str] = METADATA_PATHS,
+           concurrency: int = DEFAULT_CONCURRENCY,
+           max_bandwidth: Optional[float] = None,
+           retries: int = DEFAULT_RETRIES) -> MirrorResult:
+    """Mirror the GHCNd archive to a local directory
+
+    Files are downloaded concurrently over a pool of HTTP connections.
+    Unchanged files are skipped with conditional requests (ETag and
+    If-Modified-Since) and interrupted downloads are resumed with range
+    requests, using the validators kept in a state file in the destination,
+    so the mirror can be refreshed by running it again.
+
+    Args:
+        destination (str): Local directory, files are stored at their path
+            relative to base_url
+        base_url (str): Root URL of the archive
+        years (Iterable[int], optional): Years of the by_year files to
+            mirror, by default all years listed by the server
+        paths (Iterable[str]): Other files to mirror, relative to base_url
+        concurrency (int): Maximum number of simultaneous downloads
+        max_bandwidth (float, optional): Maximum bytes per second, over all
+            downloads
+        retries (int): Number of times a failed download is resumed
+
+    Returns:
+        MirrorResult: Paths downloaded, resumed, not modified or failed
+    """
+    os.makedirs(destination, exist_ok=True)
+    result = asyncio.run(
+        _mirror(destination, base_url, years, paths, concurrency,
+                max_bandwidth, retries))
+    logger.info(f"Mirrored {base_url} to {destination}: "
+                f"{len(result.downloaded)} downloaded, "
+                f"{len(result.resumed)} resumed, "
+                f"{len(result.not_modified)} not modified, "
+                f"{len(result.failed)} failed")
+    return result
@@ -0,0 +1,349 @@
+import json
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import fsspec
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+from stactools.ghcnd.constants import (
+    DATA_TABLE_COLUMNS,
+    PRIMARY_GEOMETRY_COLUMN,
+    STATION_TABLE_COLUMNS,
+    ghcnd_crs,
+)
+from stactools.ghcnd.reader import iter_tables
+from stactools.ghcnd.station_table import StationTable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNKSIZE = 1_000_000
+YEAR_PARTITION_COLUMN = "year"
+ELEMENT_PARTITION_COLUMN = "ELEMENT"
+GEOPARQUET_VERSION = "0.4.0"
+
+ARROW_TYPES = {
+    "str": pa.string(),
+    "int": pa.int32(),
+    "float": pa.float64(),
+    "geometry": pa.binary(),
+}
+
+# numpy record layout of a little-endian WKB point: byte order, geometry
+# type (1 = Point), x, y
+WKB_POINT_DTYPE = np.dtype([
+    ("byte_order", "u1"),
+    ("geometry_type", "<u4"),
+    ("x", "<f8"),
+    ("y", "<f8"),
+])
+
+
+def _source_columns() -> List[Dict[str, Any]]:
+    """Columns of the merged data/station CSV, excluding the WKT geometry
+    which is rebuilt from LONGITUDE and LATITUDE."""
+    columns = DATA_TABLE_COLUMNS + [
+        column for column in STATION_TABLE_COLUMNS
+        if column["name"] != "ID"
+    ]
+    return columns
+
+
+def arrow_schema() -> pa.Schema:
+    """Arrow schema of the GeoParquet dataset
+
+    Built from DATA_TABLE_COLUMNS and STATION_TABLE_COLUMNS, plus the WKB
+    encoded geometry column and the year partition column.
+
+    Returns:
+        pa.Schema: Schema including the GeoParquet "geo" metadata
+    """
+    fields = [
+        pa.field(column["name"], ARROW_TYPES[column["type"]])
+        for column in _source_columns()
+    ]
+    fields.append(
+        pa.field(PRIMARY_GEOMETRY_COLUMN["name"],
+                 ARROW_TYPES[PRIMARY_GEOMETRY_COLUMN["type"]]))
+    fields.append(pa.field(YEAR_PARTITION_COLUMN, pa.int16()))
+    geo = {
+        "version": GEOPARQUET_VERSION,
+        "primary_column": PRIMARY_GEOMETRY_COLUMN["name"],
+        "columns": {
+            PRIMARY_GEOMETRY_COLUMN["name"]: {
+                "encoding": "WKB",
+                "geometry_type": "Point",
+                "crs": ghcnd_crs().to_json_dict(),
+            }
+        },
+    }
+    return pa.schema(fields, metadata={"geo": json.dumps(geo)})
+
+
+def points_to_wkb(longitude: np.ndarray, latitude: np.ndarray) -> pa.Array:
+    """Encode point coordinates as a WKB binary array without a Python loop
+
+    Args:
+        longitude (np.ndarray): x coordinates
+        latitude (np.ndarray): y coordinates
+
+    Returns:
+        pa.Array: Binary array of WKB points, null where a coordinate is NaN
+    """
+    count = len(longitude)
+    points = np.empty(count, dtype=WKB_POINT_DTYPE)
+    points["byte_order"] = 1
+    points["geometry_type"] = 1
+    points["x"] = longitude
+    points["y"] = latitude
+    offsets = np.arange(count + 1, dtype=np.int32) * WKB_POINT_DTYPE.itemsize
+    wkb = pa.Array.from_buffers(
+        pa.binary(), count,
+        [None, pa.py_buffer(offsets),
+         pa.py_buffer(points.tobytes())])
+    missing = np.isnan(longitude) | np.isnan(latitude)
+    if missing.any():
+        wkb = pc.if_else(pa.array(missing), pa.scalar(None, pa.binary()), wkb)
+    return wkb
+
+
+def _read_options(
+        columns: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """Keyword arguments for pandas.read_csv of the merged CSV, or of the
+    given columns"""
+    if columns is None:
+        columns = _source_columns()
+    dtype = {
+        column["name"]: {
+            "str": str,
+            "int": np.int32,
+            "float": np.float64,
+        }[column["type"]]
+        for column in columns
+    }
+    str_columns = [c["name"] for c in columns if c["type"] == "str"]
+    return {
+        "usecols": [column["name"] for column in columns],
+        "dtype": dtype,
+        # Blank flags are meaningful, keep them as empty strings
+        "keep_default_na": False,
+        "na_values": {
+            column["name"]: [""]
+            for column in columns if column["name"] not in str_columns
+        },
+    }
+
+
+def chunk_to_table(chunk: pd.DataFrame, schema: pa.Schema) -> pa.Table:
+    """Convert a chunk of the merged CSV to an Arrow table
+
+    Args:
+        chunk (pd.DataFrame): Rows of the merged CSV
+        schema (pa.Schema): Schema returned by arrow_schema()
+
+    Returns:
+        pa.Table: Table with WKB geometry and the year partition column
+    """
+    arrays = []
+    for field in schema:
+        if field.name == PRIMARY_GEOMETRY_COLUMN["name"]:
+            arrays.append(
+                points_to_wkb(chunk["LONGITUDE"].to_numpy(np.float64),
+                              chunk["LATITUDE"].to_numpy(np.float64)))
+        elif field.name == YEAR_PARTITION_COLUMN:
+            years = chunk["YEAR/MONTH/DAY"].str.slice(0, 4).astype(np.int16)
+            arrays.append(pa.array(years.to_numpy(), type=field.type))
+        else:
+            arrays.append(
+                pa.array(chunk[field.name], type=field.type, from_pandas=True))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def csv_column_types(
+    columns: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, pa.DataType]:
+    """Arrow types of the columns of the merged CSV, or of the given
+    columns, for pyarrow.csv"""
+    if columns is None:
+        columns = _source_columns()
+    return {column["name"]: ARROW_TYPES[column["type"]] for column in columns}
+
+
+def join_stations(table: pa.Table, stations: StationTable) -> pa.Table:
+    """Left join rows of a by_year file with the station table
+
+    Args:
+        table (pa.Table): Rows with the DATA_TABLE_COLUMNS
+        stations (StationTable): Station table with typed columns, e.g. of
+            stations.parse_stations
+
+    Returns:
+        pa.Table: Rows with the columns of the merged CSV but the geometry,
+            see arrow_to_table, and blank station columns for unknown
+            stations, as parsed from the merged CSV
+    """
+    ids = table.column("ID").to_numpy(zero_copy_only=False)
+    station_rows = stations.take(ids)
+    for column in _source_columns()[len(DATA_TABLE_COLUMNS):]:
+        values = station_rows.column(column["name"])
+        if column["type"] == "str":
+            values = pc.fill_null(values, "")
+        table = table.append_column(column["name"], values)
+    return table
+
+
+def arrow_to_table(table: pa.Table, schema: pa.Schema) -> pa.Table:
+    """Convert a table read from the merged CSV to the dataset schema
+
+    Same as chunk_to_table, for tables read by reader.iter_tables.
+
+    Args:
+        table (pa.Table): Rows of the merged CSV, see csv_column_types()
+        schema (pa.Schema): Schema returned by arrow_schema()
+
+    Returns:
+        pa.Table: Table with WKB geometry and the year partition column
+    """
+    arrays = []
+    for field in schema:
+        if field.name == PRIMARY_GEOMETRY_COLUMN["name"]:
+            longitude = pc.fill_null(table.column("LONGITUDE"), np.nan)
+            latitude = pc.fill_null(table.column("LATITUDE"), np.nan)
+            arrays.append(
+                points_to_wkb(longitude.to_numpy(), latitude.to_numpy()))
+        elif field.name == YEAR_PARTITION_COLUMN:
+            dates = table.column("YEAR/MONTH/DAY")
+            years = pc.utf8_slice_codeunits(dates, 0, 4)
+            arrays.append(pc.cast(years, field.type))
+        else:
+            arrays.append(pc.cast(table.column(field.name), field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def convert_to_parquet(
+    source: Union[str, Sequence[str]],
+    destination: str,
+    partition_by_element: bool = False,
+    chunksize: int = DEFAULT_CHUNKSIZE,
+    workers: int = 1,
+    stations: Optional[str] = None,
+) -> str:
+    """Convert the merged GHCNd CSV to a partitioned GeoParquet dataset
+
+    The source is streamed in chunks of ``chunksize`` rows so memory use does
+    not depend on the size of the source. The dataset uses a Hive layout
+    partitioned by year and optionally by ELEMENT.
+
+    With a station file, the sources are headerless by_year files instead,
+    whose rows are joined with the station table as by merge.build_asset.
+
+    With more than one worker, the sources are decompressed and parsed in
+    parallel processes, see reader.iter_tables, and each one is held in
+    memory at once instead of in chunks.
+
+    An existing dataset at the destination is replaced, so that no part
+    files of a previous run are left next to the new ones.
+
+    Args:
+        source (str or Sequence[str]): HREF of the merged data/station CSV,
+            optionally compressed, or HREFs of several of them, or of the
+            by_year files if stations is given
+        destination (str): HREF of the output dataset directory
+        partition_by_element (bool): Also partition by ELEMENT
+        chunksize (int): Number of rows read per chunk
+        workers (int): Number of processes reading sources
+        stations (str, optional): HREF of ghcnd-stations.txt to join the
+            by_year files with
+
+    Returns:
+        str: The destination HREF
+    """
+    schema = arrow_schema()
+    partition_columns = [YEAR_PARTITION_COLUMN]
+    if partition_by_element:
+        partition_columns.append(ELEMENT_PARTITION_COLUMN)
+    partitioning = ds.partitioning(
+        pa.schema([schema.field(name) for name in partition_columns]),
+        flavor="hive")
+    fs, _, (path, ) = fsspec.get_fs_token_paths(destination)
+    if fs.exists(path):
+        fs.rm(path, recursive=True)
+
+    sources = [source] if isinstance(source, str) else list(source)
+
+    def write(table: pa.Table, n: int) -> None:
+        ds.write_dataset(
+            table,
+            path,
+            format="parquet",
+            partitioning=partitioning,
+            basename_template=f"part-{n}-{{i}}.parquet",
+            filesystem=fs,
+            existing_data_behavior="overwrite_or_ignore",
+        )
+
+    station_table = None
+    columns = None
+    column_names = None
+    read_options = _read_options()
+    if stations is not None:
+        # stations imports this module
+        from stactools.ghcnd.stations import parse_stations, read_table
+        station_table = StationTable.from_table(
+            read_table(stations, parse_stations))
+        columns = DATA_TABLE_COLUMNS
+        column_names = [column["name"] for column in columns]
+        read_options = dict(_read_options(columns),
+                            header=None,
+                            names=column_names)
+
+    def convert(table: pa.Table) -> pa.Table:
+        if station_table is not None:
+            table = join_stations(table, station_table)
+        return arrow_to_table(table, schema)
+
+    if workers > 1 and len(sources) > 1:
+        tables = iter_tables(sources,
+                             columns=list(csv_column_types(columns)),
+                             column_types=csv_column_types(columns),
+                             workers=workers,
+                             column_names=column_names)
+        for n, (href, table) in enumerate(tables):
+            logger.debug(f"Writing {href} ({table.num_rows} rows)")
+            write(convert(table), n)
+        return destination
+
+    n = 0
+    for href in sources:
+        with fsspec.open(href, compression="infer") as file:
+            reader = pd.read_csv(file, chunksize=chunksize, **read_options)
+            for chunk in reader:
+                logger.debug(f"Writing chunk {n} ({len(chunk)} rows)")
+                if station_table is not None:
+                    table = convert(
+                        pa.Table.from_pandas(chunk, preserve_index=False))
+                else:
+                    table = chunk_to_table(chunk, schema)
+                write(table, n)
+                n += 1
+
+    return destination
+
+
+def open_dataset(href: str) -> ds.Dataset:
+    """Open a dataset written by convert_to_parquet
+
+    Args:
+        href (str): HREF of the dataset directory
+
+    Returns:
+        ds.Dataset: The dataset, with the Hive partition columns restored
+    """
+    fs, _, (path, ) = fsspec.get_fs_token_paths(href)
+    return ds.dataset(path,
+                      format="parquet",
+                      partitioning="hive",
+                      filesystem=fs)
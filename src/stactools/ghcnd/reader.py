@@ -0,0 +1,230 @@
+import ctypes
+import logging
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import nullcontext
+from multiprocessing import resource_tracker, shared_memory
+from typing import Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import fsspec
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+from stactools.ghcnd.timing import Span, emit, is_enabled, isolated, span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOCK_SIZE = 16 * 2**20
+# Number of files decoded ahead of the consumer, per worker
+PENDING_FILES_PER_WORKER = 2
+
+
+def _csv_options(
+    columns: Optional[Sequence[str]],
+    column_types: Optional[Dict[str, pa.DataType]],
+    block_size: int,
+    column_names: Optional[Sequence[str]],
+) -> Dict[str, object]:
+    """Keyword arguments for pyarrow.csv readers of the data assets"""
+    return {
+        "read_options":
+        pacsv.ReadOptions(
+            block_size=block_size,
+            # Without a header row if the names are given
+            column_names=list(column_names)
+            if column_names is not None else None),
+        "convert_options":
+        pacsv.ConvertOptions(
+            include_columns=list(columns) if columns is not None else None,
+            column_types=column_types,
+            # Blank flags are meaningful, keep them as empty strings
+            strings_can_be_null=False,
+        ),
+    }
+
+
+def iter_batches(
+    href: str,
+    columns: Optional[Sequence[str]] = None,
+    column_types: Optional[Dict[str, pa.DataType]] = None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    column_names: Optional[Sequence[str]] = None,
+) -> Iterator[pa.RecordBatch]:
+    """Stream a data asset as Arrow record batches
+
+    The asset is decompressed on the fly and each block of ``block_size``
+    bytes is parsed into one batch, so memory use does not depend on the
+    size of the asset.
+
+    Merged CSVs have a header row. by_year files have none and are read with
+    ``column_names=merge.DATA_COLUMNS``.
+
+    Args:
+        href (str): HREF of a merged CSV or by_year file, optionally
+            compressed
+        columns (Sequence[str], optional): Columns to read, by default all
+        column_types (Dict[str, pa.DataType], optional): Types of columns,
+            others are inferred, as null if blank throughout a block
+        block_size (int): Number of decompressed bytes parsed at once
+        column_names (Sequence[str], optional): Names of the columns of an
+            asset without a header row, by default read from the header
+
+    Returns:
+        Iterator[pa.RecordBatch]: The batches
+    """
+    with fsspec.open(href, "rb", compression="infer") as file:
+        reader = pacsv.open_csv(
+            file,
+            **_csv_options(columns, column_types, block_size, column_names))
+        for batch in reader:
+            yield batch
+
+
+def _read_shared(
+    href: str,
+    columns: Optional[Sequence[str]],
+    column_types: Optional[Dict[str, pa.DataType]],
+    block_size: int,
+    column_names: Optional[Sequence[str]],
+    collect_spans: bool,
+) -> Tuple[str, int, List[Span]]:
+    """Worker function for iter_tables; decodes a data asset into an Arrow
+    IPC stream in a new shared memory block and returns the name and size
+    of the block, along with the Spans recorded if collect_spans is set."""
+    with isolated() if collect_spans else nullcontext() as profiler:
+        with span("read_shared", href=href):
+            with fsspec.open(href, "rb", compression="infer") as file:
+                reader = pacsv.open_csv(
+                    file,
+                    **_csv_options(columns, column_types, block_size,
+                                   column_names))
+                schema = reader.schema
+                batches = list(reader)
+
+            # Size the block exactly, without copying the data
+            mock = pa.MockOutputStream()
+            with pa.ipc.new_stream(mock, schema) as writer:
+                for batch in batches:
+                    writer.write_batch(batch)
+            size = mock.size()
+
+            block = shared_memory.SharedMemory(create=True, size=size)
+            try:
+                sink = pa.FixedSizeBufferWriter(pa.py_buffer(block.buf))
+                with pa.ipc.new_stream(sink, schema) as writer:
+                    for batch in batches:
+                        writer.write_batch(batch)
+                # Release every export of block.buf before closing it
+                del sink, writer, batches
+            except BaseException:
+                block.close()
+                block.unlink()
+                raise
+            block.close()
+            # The parent registers the block again when attaching it and
+            # owns its unlink
+            resource_tracker.unregister(
+                block._name,  # type: ignore[attr-defined]
+                "shared_memory")
+    spans = profiler.spans if profiler is not None else []
+    return block.name, size, spans
+
+
+def _attach(future: Future) -> Tuple[shared_memory.SharedMemory, pa.Table]:
+    """The table of a worker, mapped from its shared memory block without
+    copying, passing its Spans to this process' hooks"""
+    name, size, spans = future.result()
+    for span_ in spans:
+        emit(span_)
+    block = shared_memory.SharedMemory(name=name)
+    assert block.buf is not None
+    # A foreign buffer keeps the block, and so the mapping, alive for as
+    # long as Arrow references the data, without holding an export of
+    # block.buf that would prevent the block from being closed later
+    view = ctypes.c_char.from_buffer(block.buf)
+    address = ctypes.addressof(view)
+    del view
+    buffer = pa.foreign_buffer(address, size, base=block)
+    return block, pa.ipc.open_stream(buffer).read_all()
+
+
+def iter_tables(
+    hrefs: Sequence[str],
+    columns: Optional[Sequence[str]] = None,
+    column_types: Optional[Dict[str, pa.DataType]] = None,
+    workers: int = 1,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    column_names: Optional[Sequence[str]] = None,
+) -> Iterator[Tuple[str, pa.Table]]:
+    """Decompress and parse many data assets in parallel
+
+    With more than one worker, each asset is decompressed and parsed by a
+    worker process, which writes the record batches into a shared memory
+    block. The batches are then mapped into this process without copying or
+    pickling. Gzip decoding is single threaded, so this scales the reading
+    of compressed by_year files with the number of cores. At most
+    ``PENDING_FILES_PER_WORKER`` decoded files per worker are held in
+    memory; reading fewer columns makes each one smaller.
+
+    With one worker, each asset is streamed in the current process and
+    yielded one block of ``block_size`` bytes at a time.
+
+    by_year files have no header row, read them with
+    ``column_names=merge.DATA_COLUMNS``.
+
+    Args:
+        hrefs (Sequence[str]): HREFs of merged CSVs or by_year files,
+            optionally compressed
+        columns (Sequence[str], optional): Columns to read, by default all
+        column_types (Dict[str, pa.DataType], optional): Types of columns,
+            others are inferred, as null if blank throughout a block
+        workers (int): Number of worker processes
+        block_size (int): Number of decompressed bytes parsed at once
+        column_names (Sequence[str], optional): Names of the columns of
+            assets without a header row, by default read from the header
+
+    Returns:
+        Iterator[Tuple[str, pa.Table]]: HREFs and tables, in the order of
+            hrefs
+    """
+    hrefs = list(hrefs)
+    if workers <= 1 or len(hrefs) <= 1:
+        for href in hrefs:
+            for batch in iter_batches(href, columns, column_types,
+                                      block_size, column_names):
+                yield href, pa.Table.from_batches([batch])
+        return
+
+    # Spans recorded in workers are sent back to the hooks of this process
+    collect_spans = is_enabled()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: Deque[Tuple[str, Future]] = deque()
+        queued = iter(hrefs)
+        try:
+            while True:
+                while len(pending) < workers * PENDING_FILES_PER_WORKER:
+                    queued_href = next(queued, None)
+                    if queued_href is None:
+                        break
+                    pending.append((queued_href,
+                                    executor.submit(_read_shared, queued_href,
+                                                    columns, column_types,
+                                                    block_size, column_names,
+                                                    collect_spans)))
+                if not pending:
+                    break
+                href, future = pending.popleft()
+                block, table = _attach(future)
+                try:
+                    yield href, table
+                finally:
+                    # The mapping is freed once the table is released
+                    block.unlink()
+        finally:
+            # Blocks of files decoded ahead but not consumed
+            for _, future in pending:
+                future.cancel()
+                if not future.cancelled() and future.exception() is None:
+                    shared_memory.SharedMemory(
+                        name=future.result()[0]).unlink()
+    logger.debug(f"Read {len(hrefs)} files with {workers} workers")
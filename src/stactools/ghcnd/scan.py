@@ -0,0 +1,285 @@
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import IO, Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import fsspec
+import numpy as np
+import pandas as pd
+
+from stactools.ghcnd.constants import DATA_TABLE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNKSIZE = 1_000_000
+
+ID_COLUMN = "ID"
+DATE_COLUMN = "YEAR/MONTH/DAY"
+ELEMENT_COLUMN = "ELEMENT"
+LATITUDE_COLUMN = "LATITUDE"
+LONGITUDE_COLUMN = "LONGITUDE"
+VALUE_COLUMN = "DATA VALUE"
+FLAG_COLUMNS = ["M-FLAG", "Q-FLAG", "S-FLAG"]
+SCAN_COLUMNS = [
+    DATE_COLUMN, ELEMENT_COLUMN, LATITUDE_COLUMN, LONGITUDE_COLUMN,
+    VALUE_COLUMN
+] + FLAG_COLUMNS
+# Columns of the by_year files, which have no header row
+BY_YEAR_COLUMNS = [column["name"] for column in DATA_TABLE_COLUMNS]
+SCAN_DTYPES = {
+    DATE_COLUMN: np.int32,
+    ELEMENT_COLUMN: "category",
+    **{column: "category"
+       for column in FLAG_COLUMNS},
+}
+
+# Elements with value statistics, see the GHCNd readme
+CORE_ELEMENTS = ["PRCP", "SNOW", "SNWD", "TMAX", "TMIN"]
+# Key of the count of blank flags
+BLANK_FLAG = ""
+
+
+@dataclass
+class AssetScan:
+    """Metadata derived from the content of a data asset"""
+    row_count: int = 0
+    min_date: Optional[int] = None
+    max_date: Optional[int] = None
+    bbox: Optional[List[float]] = None
+    element_counts: Dict[str, int] = field(default_factory=dict)
+    flag_counts: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    # Count, minimum, maximum and sum of the values of each core element
+    value_totals: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+    @property
+    def start_datetime(self) -> Optional[datetime]:
+        """Start of the first day in the asset"""
+        if self.min_date is None:
+            return None
+        return _date_to_datetime(self.min_date)
+
+    @property
+    def end_datetime(self) -> Optional[datetime]:
+        """End of the last day in the asset"""
+        if self.max_date is None:
+            return None
+        return _date_to_datetime(self.max_date).replace(hour=23,
+                                                        minute=59,
+                                                        second=59)
+
+    @property
+    def element_statistics(self) -> Dict[str, Dict[str, Any]]:
+        """Count, minimum, maximum and mean value of each core element"""
+        return {
+            element: {
+                "count": totals["count"],
+                "minimum": totals["minimum"],
+                "maximum": totals["maximum"],
+                "mean": totals["sum"] / totals["count"],
+            }
+            for element, totals in sorted(self.value_totals.items())
+        }
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """Fold a chunk of rows into the scan
+
+        Args:
+            chunk (pd.DataFrame): Rows with at least the SCAN_COLUMNS, or
+                without the station coordinates, as read from by_year files
+        """
+        if len(chunk) == 0:
+            return
+        self.row_count += len(chunk)
+
+        dates = chunk[DATE_COLUMN].to_numpy().astype(np.int64)
+        self.min_date = _fold(min, self.min_date, int(dates.min()))
+        self.max_date = _fold(max, self.max_date, int(dates.max()))
+
+        # by_year files have no station coordinates
+        if LONGITUDE_COLUMN in chunk and LATITUDE_COLUMN in chunk:
+            longitude = chunk[LONGITUDE_COLUMN].to_numpy(np.float64)
+            latitude = chunk[LATITUDE_COLUMN].to_numpy(np.float64)
+            located = ~(np.isnan(longitude) | np.isnan(latitude))
+        else:
+            located = np.zeros(len(chunk), dtype=bool)
+        if located.any():
+            chunk_bbox = [
+                float(longitude[located].min()),
+                float(latitude[located].min()),
+                float(longitude[located].max()),
+                float(latitude[located].max()),
+            ]
+            if self.bbox is None:
+                self.bbox = chunk_bbox
+            else:
+                self.bbox = [
+                    min(self.bbox[0], chunk_bbox[0]),
+                    min(self.bbox[1], chunk_bbox[1]),
+                    max(self.bbox[2], chunk_bbox[2]),
+                    max(self.bbox[3], chunk_bbox[3]),
+                ]
+
+        # Group by dictionary codes, so the cost per row does not depend on
+        # the number of distinct values
+        elements, codes = _codes(chunk[ELEMENT_COLUMN])
+        _add_counts(self.element_counts, elements,
+                    np.bincount(codes[codes >= 0], minlength=len(elements)))
+        for column in FLAG_COLUMNS:
+            flags, flag_codes = _codes(chunk[column])
+            # Blank flags are missing from the dictionary, with code -1
+            _add_counts(self.flag_counts.setdefault(column, {}),
+                        [BLANK_FLAG] + flags,
+                        np.bincount(flag_codes + 1,
+                                    minlength=len(flags) + 1))
+
+        values = chunk[VALUE_COLUMN].to_numpy(np.float64)
+        valid = (codes >= 0) & ~np.isnan(values)
+        totals = np.bincount(codes[valid],
+                             weights=values[valid],
+                             minlength=len(elements))
+        counts = np.bincount(codes[valid], minlength=len(elements))
+        for code, element in enumerate(elements):
+            if element not in CORE_ELEMENTS or counts[code] == 0:
+                continue
+            selected = values[valid & (codes == code)]
+            current = self.value_totals.get(element)
+            chunk_totals = {
+                "count": int(counts[code]),
+                "minimum": int(selected.min()),
+                "maximum": int(selected.max()),
+                "sum": int(round(totals[code])),
+            }
+            if current is None:
+                self.value_totals[element] = chunk_totals
+            else:
+                current["count"] += chunk_totals["count"]
+                current["minimum"] = min(current["minimum"],
+                                         chunk_totals["minimum"])
+                current["maximum"] = max(current["maximum"],
+                                         chunk_totals["maximum"])
+                current["sum"] += chunk_totals["sum"]
+
+
+def _codes(series: pd.Series) -> Tuple[List[str], np.ndarray]:
+    """Dictionary encode a column, reusing the codes of categorical columns
+
+    Returns:
+        Tuple[List[str], np.ndarray]: The values and the int64 code of each
+            row, -1 for missing values
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype("category")
+    values = [str(value) for value in series.cat.categories]
+    return values, series.cat.codes.to_numpy().astype(np.int64)
+
+
+def _add_counts(counts: Dict[str, int], keys: Sequence[str],
+                values: np.ndarray) -> None:
+    for key, count in zip(keys, values):
+        if count:
+            counts[key] = counts.get(key, 0) + int(count)
+
+
+def _fold(function, current: Optional[int], value: int) -> int:
+    return value if current is None else function(current, value)
+
+
+def _date_to_datetime(date: int) -> datetime:
+    return datetime(date // 10000,
+                    date // 100 % 100,
+                    date % 100,
+                    tzinfo=timezone.utc)
+
+
+def has_header(file: IO[bytes]) -> bool:
+    """Whether a CSV starts with a header row, as the merged CSV does, and
+    unlike the by_year files
+
+    Args:
+        file (IO[bytes]): The CSV, rewound after its first line is read
+
+    Returns:
+        bool: True if the first field of the first line is the ID column
+    """
+    first_line = file.readline()
+    file.seek(0)
+    return first_line.split(b",", 1)[0].strip() == ID_COLUMN.encode()
+
+
+def iter_chunks(href: str,
+                columns: List[str],
+                chunksize: int = DEFAULT_CHUNKSIZE,
+                dtype: Optional[Dict[str, Any]] = None,
+                header: Optional[bool] = None) -> Iterator[pd.DataFrame]:
+    """Read selected columns of a data asset in chunks
+
+    by_year files have no header row and only the BY_YEAR_COLUMNS, so the
+    station columns are missing from their chunks.
+
+    Args:
+        href (str): HREF of a merged CSV or by_year file (optionally
+            compressed) or of a GeoParquet dataset written by
+            ``ghcnd convert``
+        columns (List[str]): Columns to read
+        chunksize (int): Maximum number of rows per chunk
+        dtype (Dict[str, Any], optional): pandas dtypes of CSV columns, by
+            default int32 dates and categorical elements
+        header (bool, optional): Whether a CSV has a header row, by default
+            detected from its first line, see has_header()
+
+    Returns:
+        Iterator[pd.DataFrame]: The chunks
+    """
+    if os.path.splitext(href.rstrip("/"))[1] == ".parquet":
+        from stactools.ghcnd.parquet import open_dataset
+
+        dataset = open_dataset(href)
+        for batch in dataset.to_batches(columns=columns,
+                                        batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        with fsspec.open(href, compression="infer") as file:
+            if dtype is None:
+                dtype = {
+                    DATE_COLUMN: np.int32,
+                    ELEMENT_COLUMN: "category",
+                }
+            if header is None:
+                header = has_header(file)
+            if header:
+                options: Dict[str, Any] = {"usecols": columns}
+            else:
+                options = {
+                    "header": None,
+                    "names": BY_YEAR_COLUMNS,
+                    "usecols":
+                    [name for name in columns if name in BY_YEAR_COLUMNS],
+                }
+            yield from pd.read_csv(file,
+                                   dtype=dtype,
+                                   chunksize=chunksize,
+                                   **options)
+
+
+def scan_data_asset(href: str,
+                    chunksize: int = DEFAULT_CHUNKSIZE) -> AssetScan:
+    """Derive Item metadata from the content of a data asset
+
+    The asset is read once, in chunks of ``chunksize`` rows, so memory use is
+    fixed regardless of the size of the asset.
+
+    Args:
+        href (str): HREF of the data asset
+        chunksize (int): Maximum number of rows held in memory
+
+    Returns:
+        AssetScan: Date range, station bbox, row count, per-ELEMENT and
+            per-flag counts and core element value statistics. by_year files
+            have no station coordinates and so no bbox.
+    """
+    result = AssetScan()
+    for chunk in iter_chunks(href, SCAN_COLUMNS, chunksize, SCAN_DTYPES):
+        result.update(chunk)
+    logger.debug(f"Scanned {result.row_count} rows of {href}")
+    return result
@@ -0,0 +1,214 @@
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from types import ModuleType
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import fsspec
+from pystac import Catalog, CatalogType
+
+from stactools.ghcnd.constants import STATION_TABLE_COLUMNS
+from stactools.ghcnd.stac import default_item_factory
+from stactools.ghcnd.timing import span
+
+orjson: Optional[ModuleType]
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 16
+DEFAULT_BATCH_SIZE = 256
+
+
+def dumps(value: Any) -> bytes:
+    """Encode a value as compact UTF-8 JSON, with orjson if installed"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":"),
+                      ensure_ascii=False).encode("utf-8")
+
+
+class FragmentEncoder:
+    """JSON encoder that splices in pre-encoded invariant values
+
+    Each fragment is a (key, value) pair, e.g. ("table:columns", [...]).
+    Wherever a dict has the key with the value, found by identity or
+    equality, the value is encoded once up front and copied into the output
+    instead of being encoded again. Only dicts are searched, not lists.
+
+    Args:
+        fragments (Iterable[Tuple[str, Any]]): The invariant values, by the
+            key they appear under
+    """
+    def __init__(self, fragments: Iterable[Tuple[str, Any]]):
+        self._fragments: Dict[str, List[Tuple[Any, str, bytes]]] = {}
+        self._markers: List[Tuple[bytes, bytes]] = []
+        for n, (key, value) in enumerate(fragments):
+            # A string that no STAC value contains, encoded the same way
+            # by json and orjson
+            marker = f"\x00{n}\x00"
+            self._fragments.setdefault(key, []).append(
+                (value, marker, dumps(value)))
+            self._markers.append((dumps(marker), dumps(value)))
+
+    def _replace(self, value: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy of the dict with fragments replaced by their marker, or the
+        same dict if it has none"""
+        replaced = None
+        for key, item in value.items():
+            new_item = item
+            if isinstance(item, dict):
+                new_item = self._replace(item)
+            elif key in self._fragments:
+                for fragment, marker, _ in self._fragments[key]:
+                    if item is fragment or item == fragment:
+                        new_item = marker
+                        break
+            if new_item is not item:
+                if replaced is None:
+                    replaced = dict(value)
+                replaced[key] = new_item
+        return value if replaced is None else replaced
+
+    def encode(self, value: Dict[str, Any]) -> bytes:
+        """Encode a dict as compact UTF-8 JSON
+
+        Args:
+            value (Dict[str, Any]): The dict, e.g. of an Item. It is not
+                modified.
+
+        Returns:
+            bytes: The JSON document
+        """
+        data = dumps(self._replace(value))
+        for marker, encoded in self._markers:
+            data = data.replace(marker, encoded)
+        return data
+
+
+def item_encoder() -> FragmentEncoder:
+    """FragmentEncoder for the templates shared by the Items of
+    stac.ItemFactory"""
+    factory = default_item_factory()
+    return FragmentEncoder([
+        ("table:columns", factory.table_columns),
+        ("table:columns", STATION_TABLE_COLUMNS),
+        ("proj:wkt2", factory.wkt2),
+        ("file:values", factory.file_values),
+    ])
+
+
+def write_files(files: Iterable[Tuple[str, bytes]],
+                workers: int = DEFAULT_WORKERS,
+                batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Write many small files
+
+    Files are written in batches: through the concurrent, batched pipe() of
+    asynchronous filesystems such as object storage, or else by a pool of
+    threads.
+
+    Args:
+        files (Iterable[Tuple[str, bytes]]): HREF and content of each file
+        workers (int): Number of threads writing to synchronous filesystems
+        batch_size (int): Number of files written at once
+
+    Returns:
+        int: Number of files written
+    """
+    count = 0
+    created_dirs = set()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+
+        def write(batch: Dict[str, bytes]) -> None:
+            fs, _, paths = fsspec.get_fs_token_paths(list(batch))
+            contents = dict(zip(paths, batch.values()))
+            if getattr(fs, "async_impl", False):
+                fs.pipe(contents)
+                return
+            for directory in {os.path.dirname(path) for path in paths}:
+                if directory not in created_dirs:
+                    fs.makedirs(directory, exist_ok=True)
+                    created_dirs.add(directory)
+            list(executor.map(lambda item: fs.pipe_file(*item),
+                              contents.items()))
+
+        batch: Dict[str, bytes] = {}
+        for href, data in files:
+            batch[href] = data
+            if len(batch) >= batch_size:
+                write(batch)
+                count += len(batch)
+                batch = {}
+        if batch:
+            write(batch)
+            count += len(batch)
+    return count
+
+
+def _catalog_self_link(catalog: Catalog, root: Catalog) -> bool:
+    """Whether Catalog.save includes the self link of a catalog"""
+    if root.catalog_type == CatalogType.ABSOLUTE_PUBLISHED:
+        return True
+    return root.catalog_type != CatalogType.SELF_CONTAINED \
+        and catalog is root
+
+
+def _item_self_link(root: Catalog) -> bool:
+    """Whether Catalog.save includes the self link of Items"""
+    return root.catalog_type == CatalogType.ABSOLUTE_PUBLISHED
+
+
+def _iter_files(catalog: Catalog,
+                encoder: FragmentEncoder) -> Iterator[Tuple[str, bytes]]:
+    root = catalog.get_root() or catalog
+    include_item_self_links = _item_self_link(root)
+    for parent, _, items in catalog.walk():
+        for item in items:
+            href = item.get_self_href()
+            if href is None:
+                raise ValueError(f"Item {item.id} has no self HREF")
+            yield href, encoder.encode(
+                item.to_dict(include_self_link=include_item_self_links))
+        href = parent.get_self_href()
+        if href is None:
+            raise ValueError(f"Catalog {parent.id} has no self HREF")
+        yield href, dumps(
+            parent.to_dict(
+                include_self_link=_catalog_self_link(parent, root)))
+
+
+def save_catalog(catalog: Catalog,
+                 encoder: Optional[FragmentEncoder] = None,
+                 workers: int = DEFAULT_WORKERS,
+                 batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Save a Catalog or Collection, its children and Items to their self
+    HREFs, e.g. after normalize_hrefs
+
+    Writes the same files with the same links as Catalog.save(), including
+    self links as the catalog type of the root requires, but as compact JSON
+    encoded with orjson if installed, see dumps(), instead of indented JSON.
+    The templates shared by the Items are encoded once, see item_encoder(),
+    and files are written in batches, see write_files().
+
+    Args:
+        catalog (Catalog): The Catalog or Collection
+        encoder (FragmentEncoder, optional): Encoder of the Items, by default
+            item_encoder()
+        workers (int): Number of threads writing files
+        batch_size (int): Number of files written at once
+
+    Returns:
+        int: Number of files written
+    """
+    if encoder is None:
+        encoder = item_encoder()
+    with span("save_catalog", href=catalog.get_self_href()):
+        count = write_files(_iter_files(catalog, encoder),
+                            workers=workers,
+                            batch_size=batch_size)
+    logger.info(f"Saved {count} STAC objects of {catalog.id}")
+    return count
@@ -1,6 +1,22 @@
 import logging
 import mimetypes
-from typing import Any, List, Optional, Callable
+import os
+import re
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import lru_cache
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
 
 import fsspec
 from pystac import (
@@ -22,16 +38,22 @@ from pystac.extensions.scientific import ScientificExtension
 from pystac.item import Item
 from pystac.link import Link
 from pystac.rel_type import RelType
-from pystac.utils import str_to_datetime
+from pystac.utils import datetime_to_str, str_to_datetime
 from shapely.geometry.geo import box
 
+from stactools.ghcnd import validation
+from stactools.ghcnd.cache import AssetCache
+from stactools.ghcnd.checksum import (
+    FileInfo,
+    asset_file_info,
+    asset_file_infos,
+)
 from stactools.ghcnd.constants import (
     ADDITIONAL_METADATA_URL,
     CITATION,
     DATA_TABLE_COLUMNS,
     DOI,
     ELEMENTS_VALUES,
-    GHCND_CRS,
     GHCND_DESCRIPTION,
     GHCND_EPSG,
     GHCND_ID,
@@ -40,16 +62,28 @@ from stactools.ghcnd.constants import (
     LICENSE,
     LICENSE_LINK,
     METADATA_URL,
+    PARQUET_MEDIA_TYPE,
     PRIMARY_GEOMETRY_COLUMN,
     PROVIDERS,
     SPATIAL_EXTENT,
     STATION_TABLE_COLUMNS,
     STATIONS_URL,
     TEMPORAL_EXTENT,
+    ghcnd_crs,
 )
+from stactools.ghcnd.scan import AssetScan, scan_data_asset
+from stactools.ghcnd.timing import Span, emit, is_enabled, isolated, span
 
 logger = logging.getLogger(__name__)
 
+# by_year files are named after the year they contain, e.g. "1763.csv.gz"
+YEAR_HREF_PATTERN = re.compile(r"^(\d{4})\.csv")
+
+TABLE_EXTENSION_SCHEMA = "https://stac-extensions.github.io/table/v1.0.0/schema.json"
+
+# Items submitted to each worker process ahead of the one being collected
+PENDING_ITEMS_PER_WORKER = 4
+
 
 def create_collection() -> Collection:
     """Create a STAC Collection
@@ -137,120 +171,615 @@ def create_collection() -> Collection:
     return collection
 
 
-def create_item(data_asset_href: str,
+def year_from_href(href: str) -> Optional[int]:
+    """Get the year of a GHCNd by_year file from its HREF
+
+    Args:
+        href (str): HREF of a by_year file, e.g. ".../by_year/1763.csv.gz"
+
+    Returns:
+        Optional[int]: The year, or None if the HREF is not a by_year file
+    """
+    match = YEAR_HREF_PATTERN.match(os.path.basename(href))
+    if match is None:
+        return None
+    return int(match.group(1))
+
+
+def item_id(year: Optional[int] = None) -> str:
+    """Get the ID of the Item of a data asset
+
+    Args:
+        year (int, optional): The year covered by the data asset, see
+            year_from_href
+
+    Returns:
+        str: The Item ID, e.g. "GHCNd-1763", or "GHCNd" without a year
+    """
+    if year is None:
+        return "GHCNd"
+    return f"GHCNd-{year}"
+
+
+def check_item_ids(data_asset_hrefs: Iterable[str]) -> None:
+    """Check that the data assets get Items with distinct IDs
+
+    Only assets named like the by_year files get an Item ID of their own,
+    so a Collection can hold at most one other asset, e.g. the merged CSV.
+
+    Args:
+        data_asset_hrefs (Iterable[str]): HREFs of the data assets
+
+    Raises:
+        ValueError: If two assets would get the same Item ID, and so be
+            written to the same path
+    """
+    hrefs: Dict[str, str] = {}
+    for href in data_asset_hrefs:
+        key = item_id(year_from_href(href))
+        if key in hrefs:
+            raise ValueError(f"{hrefs[key]} and {href} would both be the "
+                             f"Item {key}, only by_year files are named by "
+                             "their year")
+        hrefs[key] = href
+
+
+def asset_media_type(href: str) -> Optional[str]:
+    """Guess the media type of a data asset
+
+    Args:
+        href (str): HREF of the data asset
+
+    Returns:
+        Optional[str]: The media type, or None if it cannot be guessed
+    """
+    if os.path.splitext(href.rstrip("/"))[1] == ".parquet":
+        return PARQUET_MEDIA_TYPE
+    return mimetypes.guess_type(href)[0]
+
+
+def asset_size(href: str,
+               cache: Optional[AssetCache] = None) -> Optional[int]:
+    """Get the size of a data asset in bytes
+
+    Args:
+        href (str): HREF of the data asset, either a file or a directory such
+            as a partitioned Parquet dataset
+        cache (AssetCache, optional): Cache to reuse the size from while the
+            asset is unchanged
+
+    Returns:
+        Optional[int]: Size in bytes, or None if it is not known
+    """
+    if cache is not None:
+        return cache.stat(href)["size"]
+    fs, _, (path, ) = fsspec.get_fs_token_paths(href)
+    if fs.isdir(path):
+        return fs.du(path, total=True)
+    with fs.open(path) as file:
+        return file.size
+
+
+def bbox_to_geometry(bbox: List[float]) -> Dict[str, Any]:
+    """Create a GeoJSON geometry covering a bbox
+
+    Args:
+        bbox (List[float]): [xmin, ymin, xmax, ymax]
+
+    Returns:
+        Dict[str, Any]: A Point if the bbox is a single location, else a
+            Polygon
+    """
+    if bbox[0] == bbox[2] and bbox[1] == bbox[3]:
+        return {"type": "Point", "coordinates": [bbox[0], bbox[1]]}
+    polygon = box(*bbox, ccw=True)
+    coordinates = [list(i) for i in list(polygon.exterior.coords)]
+    return {"type": "Polygon", "coordinates": [coordinates]}
+
+
+def merged_table_columns() -> List[Dict[str, Any]]:
+    """Columns of the data asset: the data and station tables left merged on
+    column "ID", plus the geometry column
+
+    Returns:
+        List[Dict[str, Any]]: table:columns entries
+    """
+    table_columns = DATA_TABLE_COLUMNS + STATION_TABLE_COLUMNS + [
+        PRIMARY_GEOMETRY_COLUMN
+    ]
+    # Keep the last occurrence of duplicated columns, i.e. "ID" is listed with
+    # the station columns
+    seen = set()
+    merged = []
+    for column in reversed(table_columns):
+        if column["name"] not in seen:
+            seen.add(column["name"])
+            merged.append(column)
+    merged.reverse()
+    return merged
+
+
+class ItemFactory:
+    """Creates GHCNd STAC Items from templates computed once
+
+    Everything that is the same for every Item (table columns, WKT2 string,
+    file:values, the default geometry, station and metadata assets) is built
+    when the factory is created, so creating many Items, e.g. one per year,
+    only costs the per-Item fields and the data asset size lookup.
+
+    The templates are shared by all Items of a factory and must be treated as
+    read-only.
+    """
+    def __init__(self) -> None:
+        self.table_columns = merged_table_columns()
+        with span("projection_wkt"):
+            self.wkt2 = ghcnd_crs().to_wkt()
+        self.default_geometry = bbox_to_geometry(SPATIAL_EXTENT)
+        self.file_values = [{
+            "values": [value],
+            "summary": summary,
+        } for value, summary in ELEMENTS_VALUES.items()]
+        self.stac_extensions = [
+            TABLE_EXTENSION_SCHEMA,
+            ScientificExtension.get_schema_uri(),
+            ProjectionExtension.get_schema_uri(),
+        ]
+        self.metadata_assets: Dict[str, Dict[str, Any]] = {
+            "GHCNd Stations": {
+                "media_type": MediaType.TEXT,
+                "roles": ["metadata"],
+                "title": "GHCNd Stations",
+                "href": STATIONS_URL,
+                "extra_fields": {
+                    "table:columns": STATION_TABLE_COLUMNS,
+                },
+            },
+            "Metadata": {
+                "media_type": MediaType.TEXT,
+                "roles": ["metadata"],
+                "title": "GHCNd Metadata",
+                "href": METADATA_URL,
+            },
+            "Metadata, Additional": {
+                "media_type": MediaType.TEXT,
+                "roles": ["metadata"],
+                "title": "Metadata, Additional",
+                "href": ADDITIONAL_METADATA_URL,
+            },
+        }
+
+    def create_item(
+        self,
+        data_asset_href: str,
+        data_href_modifier: Optional[Callable] = None,
+        year: Optional[int] = None,
+        scan: bool = False,
+        cache: Optional[AssetCache] = None,
+        checksum: bool = False,
+        file_info: Optional[FileInfo] = None,
+        index_href: Optional[str] = None,
+    ) -> Item:
+        """Create a STAC Item
+        Create a STAC Item for one year of the GHCNd.
+
+        Args:
+            data_asset_href (str): The HREF pointing to the data asset
+                associated with the item
+            data_href_modifier (Callable, optional): Function applied to the
+                data asset HREF before it is opened, e.g. to sign it
+            year (int, optional): The year covered by the data asset. If
+                given, the Item ID and datetimes are set for that year instead
+                of the full GHCNd temporal extent.
+            scan (bool): Read the data asset once to derive the datetimes,
+                bbox, row count, per-ELEMENT and per-flag counts and core
+                element statistics from its content. Takes precedence over
+                year.
+            cache (AssetCache, optional): Cache for the data asset size and
+                checksum, so unchanged assets are not opened again
+            checksum (bool): Set file:checksum of the data asset, hashing it
+                in the same read as the size lookup
+            file_info (FileInfo, optional): Size and checksum of the data
+                asset if already known, e.g. computed by create_items
+
+        Returns:
+            Item: STAC Item object
+        """
+        if data_href_modifier is not None:
+            data_mod_href = data_href_modifier(data_asset_href)
+        else:
+            data_mod_href = data_asset_href
+
+        if scan:
+            with span("scan", href=data_asset_href):
+                asset_scan: Optional[AssetScan] = scan_data_asset(
+                    data_mod_href)
+        else:
+            asset_scan = None
+        if asset_scan is not None and asset_scan.bbox is not None:
+            bbox = asset_scan.bbox
+            geometry = bbox_to_geometry(bbox)
+        else:
+            bbox = SPATIAL_EXTENT
+            geometry = self.default_geometry
+
+        if year is not None:
+            start_datetime = f"{year:04d}-01-01T00:00:00Z"
+            end_datetime = f"{year:04d}-12-31T23:59:59Z"
+        else:
+            start_datetime = TEMPORAL_EXTENT[0]
+            end_datetime = TEMPORAL_EXTENT[1]
+        if asset_scan is not None:
+            scan_start = asset_scan.start_datetime
+            scan_end = asset_scan.end_datetime
+            if scan_start is not None and scan_end is not None:
+                start_datetime = datetime_to_str(scan_start)
+                end_datetime = datetime_to_str(scan_end)
+
+        # Scientific and Projection Extension fields are set directly rather
+        # than through the extension classes, which is equivalent and avoids
+        # their per-call overhead
+        properties: Dict[str, Any] = {
+            "title": "GHCNd",
+            "description": "Global Historical Climate Network-daily",
+            "start_datetime": start_datetime,
+            "end_datetime": end_datetime,
+            "table:columns": self.table_columns,
+            "table:primary_geometry": PRIMARY_GEOMETRY_COLUMN["name"],
+        }
+        if asset_scan is not None:
+            properties["table:row_count"] = asset_scan.row_count
+        properties["sci:doi"] = DOI
+        properties["sci:citation"] = CITATION
+        projection = {
+            "proj:epsg": GHCND_EPSG,
+            "proj:wkt2": self.wkt2,
+            "proj:bbox": bbox,
+            "proj:geometry": geometry,
+        }
+        properties.update(projection)
+
+        item = Item(id=item_id(year),
+                    geometry=geometry,
+                    bbox=bbox,
+                    datetime=str_to_datetime(start_datetime),
+                    properties=properties,
+                    stac_extensions=list(self.stac_extensions))
+
+        data_asset_fields: Dict[str, Any] = {
+            "table:columns": self.table_columns,
+        }
+        if asset_scan is not None:
+            data_asset_fields["table:row_count"] = asset_scan.row_count
+            data_asset_fields[
+                "ghcnd:element_counts"] = asset_scan.element_counts
+            data_asset_fields["ghcnd:flag_counts"] = asset_scan.flag_counts
+            data_asset_fields[
+                "ghcnd:element_statistics"] = asset_scan.element_statistics
+        data_asset_fields.update(projection)
+        data_asset_fields["file:values"] = self.file_values
+        if file_info is None:
+            if checksum:
+                with span("asset_checksum", href=data_asset_href):
+                    file_info = asset_file_info(data_mod_href, cache=cache)
+            else:
+                with span("asset_size", href=data_asset_href):
+                    file_info = FileInfo(
+                        asset_size(data_mod_href, cache=cache), None)
+        if file_info.size is not None:
+            data_asset_fields["file:size"] = file_info.size
+        if file_info.checksum is not None:
+            data_asset_fields["file:checksum"] = file_info.checksum
+        item.add_asset(
+            "data",
+            Asset(href=data_asset_href,
+                  media_type=asset_media_type(data_asset_href),
+                  roles=["data"],
+                  title="GHCNd Values",
+                  extra_fields=data_asset_fields))
+        item.stac_extensions.append(FileExtension.get_schema_uri())
+
+        for key, template in self.metadata_assets.items():
+            item.add_asset(
+                key,
+                Asset(href=template["href"],
+                      title=template["title"],
+                      media_type=template["media_type"],
+                      roles=list(template["roles"]),
+                      extra_fields=dict(template.get("extra_fields", {}))))
+
+        if index_href is not None:
+            item.add_asset(
+                "index",
+                Asset(href=index_href,
+                      media_type=PARQUET_MEDIA_TYPE,
+                      roles=["metadata", "index"],
+                      title="Byte ranges of each station and year"))
+
+        return item
+
+    def create_items(self, data_asset_hrefs: Iterable[str],
+                     **kwargs: Any) -> Iterator[Item]:
+        """Create one STAC Item per data asset, in the current process
+
+        Assets named like the by_year files (e.g. "1763.csv.gz") get an Item
+        for that year.
+
+        Args:
+            data_asset_hrefs (Iterable[str]): HREFs of the data assets
+            **kwargs: Passed to create_item
+
+        Returns:
+            Iterator[Item]: STAC Item objects, in the order of the HREFs
+
+        Raises:
+            ValueError: If two assets would get the same Item ID, see
+                check_item_ids
+        """
+        data_asset_hrefs = list(data_asset_hrefs)
+        check_item_ids(data_asset_hrefs)
+        for href in data_asset_hrefs:
+            yield self.create_item(href, year=year_from_href(href), **kwargs)
+
+
+@lru_cache(maxsize=None)
+def default_item_factory() -> ItemFactory:
+    """The ItemFactory used by create_item, created on first use"""
+    return ItemFactory()
+
+
+def create_item(
+    data_asset_href: str,
     data_href_modifier: Optional[Callable] = None,
+    year: Optional[int] = None,
+    scan: bool = False,
+    cache: Optional[AssetCache] = None,
+    checksum: bool = False,
+    index_href: Optional[str] = None,
 ) -> Item:
     """Create a STAC Item
     Create a STAC Item for one year of the GHCNd.
 
     Args:
         data_asset_href (str): The HREF pointing to the data asset associated with the item
+        data_href_modifier (Callable, optional): Function applied to the data
+            asset HREF before it is opened, e.g. to sign it
+        year (int, optional): The year covered by the data asset. If given,
+            the Item ID and datetimes are set for that year instead of the
+            full GHCNd temporal extent.
+        scan (bool): Read the data asset once to derive the datetimes, bbox,
+            row count, per-ELEMENT and per-flag counts and core element
+            statistics from its content. Takes precedence over year.
+        cache (AssetCache, optional): Cache for the data asset size and
+            checksum, so unchanged assets are not opened again
+        checksum (bool): Set file:checksum of the data asset, hashing it in
+            the same read as the size lookup
+        index_href (str, optional): HREF of a byte-offset index of the data
+            asset, added as the "index" asset
 
     Returns:
         Item: STAC Item object
     """
-    if data_href_modifier is not None:
-        data_mod_href = data_href_modifier(data_asset_href)
-    else:
-        data_mod_href = data_asset_href
+    return default_item_factory().create_item(
+        data_asset_href,
+        data_href_modifier=data_href_modifier,
+        year=year,
+        scan=scan,
+        cache=cache,
+        checksum=checksum,
+        index_href=index_href)
+
+
+def _create_item_dict(
+    data_asset_href: str,
+    data_href_modifier: Optional[Callable],
+    validate: bool,
+    scan: bool,
+    cache: Optional[AssetCache],
+    file_info: Optional[FileInfo],
+    schema_dir: Optional[str],
+    offline: bool,
+    collect_spans: bool,
+) -> Tuple[Dict[str, Any], List[Span]]:
+    """Worker function for create_items; returns a plain dict so the result
+    is cheap to send back to the parent process, along with the Spans
+    recorded if collect_spans is set. The Item is validated here, with the
+    validator of this process, so it is only pickled once."""
+    if validate and schema_dir is not None:
+        validation.use_schema_cache(schema_dir, offline)
+    with isolated() if collect_spans else nullcontext() as profiler:
+        with span("create_item", href=data_asset_href):
+            item = default_item_factory().create_item(
+                data_asset_href,
+                data_href_modifier=data_href_modifier,
+                year=year_from_href(data_asset_href),
+                scan=scan,
+                cache=cache,
+                file_info=file_info)
+        item_dict = item.to_dict(include_self_link=False)
+        if validate:
+            with span("validate_item", href=data_asset_href):
+                validation.validate_dict(item_dict)
+    spans = profiler.spans if profiler is not None else []
+    return item_dict, spans
+
+
+def iter_item_dicts(
+    data_asset_hrefs: Iterable[str],
+    data_href_modifier: Optional[Callable] = None,
+    workers: int = 1,
+    validate_mode: str = "none",
+    scan: bool = False,
+    cache: Optional[AssetCache] = None,
+    checksum: bool = False,
+    sample_size: int = validation.DEFAULT_SAMPLE_SIZE,
+    schema_dir: Optional[str] = None,
+    offline: bool = False,
+) -> Iterator[Dict[str, Any]]:
+    """Create STAC Items for many data assets, as dicts, one at a time
+    Unlike create_items, no pystac objects are created and at most a few
+    Items per worker are held in memory, so any number of Items can be
+    streamed to disk, see export.
 
-    polygon = box(*SPATIAL_EXTENT, ccw=True)
-    coordinates = [list(i) for i in list(polygon.exterior.coords)]
-    geometry = {"type": "Polygon", "coordinates": [coordinates]}
+    Args:
+        data_asset_hrefs (Iterable[str]): HREFs of the data assets
+        data_href_modifier (Callable, optional): Function applied to each data
+            asset HREF before it is opened. Must be picklable if workers > 1.
+        workers (int): Number of worker processes. 1 creates the Items in
+            the current process.
+        validate_mode (str): "full", "sample" or "none", see
+            validation.select(). Each selected Item is validated in the
+            worker that created it.
+        scan (bool): Derive Item metadata from the content of each asset,
+            see create_item
+        cache (AssetCache, optional): Cache for data asset sizes and
+            checksums, shared by all workers
+        checksum (bool): Set file:checksum of each data asset. The assets
+            are hashed up front in a pool of threads, one per worker.
+        sample_size (int): Number of Items validated in "sample" mode
+        schema_dir (str, optional): Local schema directory used by the
+            workers, see validation.use_schema_cache()
+        offline (bool): Raise instead of downloading schemas missing from
+            schema_dir
 
-    # Data & Station tables assumed to be left merged on column "ID"
-    table_columns = DATA_TABLE_COLUMNS + STATION_TABLE_COLUMNS + [
-        PRIMARY_GEOMETRY_COLUMN
-    ]
-    table_columns = [
-        i for n, i in enumerate(table_columns)
-        if i not in table_columns[n + 1:]
-    ]
+    Returns:
+        Iterator[Dict[str, Any]]: STAC Item dicts, in the order of
+            data_asset_hrefs
 
-    properties = {
-        "title": "GHCNd",
-        "description": "Global Historical Climate Network-daily",
-        "start_datetime": TEMPORAL_EXTENT[0],
-        "end_datetime": TEMPORAL_EXTENT[1],
-        "table:columns": table_columns,
-        "table:primary_geometry": PRIMARY_GEOMETRY_COLUMN["name"],
-    }
+    Raises:
+        ValueError: If two assets would get the same Item ID, see
+            check_item_ids
+    """
+    hrefs = list(data_asset_hrefs)
+    check_item_ids(hrefs)
+    pool = workers > 1 and len(hrefs) > 1
+    # Spans recorded in workers are sent back to the hooks of this process
+    collect_spans = pool and is_enabled()
+    if checksum:
+        if data_href_modifier is not None:
+            mod_hrefs = [data_href_modifier(href) for href in hrefs]
+        else:
+            mod_hrefs = hrefs
+        with span("asset_checksums", count=len(hrefs)):
+            infos = asset_file_infos(mod_hrefs, cache=cache, workers=workers)
+        file_infos: List[Optional[FileInfo]] = [
+            infos[href] for href in mod_hrefs
+        ]
+    else:
+        file_infos = [None] * len(hrefs)
+    selected = set(
+        validation.select(list(range(len(hrefs))), validate_mode,
+                          sample_size))
+    args = zip(
+        hrefs,
+        [data_href_modifier] * len(hrefs),
+        [i in selected for i in range(len(hrefs))],
+        *([value] * len(hrefs) for value in (scan, cache)),
+        file_infos,
+        *([value] * len(hrefs)
+          for value in (schema_dir, offline, collect_spans)),
+    )
 
-    item = Item(
-        id="GHCNd",
-        geometry=geometry,
-        bbox=SPATIAL_EXTENT,
-        datetime=str_to_datetime(TEMPORAL_EXTENT[0]),
-        properties=properties,
-        stac_extensions=[
-            "https://stac-extensions.github.io/table/v1.0.0/schema.json"
-        ])
-
-    # Scientific Extension
-    sci_ext = ScientificExtension.ext(item, add_if_missing=True)
-    sci_ext.doi = DOI
-    sci_ext.citation = CITATION
+    if not pool:
+        for arg in args:
+            item_dict, _ = _create_item_dict(*arg)
+            yield item_dict
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Only keep a bounded number of Items in flight
+        pending: Deque[Future] = deque()
+        for arg in args:
+            pending.append(executor.submit(_create_item_dict, *arg))
+            if len(pending) >= workers * PENDING_ITEMS_PER_WORKER:
+                yield _collect(pending.popleft())
+        while pending:
+            yield _collect(pending.popleft())
+
+
+def _collect(future: Future) -> Dict[str, Any]:
+    """The Item dict of a worker, passing its Spans to this process' hooks"""
+    item_dict, spans = future.result()
+    for span_ in spans:
+        emit(span_)
+    return item_dict
+
+
+def create_items(
+    data_asset_hrefs: Iterable[str],
+    data_href_modifier: Optional[Callable] = None,
+    workers: int = 1,
+    validate_mode: str = "none",
+    scan: bool = False,
+    cache: Optional[AssetCache] = None,
+    checksum: bool = False,
+    sample_size: int = validation.DEFAULT_SAMPLE_SIZE,
+    schema_dir: Optional[str] = None,
+    offline: bool = False,
+) -> List[Item]:
+    """Create STAC Items for many data assets
+    Create one STAC Item per data asset, spreading the work over a pool of
+    processes. Assets named like the by_year files (e.g. "1763.csv.gz") get
+    an Item for that year.
 
-    # Projection Extensions
-    proj_ext = ProjectionExtension.ext(item, add_if_missing=True)
-    proj_ext.epsg = GHCND_EPSG
-    proj_ext.wkt2 = GHCND_CRS.to_wkt()
-    proj_ext.bbox = SPATIAL_EXTENT
-    proj_ext.geometry = geometry
-
-    media_type = mimetypes.guess_type(data_asset_href)[0]
-    data_asset = Asset(href=data_asset_href,
-                       media_type=media_type,
-                       roles=["data"],
-                       title="GHCNd Values",
-                       extra_fields={
-                           "table:columns": table_columns,
-                       })
-    item.add_asset("data", data_asset)
-
-    item.add_asset(
-        "GHCNd Stations",
-        Asset(media_type=MediaType.TEXT,
-              roles=["metadata"],
-              title="GHCNd Stations",
-              href=STATIONS_URL,
-              extra_fields={
-                  "table:columns": STATION_TABLE_COLUMNS,
-              }))
+    Args:
+        data_asset_hrefs (Iterable[str]): HREFs of the data assets
+        data_href_modifier (Callable, optional): Function applied to each data
+            asset HREF before it is opened. Must be picklable if workers > 1.
+        workers (int): Number of worker processes. 1 creates the Items in
+            the current process.
+        validate_mode (str): "full", "sample" or "none", see
+            validation.select(). Each selected Item is validated in the
+            worker that created it.
+        scan (bool): Derive Item metadata from the content of each asset,
+            see create_item
+        cache (AssetCache, optional): Cache for data asset sizes and
+            checksums, shared by all workers
+        checksum (bool): Set file:checksum of each data asset. The assets
+            are hashed up front in a pool of threads, one per worker.
+        sample_size (int): Number of Items validated in "sample" mode
+        schema_dir (str, optional): Local schema directory used by the
+            workers, see validation.use_schema_cache()
+        offline (bool): Raise instead of downloading schemas missing from
+            schema_dir
 
-    item.add_asset(
-        "Metadata",
-        Asset(media_type=MediaType.TEXT,
-              roles=["metadata"],
-              title="GHCNd Metadata",
-              href=METADATA_URL))
+    Returns:
+        List[Item]: STAC Item objects, in the order of data_asset_hrefs
+    """
+    hrefs = list(data_asset_hrefs)
+    with span("create_items", count=len(hrefs), workers=workers):
+        item_dicts = list(
+            iter_item_dicts(hrefs,
+                            data_href_modifier=data_href_modifier,
+                            workers=workers,
+                            validate_mode=validate_mode,
+                            scan=scan,
+                            cache=cache,
+                            checksum=checksum,
+                            sample_size=sample_size,
+                            schema_dir=schema_dir,
+                            offline=offline))
+    return [
+        Item.from_dict(item_dict, preserve_dict=False)
+        for item_dict in item_dicts
+    ]
 
-    item.add_asset(
-        "Metadata, Additional",
-        Asset(media_type=MediaType.TEXT,
-              roles=["metadata"],
-              title="Metadata, Additional",
-              href=ADDITIONAL_METADATA_URL))
 
-    # Asset Projection Extension
-    data_asset_proj_ext = ProjectionExtension.ext(data_asset,
-                                                  add_if_missing=True)
-    data_asset_proj_ext.epsg = proj_ext.epsg
-    data_asset_proj_ext.wkt2 = proj_ext.wkt2
-    data_asset_proj_ext.bbox = proj_ext.bbox
-    data_asset_proj_ext.geometry = proj_ext.geometry
-
-    # File Extension
-    data_asset_file_ext = FileExtension.ext(data_asset, add_if_missing=True)
-    # The following odd type annotation is needed
-    mapping: List[Any] = [{
-        "values": [value],
-        "summary": summary,
-    } for value, summary in ELEMENTS_VALUES.items()]
-    data_asset_file_ext.values = mapping
-    with fsspec.open(data_mod_href) as file:
-        size = file.size
-        if size is not None:
-            data_asset_file_ext.size = size
-
-    return item
+def expand_sources(source: str) -> List[str]:
+    """Expand a source HREF into a list of data asset HREFs
+
+    Args:
+        source (str): A single file, a directory, or a glob pattern
+
+    Returns:
+        List[str]: The matching data asset HREFs, sorted
+    """
+    fs, _, paths = fsspec.get_fs_token_paths(source)
+    if len(paths) == 1 and fs.isdir(paths[0]):
+        paths = [
+            path for path in fs.ls(paths[0], detail=False)
+            if not fs.isdir(path)
+        ]
+    protocol = fs.protocol if isinstance(fs.protocol, str) else fs.protocol[0]
+    if protocol in ("file", "local"):
+        return sorted(paths)
+    return sorted(fs.unstrip_protocol(path) for path in paths)
@@ -0,0 +1,133 @@
+import os
+from typing import Any, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+ID_COLUMN = "ID"
+# Station IDs are 11 ASCII characters, see the GHCNd readme
+ID_WIDTH = 11
+KEY_COLUMN = "_key"
+FILE_NAME = "stations.arrow"
+
+
+class StationTable:
+    """Station table sorted by ID, with a lookup of the rows of station IDs
+
+    The IDs are kept as a fixed-width binary column, whose data buffer is
+    viewed as a sorted NumPy array of 11 byte strings and searched with
+    numpy.searchsorted, so no per-process dict of IDs is built. Once
+    share()d, the table lives in a memory-mapped Arrow IPC file: pickling it
+    for a worker process only sends the path, and every worker maps the
+    same pages, so memory per worker does not grow with the station count.
+
+    Args:
+        table (pa.Table): Table with an ID column, sorted by ID, as returned
+            by from_table()
+        path (str, optional): Path of the IPC file the table is mapped from
+    """
+    def __init__(self, table: pa.Table, path: Optional[str] = None):
+        self.table = table
+        self.path = path
+        column = table.column(KEY_COLUMN)
+        if column.num_chunks == 1:
+            keys = column.chunk(0)
+        else:
+            keys = column.combine_chunks()
+        data = keys.buffers()[1]
+        if data is None:
+            self.ids = np.empty(0, dtype=f"S{ID_WIDTH}")
+        else:
+            self.ids = np.frombuffer(data,
+                                     dtype=f"S{ID_WIDTH}",
+                                     count=len(keys),
+                                     offset=keys.offset * ID_WIDTH)
+
+    @classmethod
+    def from_table(cls, table: pa.Table) -> "StationTable":
+        """Sort a station table by ID and add its lookup key
+
+        Args:
+            table (pa.Table): Table with an ID column
+
+        Returns:
+            StationTable: The table, in memory
+        """
+        order = pc.sort_indices(table, sort_keys=[(ID_COLUMN, "ascending")])
+        table = table.take(order)
+        ids = table.column(ID_COLUMN).to_numpy(zero_copy_only=False)
+        keys = np.asarray(ids, dtype=f"S{ID_WIDTH}")
+        key_array = pa.Array.from_buffers(pa.binary(ID_WIDTH), len(keys),
+                                          [None, pa.py_buffer(keys)])
+        table = table.append_column(KEY_COLUMN, key_array)
+        return cls(table.combine_chunks())
+
+    @classmethod
+    def open(cls, path: str) -> "StationTable":
+        """Map a table written by share(), without copying it
+
+        Args:
+            path (str): Path of the IPC file
+
+        Returns:
+            StationTable: The memory-mapped table
+        """
+        with pa.memory_map(path) as source:
+            table = pa.ipc.open_file(source).read_all()
+        return cls(table, path)
+
+    def share(self, directory: str) -> "StationTable":
+        """Write the table to an Arrow IPC file and map it
+
+        Args:
+            directory (str): Local directory of the file, e.g. a temporary
+                directory that outlives the worker processes
+
+        Returns:
+            StationTable: The memory-mapped table, pickled by path
+        """
+        path = os.path.join(directory, FILE_NAME)
+        with pa.OSFile(path, "wb") as sink:
+            with pa.ipc.new_file(sink, self.table.schema) as writer:
+                writer.write_table(self.table)
+        return StationTable.open(path)
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        if self.path is not None:
+            return (StationTable.open, (self.path, ))
+        return (StationTable, (self.table, ))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def lookup(self, station_ids: Union[np.ndarray,
+                                        Sequence[str]]) -> np.ndarray:
+        """Rows of station IDs
+
+        Args:
+            station_ids (np.ndarray or Sequence[str]): Station IDs
+
+        Returns:
+            np.ndarray: Row index of each ID, -1 for unknown stations
+        """
+        keys = np.asarray(station_ids, dtype=f"S{ID_WIDTH}")
+        if len(self.ids) == 0:
+            return np.full(len(keys), -1, dtype=np.int64)
+        rows = np.searchsorted(self.ids, keys)
+        rows = np.minimum(rows, len(self.ids) - 1)
+        return np.where(self.ids[rows] == keys, rows, -1)
+
+    def take(self, station_ids: Union[np.ndarray,
+                                      Sequence[str]]) -> pa.Table:
+        """Rows of station IDs, without the lookup key
+
+        Args:
+            station_ids (np.ndarray or Sequence[str]): Station IDs
+
+        Returns:
+            pa.Table: One row per ID, null for unknown stations
+        """
+        rows = self.lookup(station_ids)
+        indices = pa.array(rows, mask=rows < 0)
+        return self.table.drop([KEY_COLUMN]).take(indices)
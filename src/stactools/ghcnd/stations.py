@@ -0,0 +1,616 @@
+import json
+import logging
+import os
+import re
+import tempfile
+from collections import defaultdict, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import groupby
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+import fsspec
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pystac
+from pystac.extensions.projection import ProjectionExtension
+from pystac.extensions.scientific import ScientificExtension
+
+from stactools.ghcnd import validation
+from stactools.ghcnd.cache import AssetCache
+from stactools.ghcnd.constants import (
+    CITATION,
+    DATA_TABLE_COLUMNS,
+    DOI,
+    GHCND_EPSG,
+    GHCND_ID,
+    INVENTORY_TABLE_COLUMNS,
+    INVENTORY_URL,
+    STATION_TABLE_COLUMNS,
+    STATIONS_DATA_URL,
+    STATIONS_URL,
+    TEMPORAL_EXTENT,
+)
+from stactools.ghcnd.parquet import ARROW_TYPES
+from stactools.ghcnd.stac import (
+    TABLE_EXTENSION_SCHEMA,
+    asset_media_type,
+    create_collection,
+)
+from stactools.ghcnd.timing import Span, emit, is_enabled, isolated, span
+
+logger = logging.getLogger(__name__)
+
+# Character positions of the columns of ghcnd-stations.txt and
+# ghcnd-inventory.txt, see the GHCNd readme. The names match
+# STATION_TABLE_COLUMNS and INVENTORY_TABLE_COLUMNS.
+STATION_FIELDS = [
+    ("ID", 0, 11),
+    ("LATITUDE", 12, 20),
+    ("LONGITUDE", 21, 30),
+    ("ELEVATION", 31, 37),
+    ("STATE", 38, 40),
+    ("NAME", 41, 71),
+    ("GSN FLAG", 72, 75),
+    ("HCN/CRN FLAT", 76, 79),
+    ("WMO ID", 80, 85),
+]
+INVENTORY_FIELDS = [
+    ("ID", 0, 11),
+    ("LATITUDE", 12, 20),
+    ("LONGITUDE", 21, 30),
+    ("ELEMENT", 31, 35),
+    ("FIRSTYEAR", 36, 40),
+    ("LASTYEAR", 41, 45),
+]
+
+COUNTRY_CODE_LENGTH = 2
+DEFAULT_MAX_SHARD_SIZE = 10_000
+# Number of Items of each shard validated in "sample" mode
+SHARD_SAMPLE_SIZE = 1
+# Number of shards queued ahead of the workers, per worker
+PENDING_SHARDS_PER_WORKER = 2
+CATALOG_FILE_NAME = "catalog.json"
+COLLECTION_FILE_NAME = "collection.json"
+
+FixedWidthField = Tuple[str, int, int]
+
+
+def _fixed_width_matrix(data: bytes, width: int) -> np.ndarray:
+    """Lay out the lines of a text file as rows of a 2D byte array
+
+    Lines shorter than width, e.g. without trailing blanks, are padded with
+    spaces. Empty lines are dropped.
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    if len(buffer) and buffer[-1] != ord("\n"):
+        buffer = np.append(buffer, np.uint8(ord("\n")))
+    ends = np.flatnonzero(buffer == ord("\n"))
+    starts = np.concatenate([[0], ends[:-1] + 1]).astype(np.int64)
+    lengths = np.minimum(ends - starts, width)
+    starts = starts[lengths > 0]
+    lengths = lengths[lengths > 0]
+
+    columns = np.arange(width)
+    inside = columns < lengths[:, None]
+    matrix = np.full((len(starts), width), ord(" "), dtype=np.uint8)
+    matrix[inside] = buffer[(starts[:, None] + columns)[inside]]
+    matrix[matrix == ord("\r")] = ord(" ")
+    return matrix
+
+
+def parse_fixed_width(data: bytes, fields: List[FixedWidthField],
+                      columns: List[Dict[str, Any]]) -> pa.Table:
+    """Parse a fixed-width text file into typed Arrow columns
+
+    The whole buffer is sliced at once with NumPy and converted with Arrow
+    compute functions, without a Python loop over the lines.
+
+    Args:
+        data (bytes): Content of the file
+        fields (List[FixedWidthField]): Name, start and end character
+            position of each column
+        columns (List[Dict[str, Any]]): Column definitions with "name" and
+            "type", e.g. STATION_TABLE_COLUMNS
+
+    Returns:
+        pa.Table: One column per field, null for blank values
+    """
+    types = {column["name"]: ARROW_TYPES[column["type"]] for column in columns}
+    matrix = _fixed_width_matrix(data, max(end for _, _, end in fields))
+    arrays = []
+    for name, start, end in fields:
+        raw = np.ascontiguousarray(matrix[:, start:end]).view(
+            f"S{end - start}").ravel()
+        values = pc.utf8_trim_whitespace(
+            pa.array(raw, type=pa.binary()).cast(pa.string()))
+        values = pc.if_else(pc.equal(values, ""),
+                            pa.scalar(None, pa.string()), values)
+        arrays.append(values.cast(types[name]))
+    return pa.Table.from_arrays(arrays, names=[name for name, _, _ in fields])
+
+
+def parse_stations(data: bytes) -> pa.Table:
+    """Parse ghcnd-stations.txt into a table with STATION_TABLE_COLUMNS"""
+    return parse_fixed_width(data, STATION_FIELDS, STATION_TABLE_COLUMNS)
+
+
+def parse_inventory(data: bytes) -> pa.Table:
+    """Parse ghcnd-inventory.txt into a table with INVENTORY_TABLE_COLUMNS"""
+    return parse_fixed_width(data, INVENTORY_FIELDS, INVENTORY_TABLE_COLUMNS)
+
+
+def read_table(href: str,
+               parse: Callable[[bytes], pa.Table],
+               cache: Optional[AssetCache] = None) -> pa.Table:
+    """Read and parse a fixed-width file, from the cache if it is unchanged
+
+    Parsed tables are kept in the cache directory as Arrow IPC files keyed by
+    the HREF and the ETag or modification time of the file, and memory-mapped
+    when read back.
+
+    Args:
+        href (str): HREF of the file, optionally compressed
+        parse (Callable[[bytes], pa.Table]): Parser, e.g. parse_stations
+        cache (AssetCache, optional): Cache of parsed tables
+
+    Returns:
+        pa.Table: The parsed table
+    """
+    path = None
+    if cache is not None:
+        current = cache.stat(href)["fingerprint"]
+        if current is not None:
+            path = cache.path(f"table:{parse.__name__}:{href}:{current}",
+                              suffix=".arrow")
+            if os.path.exists(path):
+                logger.debug(f"Parsed table cache hit for {href}")
+                # Mark as recently used for eviction
+                os.utime(path)
+                return pa.ipc.open_file(pa.memory_map(path)).read_all()
+
+    with span("parse", href=href):
+        with fsspec.open(href, "rb", compression="infer") as file:
+            table = parse(file.read())
+
+    if cache is not None and path is not None:
+        fd, tmp_path = tempfile.mkstemp(dir=cache.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as file:
+            with pa.ipc.new_file(file, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+        cache.evict(keep=path)
+    return table
+
+
+def read_stations(href: str = STATIONS_URL,
+                  cache: Optional[AssetCache] = None
+                  ) -> Iterator[Dict[str, Any]]:
+    """Read the stations of ghcnd-stations.txt
+
+    Args:
+        href (str): HREF of the stations file
+        cache (AssetCache, optional): Cache of the parsed file
+
+    Returns:
+        Iterator[Dict[str, Any]]: The stations, by STATION_TABLE_COLUMNS
+            name, None for blank values
+    """
+    table = read_table(href, parse_stations, cache)
+    for batch in table.to_batches():
+        yield from batch.to_pylist()
+
+
+def read_inventory(
+        href: str = INVENTORY_URL,
+        cache: Optional[AssetCache] = None
+) -> Dict[str, Dict[str, List[int]]]:
+    """Read the years with data of each station and element from
+    ghcnd-inventory.txt
+
+    Args:
+        href (str): HREF of the inventory file
+        cache (AssetCache, optional): Cache of the parsed file
+
+    Returns:
+        Dict[str, Dict[str, List[int]]]: [first year, last year] by element,
+            by station ID
+    """
+    table = read_table(href, parse_inventory, cache)
+    inventory: Dict[str, Dict[str, List[int]]] = defaultdict(dict)
+    for station_id, element, first, last in zip(
+            *(table.column(name).to_pylist()
+              for name in ("ID", "ELEMENT", "FIRSTYEAR", "LASTYEAR"))):
+        inventory[station_id][element] = [first, last]
+    return dict(inventory)
+
+
+def property_name(column_name: str) -> str:
+    """Item property name of a station table column, e.g. "ghcnd:wmo_id"
+    for "WMO ID"
+    """
+    return "ghcnd:" + re.sub(r"[^a-z0-9]+", "_", column_name.lower())
+
+
+def station_item_id(station_id: str) -> str:
+    """ID of the Item of a station"""
+    return f"GHCNd-{station_id}"
+
+
+def station_data_href(station_id: str) -> str:
+    """HREF of the by_station data file of a station"""
+    return f"{STATIONS_DATA_URL}{station_id}.csv.gz"
+
+
+def create_station_item(
+        station: Dict[str, Any],
+        depth: int = 0,
+        element_years: Optional[Dict[str, List[int]]] = None
+) -> Dict[str, Any]:
+    """Create a STAC Item for one station, as a dict
+
+    Args:
+        station (Dict[str, Any]): The station, see read_stations()
+        depth (int): Number of directories between the Collection and the
+            Item, for the relative root and collection links
+        element_years (Dict[str, List[int]], optional): First and last year
+            of each element of the station, see read_inventory(). If given,
+            the Item datetimes span these years instead of the full GHCNd
+            temporal extent.
+
+    Returns:
+        Dict[str, Any]: The Item, with a point geometry and the station
+            table columns as properties
+    """
+    longitude = station["LONGITUDE"]
+    latitude = station["LATITUDE"]
+    start_datetime = TEMPORAL_EXTENT[0]
+    end_datetime = TEMPORAL_EXTENT[1]
+    if element_years:
+        first = min(years[0] for years in element_years.values())
+        last = max(years[1] for years in element_years.values())
+        start_datetime = f"{first:04d}-01-01T00:00:00Z"
+        end_datetime = f"{last:04d}-12-31T23:59:59Z"
+    properties: Dict[str, Any] = {
+        "title": station["NAME"],
+        "description": f"GHCNd station {station['ID']}",
+        "datetime": None,
+        "start_datetime": start_datetime,
+        "end_datetime": end_datetime,
+        "sci:doi": DOI,
+        "sci:citation": CITATION,
+        "proj:epsg": GHCND_EPSG,
+    }
+    for column in STATION_TABLE_COLUMNS:
+        properties[property_name(column["name"])] = station[column["name"]]
+    if element_years:
+        properties["ghcnd:element_years"] = element_years
+    collection_href = "../" * depth + COLLECTION_FILE_NAME
+    data_href = station_data_href(station["ID"])
+    return {
+        "type":
+        "Feature",
+        "stac_version":
+        pystac.get_stac_version(),
+        "stac_extensions": [
+            TABLE_EXTENSION_SCHEMA,
+            ScientificExtension.get_schema_uri(),
+            ProjectionExtension.get_schema_uri(),
+        ],
+        "id":
+        station_item_id(station["ID"]),
+        "geometry": {
+            "type": "Point",
+            "coordinates": [longitude, latitude]
+        },
+        "bbox": [longitude, latitude, longitude, latitude],
+        "properties":
+        properties,
+        "links": [
+            {
+                "rel": "root",
+                "href": collection_href,
+                "type": "application/json"
+            },
+            {
+                "rel": "collection",
+                "href": collection_href,
+                "type": "application/json"
+            },
+            {
+                "rel": "parent",
+                "href": f"./{CATALOG_FILE_NAME}",
+                "type": "application/json"
+            },
+        ],
+        "assets": {
+            "data": {
+                "href": data_href,
+                "type": asset_media_type(data_href),
+                "roles": ["data"],
+                "title": "GHCNd Values",
+                "table:columns": DATA_TABLE_COLUMNS,
+            },
+            "stations": {
+                "href": STATIONS_URL,
+                "type": pystac.MediaType.TEXT,
+                "roles": ["metadata"],
+                "title": "GHCNd Stations",
+            },
+        },
+        "collection":
+        GHCND_ID,
+    }
+
+
+def shard_stations(station_ids: Iterable[str],
+                   max_size: int = DEFAULT_MAX_SHARD_SIZE
+                   ) -> Dict[str, List[str]]:
+    """Group station IDs into shards of at most max_size stations
+
+    Stations are grouped by the country code, the first two characters of
+    the ID. Shards that are too large are split by the next character of
+    the ID, recursively.
+
+    Args:
+        station_ids (Iterable[str]): The station IDs
+        max_size (int): Maximum number of stations per shard
+
+    Returns:
+        Dict[str, List[str]]: Sorted station IDs by ID prefix of the shard
+    """
+    pending: Dict[str, List[str]] = defaultdict(list)
+    for station_id in station_ids:
+        pending[station_id[:COUNTRY_CODE_LENGTH]].append(station_id)
+    shards = {}
+    while pending:
+        prefix, ids = pending.popitem()
+        if len(ids) <= max_size or any(len(i) <= len(prefix) for i in ids):
+            shards[prefix] = sorted(ids)
+            continue
+        for station_id in ids:
+            pending[station_id[:len(prefix) + 1]].append(station_id)
+    return dict(sorted(shards.items()))
+
+
+def shard_path(prefix: str) -> str:
+    """Directory of a shard relative to the Collection, one level per
+    character after the country code, e.g. "US/USC" for "USC"
+    """
+    return "/".join(prefix[:n]
+                    for n in range(COUNTRY_CODE_LENGTH,
+                                   len(prefix) + 1))
+
+
+def _write_json(href: str, value: Dict[str, Any]) -> None:
+    with fsspec.open(href, "w", auto_mkdir=True) as file:
+        json.dump(value, file)
+
+
+def _write_shard(
+    destination: str,
+    prefix: str,
+    stations: List[Dict[str, Any]],
+    inventory: Dict[str, Dict[str, List[int]]],
+    validate_mode: str,
+    sample_size: int,
+    schema_dir: Optional[str],
+    offline: bool,
+    collect_spans: bool,
+) -> Tuple[int, List[Span]]:
+    """Worker function writing the Items of one shard; returns the number of
+    Items and the Spans recorded if collect_spans is set"""
+    if schema_dir is not None:
+        validation.use_schema_cache(schema_dir, offline)
+    path = shard_path(prefix)
+    depth = path.count("/") + 1
+    with isolated() if collect_spans else nullcontext() as profiler:
+        with span("write_shard", prefix=prefix, count=len(stations)):
+            item_dicts = [
+                create_station_item(station, depth,
+                                    inventory.get(station["ID"]))
+                for station in stations
+            ]
+            for item_dict in validation.select(item_dicts, validate_mode,
+                                               sample_size):
+                validation.validate_dict(item_dict)
+            for item_dict in item_dicts:
+                _write_json(
+                    os.path.join(destination, path, f"{item_dict['id']}.json"),
+                    item_dict)
+    spans = profiler.spans if profiler is not None else []
+    return len(item_dicts), spans
+
+
+def _catalog(prefix: str, depth: int, children: List[str],
+             item_ids: List[str]) -> Dict[str, Any]:
+    parent = "../" + (CATALOG_FILE_NAME if depth > 1 else COLLECTION_FILE_NAME)
+    links = [{
+        "rel": "root",
+        "href": "../" * depth + COLLECTION_FILE_NAME,
+        "type": "application/json",
+    }, {
+        "rel": "parent",
+        "href": parent,
+        "type": "application/json",
+    }]
+    links.extend({
+        "rel": "child",
+        "href": f"./{child}/{CATALOG_FILE_NAME}",
+        "type": "application/json",
+    } for child in children)
+    links.extend({
+        "rel": "item",
+        "href": f"./{item_id}.json",
+        "type": "application/geo+json",
+    } for item_id in item_ids)
+    return {
+        "type": "Catalog",
+        "id": f"{GHCND_ID}-{prefix}",
+        "stac_version": pystac.get_stac_version(),
+        "description": f"GHCNd stations with IDs starting with {prefix}",
+        "links": links,
+    }
+
+
+def _write_catalogs(destination: str,
+                    shards: Dict[str, List[str]]) -> None:
+    """Write the catalogs of the shards of one country"""
+    # Every prefix of a shard between the country code and the shard itself
+    # is a catalog
+    children: Dict[str, Set[str]] = defaultdict(set)
+    for prefix in shards:
+        for n in range(COUNTRY_CODE_LENGTH + 1, len(prefix) + 1):
+            children[prefix[:n - 1]].add(prefix[:n])
+    for prefix in sorted(set(children) | set(shards)):
+        path = shard_path(prefix)
+        depth = path.count("/") + 1
+        item_ids = [station_item_id(i) for i in shards.get(prefix, [])]
+        _write_json(os.path.join(destination, path, CATALOG_FILE_NAME),
+                    _catalog(prefix, depth, sorted(children[prefix]),
+                             item_ids))
+
+
+def populate_stations(stations: Iterable[Dict[str, Any]],
+                      destination: str,
+                      workers: int = 1,
+                      max_shard_size: int = DEFAULT_MAX_SHARD_SIZE,
+                      validate_mode: str = "full",
+                      schema_dir: Optional[str] = None,
+                      inventory: Optional[Dict[str, Dict[str,
+                                                         List[int]]]] = None,
+                      offline: bool = False) -> int:
+    """Write one Item per station, in a catalog sharded by ID prefix
+
+    The Collection links to one sub-catalog per country code, which is split
+    further by ID prefix while it holds more than max_shard_size stations,
+    so no catalog or directory holds more than max_shard_size Items. The
+    Items of each shard are created and written by a pool of processes,
+    straight to JSON, without building a pystac catalog in memory.
+
+    The stations are streamed one country at a time, so they must be sorted
+    by country code, as ghcnd-stations.txt is. Only the stations of one
+    country and the shards queued for the workers are held in memory.
+
+    Args:
+        stations (Iterable[Dict[str, Any]]): The stations, sorted by
+            country code, see read_stations()
+        destination (str): The Collection output directory
+        workers (int): Number of processes writing shards
+        max_shard_size (int): Maximum number of Items per sub-catalog
+        validate_mode (str): "full", "sample" or "none", see
+            validation.select. "sample" validates SHARD_SAMPLE_SIZE Items
+            of each shard.
+        schema_dir (str, optional): Local schema directory, see
+            validation.use_schema_cache
+        inventory (Dict, optional): Years with data of each station and
+            element, see read_inventory(), for the Item datetimes
+        offline (bool): Raise instead of downloading schemas missing from
+            schema_dir
+
+    Returns:
+        int: The number of Items written
+
+    Raises:
+        ValueError: If the stations are not sorted by country code
+    """
+    collect_spans = workers > 1 and is_enabled()
+    if inventory is None:
+        inventory = {}
+    countries: List[str] = []
+    bbox: Optional[List[float]] = None
+    count = 0
+
+    def shard_args(country_stations: List[Dict[str, Any]]) -> Iterator[Any]:
+        by_id = {station["ID"]: station for station in country_stations}
+        shards = shard_stations(by_id, max_shard_size)
+        _write_catalogs(destination, shards)
+        for prefix, ids in shards.items():
+            yield (destination, prefix, [by_id[i] for i in ids],
+                   {i: inventory[i]
+                    for i in ids if i in inventory}, validate_mode,
+                   SHARD_SAMPLE_SIZE, schema_dir, offline, collect_spans)
+
+    def iter_args() -> Iterator[Any]:
+        nonlocal bbox
+        for country, group in groupby(
+                stations,
+                key=lambda station: station["ID"][:COUNTRY_CODE_LENGTH]):
+            if countries and country <= countries[-1]:
+                raise ValueError(
+                    f"Stations of {country} follow {countries[-1]}, sort "
+                    "the stations by ID")
+            countries.append(country)
+            country_stations = list(group)
+            for station in country_stations:
+                longitude = station["LONGITUDE"]
+                latitude = station["LATITUDE"]
+                if bbox is None:
+                    bbox = [longitude, latitude, longitude, latitude]
+                else:
+                    bbox = [
+                        min(bbox[0], longitude),
+                        min(bbox[1], latitude),
+                        max(bbox[2], longitude),
+                        max(bbox[3], latitude)
+                    ]
+            yield from shard_args(country_stations)
+
+    with span("write_shards", workers=workers):
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # Only keep a bounded number of shards in flight
+                pending: Deque[Future] = deque()
+
+                def collect() -> int:
+                    shard_count, spans = pending.popleft().result()
+                    for span_ in spans:
+                        emit(span_)
+                    return shard_count
+
+                for arg in iter_args():
+                    pending.append(executor.submit(_write_shard, *arg))
+                    if len(pending) >= workers * PENDING_SHARDS_PER_WORKER:
+                        count += collect()
+                while pending:
+                    count += collect()
+        else:
+            for arg in iter_args():
+                count += _write_shard(*arg)[0]
+    logger.info(f"Wrote {count} stations of {len(countries)} countries")
+
+    with span("write_collection"):
+        collection = create_collection()
+        if bbox is not None:
+            collection.extent.spatial = pystac.SpatialExtent([bbox])
+        collection_dict = collection.to_dict(include_self_link=False,
+                                             transform_hrefs=False)
+        collection_dict["links"] = [
+            link for link in collection_dict["links"]
+            if link["rel"] not in ("root", "child", "item")
+        ] + [{
+            "rel": "root",
+            "href": f"./{COLLECTION_FILE_NAME}",
+            "type": "application/json",
+        }] + [{
+            "rel": "child",
+            "href": f"./{country}/{CATALOG_FILE_NAME}",
+            "type": "application/json",
+        } for country in countries]
+        _write_json(os.path.join(destination, COLLECTION_FILE_NAME),
+                    collection_dict)
+        if validate_mode != "none":
+            pystac.validation.validate_dict(collection_dict)
+    return count
@@ -0,0 +1,188 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import reduce
+from typing import Any, Dict, Iterable, List, Optional, Set, TypeVar
+
+from pystac import (
+    Collection,
+    Extent,
+    Item,
+    RangeSummary,
+    SpatialExtent,
+    TemporalExtent,
+)
+from pystac.utils import datetime_to_str, str_to_datetime
+
+ELEMENTS_SUMMARY = "ghcnd:elements"
+ROW_COUNT_SUMMARY = "table:row_count"
+# Total number of rows of the Items, a Collection field
+TOTAL_ROW_COUNT_FIELD = "ghcnd:row_count"
+
+T = TypeVar("T")
+
+
+def _fold(function: Any, current: Optional[T],
+          value: Optional[T]) -> Optional[T]:
+    if current is None:
+        return value
+    if value is None:
+        return current
+    return function(current, value)
+
+
+@dataclass
+class CollectionSummary:
+    """Partial aggregate of Items, reduced into a Collection's extent and
+    summaries
+
+    Summaries are built per Item, e.g. by the worker that created it, and
+    combined with merge(), which is associative and commutative with the
+    empty summary as identity. So the Items of a Collection can be
+    summarized in any grouping, across processes or machines, and the
+    Collection updated without reading the Items again. to_dict() and
+    from_dict() make summaries portable as JSON.
+    """
+    item_count: int = 0
+    start_datetime: Optional[datetime] = None
+    end_datetime: Optional[datetime] = None
+    bbox: Optional[List[float]] = None
+    elements: Set[str] = field(default_factory=set)
+    row_count: int = 0
+    min_item_row_count: Optional[int] = None
+    max_item_row_count: Optional[int] = None
+
+    @classmethod
+    def from_item_dict(cls, item_dict: Dict[str, Any]) -> "CollectionSummary":
+        """Summarize one Item
+
+        Args:
+            item_dict (Dict[str, Any]): The Item, as a dict
+
+        Returns:
+            CollectionSummary: The summary of the Item
+        """
+        data_asset = item_dict.get("assets", {}).get("data", {})
+        return cls._of(item_dict["properties"], item_dict.get("bbox"),
+                       data_asset)
+
+    @classmethod
+    def from_item(cls, item: Item) -> "CollectionSummary":
+        """Summarize one Item, see from_item_dict()"""
+        data_asset = item.assets.get("data")
+        return cls._of(
+            item.properties, item.bbox,
+            data_asset.extra_fields if data_asset is not None else {})
+
+    @classmethod
+    def _of(cls, properties: Dict[str, Any], bbox: Optional[List[float]],
+            data_asset_fields: Dict[str, Any]) -> "CollectionSummary":
+        start = properties.get("start_datetime") or properties.get(
+            "datetime")
+        end = properties.get("end_datetime") or properties.get("datetime")
+        row_count = properties.get("table:row_count")
+        return cls(
+            item_count=1,
+            start_datetime=str_to_datetime(start) if start else None,
+            end_datetime=str_to_datetime(end) if end else None,
+            bbox=list(bbox) if bbox else None,
+            elements=set(data_asset_fields.get("ghcnd:element_counts", {})),
+            row_count=row_count or 0,
+            min_item_row_count=row_count,
+            max_item_row_count=row_count,
+        )
+
+    def merge(self, other: "CollectionSummary") -> "CollectionSummary":
+        """Combine two summaries
+
+        Args:
+            other (CollectionSummary): Summary of other Items
+
+        Returns:
+            CollectionSummary: The summary of the Items of both
+        """
+        if self.bbox is None or other.bbox is None:
+            bbox = self.bbox or other.bbox
+        else:
+            bbox = [
+                min(self.bbox[0], other.bbox[0]),
+                min(self.bbox[1], other.bbox[1]),
+                max(self.bbox[2], other.bbox[2]),
+                max(self.bbox[3], other.bbox[3]),
+            ]
+        return CollectionSummary(
+            item_count=self.item_count + other.item_count,
+            start_datetime=_fold(min, self.start_datetime,
+                                 other.start_datetime),
+            end_datetime=_fold(max, self.end_datetime, other.end_datetime),
+            bbox=bbox,
+            elements=self.elements | other.elements,
+            row_count=self.row_count + other.row_count,
+            min_item_row_count=_fold(min, self.min_item_row_count,
+                                     other.min_item_row_count),
+            max_item_row_count=_fold(max, self.max_item_row_count,
+                                     other.max_item_row_count),
+        )
+
+    def extent(self) -> Optional[Extent]:
+        """The extent of the summarized Items, None if there are none"""
+        if self.item_count == 0 or self.bbox is None:
+            return None
+        return Extent(SpatialExtent([self.bbox]),
+                      TemporalExtent([[self.start_datetime,
+                                       self.end_datetime]]))
+
+    def apply(self, collection: Collection) -> None:
+        """Set the extent, summaries and total row count of a Collection
+
+        Args:
+            collection (Collection): The Collection of the summarized Items
+        """
+        extent = self.extent()
+        if extent is not None:
+            collection.extent = extent
+        if self.elements:
+            collection.summaries.add(ELEMENTS_SUMMARY, sorted(self.elements))
+        if self.min_item_row_count is not None:
+            collection.summaries.add(
+                ROW_COUNT_SUMMARY,
+                RangeSummary(self.min_item_row_count,
+                             self.max_item_row_count))
+            collection.extra_fields[TOTAL_ROW_COUNT_FIELD] = self.row_count
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The summary as a JSON serializable dict"""
+        return {
+            "item_count": self.item_count,
+            "start_datetime": (datetime_to_str(self.start_datetime)
+                               if self.start_datetime else None),
+            "end_datetime": (datetime_to_str(self.end_datetime)
+                             if self.end_datetime else None),
+            "bbox": self.bbox,
+            "elements": sorted(self.elements),
+            "row_count": self.row_count,
+            "min_item_row_count": self.min_item_row_count,
+            "max_item_row_count": self.max_item_row_count,
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "CollectionSummary":
+        """Load a summary written by to_dict()"""
+        d = dict(d)
+        for key in ("start_datetime", "end_datetime"):
+            if d.get(key) is not None:
+                d[key] = str_to_datetime(d[key])
+        d["elements"] = set(d.get("elements", []))
+        return cls(**d)
+
+
+def reduce_summaries(
+        summaries: Iterable[CollectionSummary]) -> CollectionSummary:
+    """Combine any number of summaries
+
+    Args:
+        summaries (Iterable[CollectionSummary]): The summaries
+
+    Returns:
+        CollectionSummary: The summary of all their Items
+    """
+    return reduce(CollectionSummary.merge, summaries, CollectionSummary())
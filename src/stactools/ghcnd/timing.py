@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple
+
+import fsspec
+
+logger = logging.getLogger(__name__)
+
+
+class Span(NamedTuple):
+    """Timing of one stage
+
+    start is the wall clock start time in seconds since the epoch, duration
+    is in seconds.
+    """
+    name: str
+    start: float
+    duration: float
+    pid: int
+    tid: int
+    args: Dict[str, Any]
+
+
+TimingHook = Callable[[Span], None]
+
+_hooks: List[TimingHook] = []
+
+
+def add_timing_hook(hook: TimingHook) -> None:
+    """Call hook with every Span recorded in this process
+
+    Use this to forward timings to a metrics system. Spans recorded in worker
+    processes of create_items are forwarded to the hooks of the parent
+    process.
+
+    Args:
+        hook (Callable[[Span], None]): Called once per finished Span
+    """
+    _hooks.append(hook)
+
+
+def remove_timing_hook(hook: TimingHook) -> None:
+    """Stop calling a hook added with add_timing_hook"""
+    _hooks.remove(hook)
+
+
+def is_enabled() -> bool:
+    """Whether any timing hook is registered"""
+    return bool(_hooks)
+
+
+def emit(span_: Span) -> None:
+    """Pass a Span to all timing hooks"""
+    for hook in list(_hooks):
+        hook(span_)
+
+
+@contextmanager
+def span(name: str, **args: Any) -> Iterator[None]:
+    """Time the enclosed block as a stage called name
+
+    Costs next to nothing when no timing hook is registered.
+
+    Args:
+        name (str): Name of the stage
+        **args: Extra details, e.g. the HREF being processed
+    """
+    if not _hooks:
+        yield
+        return
+    start = time.time()
+    counter = time.perf_counter()
+    try:
+        yield
+    finally:
+        emit(
+            Span(name, start,
+                 time.perf_counter() - counter, os.getpid(),
+                 threading.get_ident(), args))
+
+
+class Profiler:
+    """Timing hook that keeps all Spans, for a report
+
+    Use as a context manager to register and unregister it::
+
+        with Profiler() as profiler:
+            populate(...)
+        profiler.save("profile.json")
+    """
+    def __init__(self) -> None:
+        self.spans: List[Span] = []
+
+    def __call__(self, span_: Span) -> None:
+        self.spans.append(span_)
+
+    def __enter__(self) -> "Profiler":
+        add_timing_hook(self)
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        remove_timing_hook(self)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Count and total seconds per stage"""
+        summary: Dict[str, Dict[str, float]] = {}
+        for span_ in self.spans:
+            stage = summary.setdefault(span_.name, {
+                "count": 0,
+                "seconds": 0.0
+            })
+            stage["count"] += 1
+            stage["seconds"] += span_.duration
+        return summary
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """The Spans in Chrome trace event format, for chrome://tracing or
+        Perfetto, with the per-stage summary under "summary"
+        """
+        events = [{
+            "name": span_.name,
+            "ph": "X",
+            "ts": span_.start * 1e6,
+            "dur": span_.duration * 1e6,
+            "pid": span_.pid,
+            "tid": span_.tid,
+            "args": span_.args,
+        } for span_ in self.spans]
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "summary": self.summary(),
+        }
+
+    def save(self, href: str) -> None:
+        """Write the report as JSON
+
+        Args:
+            href (str): Output HREF
+        """
+        with fsspec.open(href, "w") as file:
+            json.dump(self.to_chrome_trace(), file, indent=2)
+        logger.info(f"Wrote timing report to {href}")
+
+
+@contextmanager
+def isolated() -> Iterator[Profiler]:
+    """Record Spans with a new Profiler only, bypassing the registered hooks
+
+    Used in worker processes, whose Spans are sent back to the parent process
+    and passed to its hooks there. Without this, hooks inherited by forked
+    workers would see every Span twice.
+    """
+    saved = _hooks[:]
+    profiler = Profiler()
+    _hooks[:] = [profiler]
+    try:
+        yield profiler
+    finally:
+        _hooks[:] = saved
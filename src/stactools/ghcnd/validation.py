@@ -0,0 +1,324 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+from urllib.parse import urldefrag, urljoin
+
+import pystac
+from jsonschema import RefResolver
+from jsonschema.exceptions import ValidationError
+from jsonschema.validators import validator_for
+from pystac.extensions.file import FileExtension
+from pystac.validation import (
+    JsonSchemaSTACValidator,
+    RegisteredValidator,
+    set_validator,
+)
+from pystac.validation.stac_validator import GetSchemaError
+
+from stactools.ghcnd.timing import span
+
+logger = logging.getLogger(__name__)
+
+VALIDATION_MODES = ["full", "sample", "none"]
+DEFAULT_SAMPLE_SIZE = 100
+
+
+class SchemaCache:
+    """JSON schemas stored in a local directory
+
+    Schemas are downloaded once and then read from disk, so validation works
+    without network access once every schema used has been fetched, e.g.
+    with preload().
+
+    Args:
+        schema_dir (str): Local directory holding the schemas
+        offline (bool): Raise instead of downloading schemas that are not in
+            schema_dir
+    """
+    def __init__(self, schema_dir: str, offline: bool = False):
+        self.schema_dir = schema_dir
+        self.offline = offline
+        self.schemas: Dict[str, Dict[str, Any]] = {}
+        os.makedirs(schema_dir, exist_ok=True)
+
+    def path(self, uri: str) -> str:
+        """Local path of a schema"""
+        digest = hashlib.sha256(uri.encode("utf-8")).hexdigest()
+        return os.path.join(self.schema_dir, f"{digest}.json")
+
+    def fetch(self, uri: str) -> Dict[str, Any]:
+        """Get a schema, downloading it only if it is not stored yet
+
+        Args:
+            uri (str): URI of the schema, without fragment
+
+        Returns:
+            Dict[str, Any]: The schema
+        """
+        uri = urldefrag(uri)[0]
+        schema = self.schemas.get(uri)
+        if schema is not None:
+            return schema
+        path = self.path(uri)
+        if os.path.exists(path):
+            with open(path) as file:
+                schema = json.load(file)["schema"]
+        elif self.offline:
+            raise pystac.STACError(
+                f"Schema {uri} is not in {self.schema_dir} and downloads "
+                "are disabled")
+        else:
+            logger.info(f"Downloading schema {uri}")
+            schema = json.loads(pystac.StacIO.default().read_text(uri))
+            fd, tmp_path = tempfile.mkstemp(dir=self.schema_dir,
+                                            suffix=".tmp")
+            with os.fdopen(fd, "w") as file:
+                json.dump({"uri": uri, "schema": schema}, file)
+            os.replace(tmp_path, path)
+        self.schemas[uri] = schema
+        return schema
+
+    def preload(self, uris: Iterable[str]) -> List[str]:
+        """Fetch schemas and every schema they reference
+
+        Args:
+            uris (Iterable[str]): URIs of the root schemas
+
+        Returns:
+            List[str]: URIs of all schemas fetched
+        """
+        pending = [urldefrag(uri)[0] for uri in uris]
+        seen: Set[str] = set()
+        while pending:
+            uri = pending.pop()
+            if uri in seen:
+                continue
+            seen.add(uri)
+            for ref in _refs(self.fetch(uri)):
+                ref_uri = urldefrag(urljoin(uri, ref))[0]
+                if ref_uri and ref_uri not in seen:
+                    pending.append(ref_uri)
+        return sorted(seen)
+
+
+def _refs(schema: Any) -> Iterable[str]:
+    """All $ref values in a schema"""
+    if isinstance(schema, dict):
+        for key, value in schema.items():
+            if key == "$ref" and isinstance(value, str):
+                yield value
+            else:
+                yield from _refs(value)
+    elif isinstance(schema, list):
+        for value in schema:
+            yield from _refs(value)
+
+
+class CachedSchemaValidator(JsonSchemaSTACValidator):
+    """STAC validator reading schemas from a SchemaCache
+
+    Compiled jsonschema validators are kept per schema URI, so each schema is
+    only checked and compiled once per process.
+
+    Args:
+        schema_cache (SchemaCache): Source of the schemas
+    """
+    def __init__(self, schema_cache: SchemaCache):
+        super().__init__()
+        self.schemas = schema_cache
+        self.validators: Dict[str, Any] = {}
+
+    def get_schema_from_uri(self, schema_uri: str) -> Any:
+        schema = self.schemas.fetch(schema_uri)
+        handlers: Dict[str, Callable[[str], Dict[str, Any]]] = {
+            "http": self.schemas.fetch,
+            "https": self.schemas.fetch,
+        }
+        resolver = RefResolver(base_uri=schema_uri,
+                               referrer=schema,
+                               handlers=handlers)
+        return schema, resolver
+
+    def _validator(self, schema_uri: str) -> Any:
+        validator = self.validators.get(schema_uri)
+        if validator is None:
+            schema, resolver = self.get_schema_from_uri(schema_uri)
+            validator_class = validator_for(schema)
+            validator_class.check_schema(schema)
+            validator = validator_class(schema, resolver=resolver)
+            self.validators[schema_uri] = validator
+        return validator
+
+    def _validate(self, stac_dict: Dict[str, Any], schema_uri: str,
+                  href: Optional[str]) -> None:
+        try:
+            self._validator(schema_uri).validate(stac_dict)
+        except ValidationError as e:
+            object_id = stac_dict.get("id")
+            raise pystac.STACValidationError(
+                f"Validation failed for {object_id} at {href} against schema at "
+                f"{schema_uri}: {e.message}",
+                source=e) from e
+
+    def validate_core(self,
+                      stac_dict: Dict[str, Any],
+                      stac_object_type: Any,
+                      stac_version: str,
+                      href: Optional[str] = None) -> Optional[str]:
+        schema_uri = self.schema_uri_map.get_object_schema_uri(
+            stac_object_type, stac_version)
+        if schema_uri is None:
+            return None
+        self._validate(stac_dict, schema_uri, href)
+        return schema_uri
+
+    def validate_extension(self,
+                           stac_dict: Dict[str, Any],
+                           stac_object_type: Any,
+                           stac_version: str,
+                           extension_id: str,
+                           href: Optional[str] = None) -> Optional[str]:
+        self._validate(stac_dict, extension_id, href)
+        return extension_id
+
+
+def schema_uris() -> List[str]:
+    """URIs of the core and extension schemas of the GHCNd Collection and
+    Items"""
+    from stactools.ghcnd.stac import ItemFactory, create_collection
+
+    schema_uri_map = JsonSchemaSTACValidator().schema_uri_map
+    version = pystac.get_stac_version()
+    uris = {
+        schema_uri_map.get_object_schema_uri(object_type, version)
+        for object_type in (pystac.STACObjectType.COLLECTION,
+                            pystac.STACObjectType.ITEM)
+    }
+    uris.update(create_collection().stac_extensions)
+    uris.update(ItemFactory().stac_extensions)
+    uris.add(FileExtension.get_schema_uri())
+    return sorted(uri for uri in uris if uri is not None)
+
+
+def use_schema_cache(schema_dir: str, offline: bool = False) -> None:
+    """Validate all STAC objects of this process against schemas stored in
+    schema_dir
+
+    Forked worker processes inherit the validator. Calling it again with the
+    same arguments keeps the current validator and its compiled schemas, so
+    workers can call it for every task.
+
+    Args:
+        schema_dir (str): Local directory holding the schemas
+        offline (bool): Raise instead of downloading missing schemas
+    """
+    current = RegisteredValidator.get_validator()
+    if isinstance(current, CachedSchemaValidator) \
+            and current.schemas.schema_dir == schema_dir \
+            and current.schemas.offline == offline:
+        return
+    set_validator(CachedSchemaValidator(SchemaCache(schema_dir, offline)))
+
+
+def validate_dict(stac_dict: Dict[str, Any]) -> None:
+    """Validate a STAC object dict in a worker process
+
+    Like pystac.validation.validate_dict, but the errors can be pickled back
+    to the parent process: a STACValidationError is raised without its
+    jsonschema source, and a schema download error as a STACError.
+
+    Args:
+        stac_dict (Dict[str, Any]): The STAC object dict
+    """
+    try:
+        pystac.validation.validate_dict(stac_dict)
+    except pystac.STACValidationError as e:
+        raise pystac.STACValidationError(str(e)) from None
+    except GetSchemaError as e:
+        raise pystac.STACError(str(e)) from None
+
+
+def _validate_chunk(item_dicts: List[Dict[str, Any]],
+                    schema_dir: Optional[str], offline: bool) -> int:
+    if schema_dir is not None:
+        use_schema_cache(schema_dir, offline)
+    for item_dict in item_dicts:
+        validate_dict(item_dict)
+    return len(item_dicts)
+
+
+def select(objects: List[Any],
+           mode: str,
+           sample_size: int = DEFAULT_SAMPLE_SIZE,
+           seed: int = 0) -> List[Any]:
+    """The objects to validate in a validation mode
+
+    Args:
+        objects (List[Any]): All objects
+        mode (str): "full" for all, "sample" for a random sample of
+            sample_size objects, "none" for none
+        sample_size (int): Size of the sample
+        seed (int): Seed of the sample, for reproducible runs
+
+    Returns:
+        List[Any]: The objects to validate
+    """
+    if mode not in VALIDATION_MODES:
+        raise ValueError(
+            f"Invalid validation mode {mode!r}, expected one of "
+            f"{VALIDATION_MODES}")
+    if mode == "none":
+        return []
+    if mode == "sample" and len(objects) > sample_size:
+        return random.Random(seed).sample(objects, sample_size)
+    return objects
+
+
+def validate_items(items: List[pystac.Item],
+                   mode: str = "full",
+                   sample_size: int = DEFAULT_SAMPLE_SIZE,
+                   workers: int = 1,
+                   schema_dir: Optional[str] = None,
+                   offline: bool = False) -> int:
+    """Validate Items, optionally in parallel and against local schemas
+
+    Meant for Items that already exist, e.g. read from a catalog. New Items
+    are validated by the workers that create them, see stac.create_items().
+
+    Args:
+        items (List[pystac.Item]): The Items
+        mode (str): "full", "sample" or "none", see select()
+        sample_size (int): Number of Items validated in "sample" mode
+        workers (int): Number of processes validating Items
+        schema_dir (str, optional): Local schema directory, see
+            use_schema_cache()
+        offline (bool): Raise instead of downloading missing schemas
+
+    Returns:
+        int: The number of Items validated
+    """
+    selected = [
+        item.to_dict(include_self_link=False)
+        for item in select(items, mode, sample_size)
+    ]
+    if not selected:
+        return 0
+    with span("validate_items", count=len(selected), workers=workers):
+        if workers > 1 and len(selected) > 1:
+            size = -(-len(selected) // workers)
+            chunks = [
+                selected[i:i + size] for i in range(0, len(selected), size)
+            ]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                count = sum(
+                    executor.map(_validate_chunk, chunks,
+                                 [schema_dir] * len(chunks),
+                                 [offline] * len(chunks)))
+        else:
+            count = _validate_chunk(selected, schema_dir, offline)
+    return count
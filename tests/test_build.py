@@ -0,0 +1,85 @@
+import os
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+import pystac
+
+from stactools.ghcnd import build
+
+from .utils import copy_by_year
+
+
+class BuildTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.sources = copy_by_year(self.tmp_dir.name, (1763, 1764, 1765))
+        self.destination = os.path.join(self.tmp_dir.name, "stac")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_plan_units(self):
+        units = build.plan_units(self.sources, sources_per_unit=2)
+
+        self.assertEqual([unit.sources for unit in units],
+                         [self.sources[:2], self.sources[2:]])
+        self.assertEqual(build.plan_units(self.sources, 2), units)
+
+    def test_run_build(self):
+        run = build.run_build(self.sources, self.destination)
+        self.assertEqual(len(run), 3)
+
+        collection = pystac.read_file(
+            os.path.join(self.destination, "collection.json"))
+        items = sorted(collection.get_all_items(), key=lambda item: item.id)
+        self.assertEqual([item.id for item in items],
+                         ["GHCNd-1763", "GHCNd-1764", "GHCNd-1765"])
+        self.assertEqual(items[0].collection_id, collection.id)
+        start, end = collection.extent.temporal.intervals[0]
+        self.assertEqual((start.year, end.year), (1763, 1765))
+        collection.validate_all()
+
+        # Everything is done, only the Collection is written again
+        self.assertEqual(build.run_build(self.sources, self.destination), [])
+
+    def test_resume_after_failure(self):
+        run_unit = build.run_unit
+        failing = self.sources[1]
+
+        def fail_once(unit, *args):
+            if failing in unit.sources:
+                raise OSError("preempted")
+            return run_unit(unit, *args)
+
+        with mock.patch.object(build, "run_unit", side_effect=fail_once):
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                with self.assertRaises(RuntimeError):
+                    build.run_build(self.sources,
+                                    self.destination,
+                                    executor=executor)
+        self.assertEqual(len(build.load_checkpoints(self.destination)), 2)
+        self.assertFalse(
+            os.path.exists(os.path.join(self.destination,
+                                        "collection.json")))
+
+        with mock.patch.object(build, "run_unit",
+                               side_effect=run_unit) as patched:
+            run = build.run_build(self.sources, self.destination)
+        self.assertEqual(patched.call_count, 1)
+        unit, = build.plan_units([failing])
+        self.assertEqual(run, [unit.id])
+        collection = pystac.read_file(
+            os.path.join(self.destination, "collection.json"))
+        self.assertEqual(len(list(collection.get_all_items())), 3)
+
+    def test_changed_sources_are_rebuilt(self):
+        build.run_build(self.sources, self.destination)
+
+        run = build.run_build(self.sources[:2], self.destination,
+                              sources_per_unit=2)
+        self.assertEqual(len(run), 1)
+        collection = pystac.read_file(
+            os.path.join(self.destination, "collection.json"))
+        self.assertEqual(len(list(collection.get_all_items())), 2)
@@ -0,0 +1,92 @@
+import os
+import unittest
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from stactools.ghcnd import stac
+from stactools.ghcnd.cache import AssetCache, fingerprint
+
+from .utils import copy_by_year
+
+
+class CacheTest(unittest.TestCase):
+    def test_fingerprint(self):
+        self.assertEqual(fingerprint({
+            "ETag": '"abc"',
+            "mtime": 1.0,
+            "size": 3
+        }), 'ETag="abc";size=3')
+        self.assertIsNone(fingerprint({"size": 3}))
+
+    def test_stat_is_reused_until_asset_changes(self):
+        with TemporaryDirectory() as tmp_dir:
+            href, = copy_by_year(tmp_dir, (1763, ))
+            cache = AssetCache(os.path.join(tmp_dir, "cache"))
+
+            size = os.path.getsize(href)
+            self.assertEqual(cache.stat(href)["size"], size)
+
+            with mock.patch("stactools.ghcnd.cache.fsspec") as fsspec:
+                trusted = AssetCache(cache.cache_dir, max_age=3600)
+                self.assertEqual(trusted.stat(href)["size"], size)
+                fsspec.get_fs_token_paths.assert_not_called()
+
+            with open(href, "a") as file:
+                file.write("extra\n")
+            self.assertEqual(cache.stat(href)["size"], size + 6)
+
+    def test_stat_of_directory_covers_nested_files(self):
+        with TemporaryDirectory() as tmp_dir:
+            href = os.path.join(tmp_dir, "ghcnd.parquet")
+            partition = os.path.join(href, "year=1763")
+            os.makedirs(partition)
+            part = os.path.join(partition, "part-0.parquet")
+            with open(part, "wb") as file:
+                file.write(b"x" * 10)
+            cache = AssetCache(os.path.join(tmp_dir, "cache"))
+
+            first = cache.stat(href)
+            self.assertEqual(first["size"], 10)
+
+            # Rewriting a partition does not change the dataset directory
+            with open(part, "wb") as file:
+                file.write(b"y" * 20)
+            stat = os.stat(part)
+            os.utime(part, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+            second = cache.stat(href)
+            self.assertEqual(second["size"], 20)
+            self.assertNotEqual(second["fingerprint"], first["fingerprint"])
+
+            with open(os.path.join(partition, "part-1.parquet"), "wb") as file:
+                file.write(b"z")
+            self.assertEqual(cache.stat(href)["size"], 21)
+
+    def test_eviction(self):
+        with TemporaryDirectory() as tmp_dir:
+            cache = AssetCache(tmp_dir, max_size=100)
+            for n in range(10):
+                cache.put(f"key-{n}", {"value": "x" * 20})
+
+            total = sum(
+                os.path.getsize(os.path.join(tmp_dir, name))
+                for name in os.listdir(tmp_dir))
+            self.assertLessEqual(total, 100)
+            self.assertIsNotNone(cache.get("key-9"))
+
+    def test_get_evicted_entry(self):
+        with TemporaryDirectory() as tmp_dir:
+            cache = AssetCache(tmp_dir)
+            cache.put("key", {"value": 1})
+            # Another process evicts the entry between the read and the touch
+            with mock.patch("stactools.ghcnd.cache.os.utime",
+                            side_effect=FileNotFoundError):
+                self.assertIsNone(cache.get("key"))
+
+    def test_create_item_with_cache(self):
+        with TemporaryDirectory() as tmp_dir:
+            cache = AssetCache(tmp_dir)
+            item = stac.create_item("tests/data/1763-1764.csv", cache=cache)
+
+            self.assertEqual(item.assets["data"].extra_fields["file:size"],
+                             os.path.getsize("tests/data/1763-1764.csv"))
+            self.assertEqual(len(os.listdir(tmp_dir)), 1)
@@ -0,0 +1,79 @@
+import hashlib
+import os
+import unittest
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from stactools.ghcnd import stac
+from stactools.ghcnd.cache import AssetCache
+from stactools.ghcnd.checksum import (
+    asset_file_info,
+    asset_file_infos,
+    read_file_info,
+)
+
+from .utils import DATA_HREF, copy_by_year
+
+
+def expected_checksum(href):
+    with open(href, "rb") as file:
+        return "1220" + hashlib.sha256(file.read()).hexdigest()
+
+
+class ChecksumTest(unittest.TestCase):
+    def test_read_file_info(self):
+        info = read_file_info(DATA_HREF, block_size=1000)
+
+        self.assertEqual(info.size, os.path.getsize(DATA_HREF))
+        self.assertEqual(info.checksum, expected_checksum(DATA_HREF))
+
+    def test_unchanged_asset_is_not_hashed_again(self):
+        with TemporaryDirectory() as tmp_dir:
+            href, = copy_by_year(tmp_dir, (1763, ))
+            cache = AssetCache(os.path.join(tmp_dir, "cache"))
+
+            first = asset_file_info(href, cache)
+            with mock.patch(
+                    "stactools.ghcnd.checksum.read_file_info") as read:
+                self.assertEqual(asset_file_info(href, cache), first)
+                read.assert_not_called()
+
+            with open(href, "a") as file:
+                file.write("extra\n")
+            changed = asset_file_info(href, cache)
+            self.assertEqual(changed.size, first.size + 6)
+            self.assertEqual(changed.checksum, expected_checksum(href))
+
+    def test_asset_file_infos(self):
+        with TemporaryDirectory() as tmp_dir:
+            hrefs = []
+            for year in (1763, 1764, 1765):
+                href = os.path.join(tmp_dir, f"{year}.csv")
+                with open(href, "w") as file:
+                    file.write(f"{year}\n")
+                hrefs.append(href)
+
+            infos = asset_file_infos(hrefs, workers=3)
+
+            self.assertEqual(list(infos), hrefs)
+            for href in hrefs:
+                self.assertEqual(infos[href].checksum,
+                                 expected_checksum(href))
+
+    def test_create_item_with_checksum(self):
+        item = stac.create_item(DATA_HREF, checksum=True)
+        fields = item.assets["data"].extra_fields
+
+        self.assertEqual(fields["file:checksum"], expected_checksum(DATA_HREF))
+        self.assertEqual(fields["file:size"], os.path.getsize(DATA_HREF))
+        item.validate()
+
+    def test_create_items_with_checksum(self):
+        with TemporaryDirectory() as tmp_dir:
+            items = stac.create_items(copy_by_year(tmp_dir),
+                                      workers=2,
+                                      checksum=True)
+
+        for item in items:
+            self.assertEqual(item.assets["data"].extra_fields["file:checksum"],
+                             expected_checksum(DATA_HREF))
@@ -0,0 +1,67 @@
+import os
+import unittest
+from tempfile import TemporaryDirectory
+
+import numpy as np
+
+from stactools.ghcnd import columnar
+
+DATA_HREF = "tests/data/1763-1764.csv"
+
+
+class ColumnarTest(unittest.TestCase):
+    def test_element_dictionary(self):
+        codes = columnar.element_dictionary()
+
+        self.assertEqual(codes[:5], ["PRCP", "SNOW", "SNWD", "TMAX", "TMIN"])
+        self.assertIn("SN32", codes)
+        self.assertIn("SX81", codes)
+        self.assertIn("WT01", codes)
+        self.assertEqual(len(codes), len(set(codes)))
+        self.assertLessEqual(len(codes), 256)
+
+    def test_build_and_select(self):
+        with TemporaryDirectory() as tmp_dir:
+            cache = columnar.build_observation_cache(DATA_HREF,
+                                                     tmp_dir,
+                                                     chunksize=100)
+
+            self.assertEqual(len(cache), 1462)
+            self.assertEqual(cache.stations, ["ITE00100554"])
+            self.assertIsInstance(cache["value"], np.memmap)
+            self.assertEqual(cache["value"].dtype, np.int16)
+            self.assertEqual(cache["element"].dtype, np.uint8)
+
+            frame = cache.select(element="TMAX", start=17630101, end=17630131)
+            self.assertEqual(len(frame), 31)
+            first = frame.iloc[0]
+            self.assertEqual(first["ID"], "ITE00100554")
+            self.assertEqual(first["YEAR/MONTH/DAY"], 17630101)
+            self.assertEqual(first["ELEMENT"], "TMAX")
+            self.assertEqual(first["DATA VALUE"], -36)
+            self.assertEqual(first["S-FLAG"], "E")
+            self.assertIsNone(first["Q-FLAG"])
+
+            self.assertEqual(cache.mask(station="UNKNOWN").sum(), 0)
+
+    def test_open_rebuilds_stale_cache(self):
+        with TemporaryDirectory() as tmp_dir:
+            href = os.path.join(tmp_dir, "data.csv")
+            with open(DATA_HREF) as source:
+                lines = source.readlines()
+            with open(href, "w") as file:
+                file.writelines(lines[:11])
+            cache_dir = os.path.join(tmp_dir, "cache")
+
+            cache = columnar.open_observation_cache(href, cache_dir)
+            self.assertEqual(len(cache), 10)
+            self.assertTrue(cache.is_current())
+            self.assertEqual(
+                len(columnar.open_observation_cache(href, cache_dir)), 10)
+
+            with open(href, "w") as file:
+                file.writelines(lines[:21])
+            os.utime(href, (0, 0))
+            self.assertFalse(cache.is_current())
+            self.assertEqual(
+                len(columnar.open_observation_cache(href, cache_dir)), 20)
@@ -1,4 +1,6 @@
+import json
 import os.path
+import shutil
 from pathlib import Path
 from tempfile import TemporaryDirectory
 
@@ -8,6 +10,8 @@ from stactools.testing import CliTestCase
 from stactools.ghcnd.commands import create_ghcnd_command
 from stactools.ghcnd.constants import DOI, GHCND_EPSG, GHCND_ID, LICENSE
 
+from .utils import copy_by_year
+
 
 class CommandsTest(CliTestCase):
     def create_subcommand_functions(self):
@@ -73,3 +77,110 @@ class CommandsTest(CliTestCase):
 
             jsons = [p for p in Path(tmp_dir).rglob('*.json')]
             self.assertEqual(len(jsons), 2)
+
+    def test_populate_collection_duplicate_ids(self):
+        with TemporaryDirectory() as tmp_dir:
+            source_dir = os.path.join(tmp_dir, "source")
+            os.mkdir(source_dir)
+            for name in ("a.csv", "b.csv"):
+                shutil.copy("tests/data/1763-1764.csv",
+                            os.path.join(source_dir, name))
+            destination = os.path.join(tmp_dir, "stac")
+
+            result = self.run_command([
+                "ghcnd", "populate-collection", "-s", source_dir, "-d",
+                destination
+            ])
+            self.assertEqual(result.exit_code, 2)
+            self.assertIn("GHCNd", result.output)
+            self.assertFalse(os.path.exists(destination))
+
+    def test_populate_collection_offline(self):
+        with TemporaryDirectory() as tmp_dir:
+            source_dir = os.path.join(tmp_dir, "by_year")
+            os.mkdir(source_dir)
+            copy_by_year(source_dir)
+            destination = os.path.join(tmp_dir, "stac")
+            schema_dir = os.path.join(tmp_dir, "schemas")
+
+            result = self.run_command([
+                "ghcnd", "populate-collection", "-s", source_dir, "-d",
+                destination, "--offline"
+            ])
+            self.assertEqual(result.exit_code, 2)
+            self.assertIn("--schema-dir", result.output)
+
+            with self.assertRaisesRegex(pystac.STACError,
+                                        "downloads are disabled"):
+                self.run_command([
+                    "ghcnd", "populate-collection", "-s", source_dir, "-d",
+                    destination, "--workers", "2", "--schema-dir",
+                    schema_dir, "--offline"
+                ])
+            self.assertFalse(os.path.exists(destination))
+
+    def test_populate_collection_profile(self):
+        with TemporaryDirectory() as tmp_dir:
+            profile = os.path.join(tmp_dir, "profile.json")
+            destination = os.path.join(tmp_dir, "stac")
+
+            result = self.run_command([
+                "ghcnd", "populate-collection", "-s",
+                "tests/data/1763-1764.csv", "-d", destination, "--profile",
+                profile
+            ])
+            self.assertEqual(result.exit_code,
+                             0,
+                             msg="\n{}".format(result.output))
+
+            with open(profile) as file:
+                report = json.load(file)
+            for stage in ("create_collection", "create_item", "asset_size",
+                          "normalize_hrefs", "save", "validate"):
+                self.assertIn(stage, report["summary"])
+
+    def test_populate_collection_by_year(self):
+        with TemporaryDirectory() as tmp_dir:
+            source_dir = os.path.join(tmp_dir, "by_year")
+            os.mkdir(source_dir)
+            copy_by_year(source_dir)
+            destination = os.path.join(tmp_dir, "stac")
+
+            result = self.run_command([
+                "ghcnd", "populate-collection", "-s", source_dir, "-d",
+                destination, "--workers", "2"
+            ])
+            self.assertEqual(result.exit_code,
+                             0,
+                             msg="\n{}".format(result.output))
+
+            jsons = [p for p in Path(destination).rglob('*.json')]
+            self.assertEqual(len(jsons), 3)
+
+            collection = pystac.read_file(
+                os.path.join(destination, "collection.json"))
+            item_ids = sorted(item.id for item in collection.get_all_items())
+            self.assertEqual(item_ids, ["GHCNd-1763", "GHCNd-1764"])
+            # The extent covers the Items instead of all of GHCNd
+            start, end = collection.extent.temporal.intervals[0]
+            self.assertEqual((start.year, end.year), (1763, 1764))
+
+    def test_convert_item_without_validation(self):
+        with TemporaryDirectory() as tmp_dir:
+            destination = os.path.join(tmp_dir, "parquet")
+            item = os.path.join(tmp_dir, "item.json")
+
+            result = self.run_command([
+                "ghcnd", "convert", "-s", "tests/data/1763-1764.csv", "-d",
+                destination, "-i", item, "--offline"
+            ])
+            self.assertEqual(result.exit_code, 2)
+
+            result = self.run_command([
+                "ghcnd", "convert", "-s", "tests/data/1763-1764.csv", "-d",
+                destination, "-i", item, "--validate", "none"
+            ])
+            self.assertEqual(result.exit_code,
+                             0,
+                             msg="\n{}".format(result.output))
+            self.assertEqual(pystac.read_file(item).id, "GHCNd")
@@ -0,0 +1,96 @@
+import os
+import unittest
+from tempfile import TemporaryDirectory
+
+import numpy as np
+from pystac.extensions.projection import ProjectionExtension
+
+from stactools.ghcnd.constants import GHCND_EPSG
+
+try:
+    import zarr
+except ImportError:
+    zarr = None
+
+DATA_HREF = "tests/data/1763-1764.csv"
+STATIONS_HREF = "tests/data/ghcnd-stations.txt"
+
+
+@unittest.skipUnless(zarr, "zarr is not installed")
+class DatacubeTest(unittest.TestCase):
+    def test_date_to_days(self):
+        from stactools.ghcnd.datacube import date_to_days
+
+        days = date_to_days(np.array([19700101, 19700201, 17630101]))
+
+        self.assertEqual(list(days),
+                         [0, 31, (np.datetime64("1763-01-01") -
+                                  np.datetime64("1970-01-01")).astype(int)])
+
+    def test_convert_to_datacube(self):
+        from stactools.ghcnd import datacube
+
+        with TemporaryDirectory() as tmp_dir:
+            destination = os.path.join(tmp_dir, "ghcnd.zarr")
+            datacube.convert_to_datacube(DATA_HREF,
+                                         destination,
+                                         cache_dir=tmp_dir,
+                                         stations_href=STATIONS_HREF,
+                                         time_chunk=100)
+
+            root = zarr.open_consolidated(destination, mode="r")
+            self.assertEqual(list(root["station"][:]), ["ITE00100554"])
+            self.assertEqual(list(root["element"][:]), ["TMAX", "TMIN"])
+            self.assertEqual(root["value"].shape, (1, 731, 2))
+            self.assertEqual(root["value"].chunks, (8, 100, 1))
+            self.assertEqual(root["q_flag"].dtype, np.uint8)
+            self.assertEqual(root["time"].attrs["units"],
+                             "days since 1763-01-01")
+
+            tmax = root["value"][0, :, 0]
+            self.assertEqual(tmax[0], -36)
+            self.assertEqual(tmax.min(), -39)
+            self.assertEqual(tmax.max(), 309)
+            self.assertEqual(root["value"][0, :, 1].min(), -63)
+            self.assertEqual((root["q_flag"][:] == ord("I")).sum(), 17)
+            self.assertTrue((root["s_flag"][:] == ord("E")).all())
+            self.assertAlmostEqual(root["latitude"][0], 45.4717)
+            self.assertAlmostEqual(root["longitude"][0], 9.1892)
+
+            item = datacube.create_datacube_item(destination)
+            self.assertIn(datacube.DATACUBE_EXTENSION_SCHEMA,
+                          item.stac_extensions)
+            dimensions = item.properties["cube:dimensions"]
+            self.assertEqual(dimensions["time"]["extent"][0],
+                             "1763-01-01T00:00:00Z")
+            self.assertEqual(dimensions["time"]["extent"][1],
+                             "1764-12-31T23:59:59Z")
+            self.assertEqual(dimensions["element"]["values"],
+                             ["TMAX", "TMIN"])
+            self.assertEqual(item.properties["cube:variables"]["value"]
+                             ["dimensions"], ["station", "time", "element"])
+            self.assertEqual(item.bbox, [9.1892, 45.4717, 9.1892, 45.4717])
+            self.assertEqual(item.assets["data"].media_type,
+                             datacube.ZARR_MEDIA_TYPE)
+            self.assertIn(ProjectionExtension.get_schema_uri(),
+                          item.stac_extensions)
+            self.assertEqual(
+                ProjectionExtension.ext(item.assets["data"]).epsg,
+                GHCND_EPSG)
+            item.validate()
+
+    def test_elements_subset(self):
+        from stactools.ghcnd import datacube
+
+        with TemporaryDirectory() as tmp_dir:
+            destination = os.path.join(tmp_dir, "ghcnd.zarr")
+            datacube.convert_to_datacube(DATA_HREF,
+                                         destination,
+                                         elements=["TMIN", "PRCP"])
+
+            root = zarr.open_consolidated(destination, mode="r")
+            self.assertEqual(list(root["element"][:]), ["TMIN", "PRCP"])
+            self.assertEqual(root["value"][0, :, 0].min(), -63)
+            self.assertTrue(
+                (root["value"][0, :, 1] == datacube.MISSING_VALUE).all())
+            self.assertNotIn("latitude", root)
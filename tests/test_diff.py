@@ -0,0 +1,137 @@
+import io
+import json
+import os
+import tarfile
+import unittest
+from tempfile import TemporaryDirectory
+
+import pyarrow.compute as pc
+
+from stactools.ghcnd import diff, parquet, stac
+
+DATA_HREF = "tests/data/1763-1764.csv"
+STATIONS_HREF = "tests/data/ghcnd-stations.txt"
+
+DIFF_SETS = {
+    "insert": ["ITE00100554,17650101,TMAX,12,,,E,\n"],
+    "update": ["ITE00100554,17630101,TMAX,-30,,,E,\n"],
+    "delete": ["ITE00100554,17630101,TMIN,-50,,,E,\n"],
+}
+
+
+def write_diff(href):
+    """Write DIFF_SETS as a superghcnd diff archive"""
+    with tarfile.open(href, "w:gz") as archive:
+        for name, lines in DIFF_SETS.items():
+            data = "".join(lines).encode("utf-8")
+            info = tarfile.TarInfo(f"diff/{name}.csv")
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return href
+
+
+class DiffTest(unittest.TestCase):
+    def test_read_diff(self):
+        with TemporaryDirectory() as tmp_dir:
+            frames = diff.read_diff(
+                write_diff(os.path.join(tmp_dir, "diff.tar.gz")))
+
+        self.assertEqual(sorted(frames), ["delete", "insert", "update"])
+        self.assertEqual(frames["update"].iloc[0]["DATA VALUE"], "-30")
+        self.assertEqual(frames["update"].iloc[0]["M-FLAG"], "")
+
+    def test_apply_diff(self):
+        with TemporaryDirectory() as tmp_dir:
+            store = os.path.join(tmp_dir, "ghcnd.parquet")
+            parquet.convert_to_parquet(DATA_HREF, store)
+            untouched = os.listdir(os.path.join(store, "year=1764"))
+            item_href = os.path.join(tmp_dir, "item.json")
+            stac.create_item(store).save_object(include_self_link=False,
+                                                dest_href=item_href)
+            diff_href = write_diff(os.path.join(tmp_dir, "diff.tar.gz"))
+
+            changes = diff.apply_diff(diff_href,
+                                      store,
+                                      stations_href=STATIONS_HREF)
+
+            self.assertEqual([change.year for change in changes],
+                             [1763, 1765])
+            self.assertEqual(changes[0].rows_removed, 2)
+            self.assertEqual(changes[0].rows_added, 1)
+            self.assertEqual(changes[0].element_counts, {"TMIN": -1})
+            self.assertEqual(changes[1].first_date, "17650101")
+            self.assertEqual(sorted(os.listdir(store)),
+                             ["year=1763", "year=1764", "year=1765"])
+            self.assertEqual(os.listdir(os.path.join(store, "year=1764")),
+                             untouched)
+
+            table = parquet.open_dataset(store).to_table()
+            self.assertEqual(table.num_rows, 1462)
+            first_day = table.filter(
+                pc.equal(table.column("YEAR/MONTH/DAY"),
+                         "17630101")).to_pylist()
+            self.assertEqual([(row["ELEMENT"], row["DATA VALUE"])
+                              for row in first_day], [("TMAX", -30)])
+            self.assertEqual(first_day[0]["NAME"], "MILAN")
+
+            # Applying the same diff again changes nothing
+            diff.apply_diff(diff_href, store, stations_href=STATIONS_HREF)
+            self.assertEqual(parquet.open_dataset(store).count_rows(), 1462)
+
+            updated = diff.update_items([item_href], store, changes)
+            self.assertEqual(updated, [item_href])
+            with open(item_href) as file:
+                item_dict = json.load(file)
+            self.assertEqual(item_dict["assets"]["data"]["file:size"],
+                             stac.asset_size(store))
+
+    def test_update_item_dict(self):
+        item_dict = {
+            "properties": {
+                "datetime": "1763-01-01T00:00:00Z",
+                "start_datetime": "1763-01-01T00:00:00Z",
+                "end_datetime": "1764-12-31T23:59:59Z",
+                "table:row_count": 1462,
+            },
+            "assets": {
+                "data": {
+                    "href": "ghcnd.parquet",
+                    "file:checksum": "1220abcd",
+                    "table:row_count": 1462,
+                    "ghcnd:element_counts": {
+                        "TMAX": 731,
+                        "TMIN": 731
+                    },
+                    "ghcnd:flag_counts": {},
+                }
+            },
+        }
+        changes = [
+            diff.PartitionChange(1763,
+                                 rows_removed=2,
+                                 rows_added=1,
+                                 element_counts={"TMIN": -1},
+                                 first_date="17630101",
+                                 last_date="17630101"),
+            diff.PartitionChange(1765,
+                                 rows_added=1,
+                                 element_counts={"PRCP": 1},
+                                 first_date="17650101",
+                                 last_date="17650101"),
+        ]
+
+        diff.update_item_dict(item_dict, changes, size=100)
+
+        properties = item_dict["properties"]
+        self.assertEqual(properties["start_datetime"], "1763-01-01T00:00:00Z")
+        self.assertEqual(properties["end_datetime"], "1765-01-01T23:59:59Z")
+        self.assertEqual(properties["table:row_count"], 1462)
+        data_asset = item_dict["assets"]["data"]
+        self.assertEqual(data_asset["file:size"], 100)
+        self.assertNotIn("file:checksum", data_asset)
+        self.assertNotIn("ghcnd:flag_counts", data_asset)
+        self.assertEqual(data_asset["ghcnd:element_counts"], {
+            "PRCP": 1,
+            "TMAX": 731,
+            "TMIN": 730
+        })
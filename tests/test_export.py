@@ -0,0 +1,99 @@
+import json
+import os
+import unittest
+from tempfile import TemporaryDirectory
+
+import pyarrow.parquet as pq
+import pystac
+from shapely import wkb
+
+from stactools.ghcnd import export, stac
+
+from .utils import copy_by_year
+
+
+class ExportTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.hrefs = copy_by_year(self.tmp_dir.name, (1763, 1764, 1765))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_export_format(self):
+        self.assertEqual(export.export_format("items.ndjson.gz"), "ndjson")
+        self.assertEqual(export.export_format("items.parquet"), "geoparquet")
+
+    def test_iter_item_dicts(self):
+        item_dicts = stac.iter_item_dicts(self.hrefs, workers=2)
+
+        self.assertNotIsInstance(item_dicts, list)
+        self.assertEqual([d["id"] for d in item_dicts],
+                         ["GHCNd-1763", "GHCNd-1764", "GHCNd-1765"])
+
+    def test_write_ndjson(self):
+        href = os.path.join(self.tmp_dir.name, "items.ndjson")
+        item_dicts = export.with_collection(stac.iter_item_dicts(self.hrefs),
+                                            "ghcnd", "./collection.json")
+
+        count = export.export_items(item_dicts, href, batch_size=2)
+
+        self.assertEqual(count, 3)
+        with open(href) as file:
+            lines = file.readlines()
+        self.assertEqual(len(lines), 3)
+        item = pystac.Item.from_dict(json.loads(lines[0]))
+        self.assertEqual(item.id, "GHCNd-1763")
+        self.assertEqual(item.collection_id, "ghcnd")
+
+    def test_write_geoparquet(self):
+        href = os.path.join(self.tmp_dir.name, "items.parquet")
+
+        count = export.export_items(stac.iter_item_dicts(self.hrefs,
+                                                         scan=True),
+                                    href,
+                                    batch_size=2)
+
+        self.assertEqual(count, 3)
+        parquet_file = pq.ParquetFile(href)
+        self.assertEqual(parquet_file.metadata.num_row_groups, 2)
+        self.assertIn(b"geo", parquet_file.schema_arrow.metadata)
+        table = parquet_file.read()
+        self.assertEqual(table.column("id").to_pylist(),
+                         ["GHCNd-1763", "GHCNd-1764", "GHCNd-1765"])
+        self.assertEqual(table.column("table:row_count").to_pylist(),
+                         [1462] * 3)
+        geometry = wkb.loads(table.column("geometry")[0].as_py())
+        self.assertEqual(geometry.geom_type, "Point")
+        counts = table.column("assets")[0].as_py(
+        )["data"]["ghcnd:element_counts"]
+        self.assertEqual(counts, [{
+            "element": "TMAX",
+            "count": 731
+        }, {
+            "element": "TMIN",
+            "count": 731
+        }])
+        flag_counts = table.column("assets")[0].as_py(
+        )["data"]["ghcnd:flag_counts"]
+        self.assertIn({
+            "flag": "Q-FLAG",
+            "value": "I",
+            "count": 17
+        }, flag_counts)
+
+    def test_write_geoparquet_with_varying_fields(self):
+        href = os.path.join(self.tmp_dir.name, "items.parquet")
+        item_dicts = list(stac.iter_item_dicts(self.hrefs))
+        item_dicts[0]["properties"]["ghcnd:note"] = None
+        item_dicts[2]["properties"]["ghcnd:note"] = "1765"
+        item_dicts[2]["properties"]["ghcnd:extra"] = 1
+
+        count = export.export_items(item_dicts, href, batch_size=2)
+
+        self.assertEqual(count, 3)
+        table = pq.read_table(href)
+        self.assertEqual(table.column("ghcnd:note").to_pylist(),
+                         [None, None, "1765"])
+        self.assertEqual(table.column("ghcnd:extra").to_pylist(),
+                         [None, None, 1])
@@ -0,0 +1,86 @@
+import os
+import unittest
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+import fsspec
+
+from stactools.ghcnd import index, stac
+
+DATA_HREF = "tests/data/1763-1764.csv"
+
+
+def write_two_stations(path):
+    """The test data with a second station appended"""
+    with open(DATA_HREF) as source:
+        lines = source.readlines()
+    extra = [
+        line.replace("ITE00100554", "USC00000001") for line in lines[1:11]
+    ]
+    with open(path, "w") as file:
+        file.writelines(lines + extra)
+
+
+class IndexTest(unittest.TestCase):
+    def test_build_index(self):
+        with TemporaryDirectory() as tmp_dir:
+            href = os.path.join(tmp_dir, "data.csv")
+            write_two_stations(href)
+
+            index_href = index.build_index(href, block_size=1000)
+            self.assertEqual(index_href, href + index.INDEX_SUFFIX)
+
+            rows, header = index.read_index(index_href)
+            self.assertTrue(header.startswith(b"ID,YEAR/MONTH/DAY"))
+            self.assertEqual(list(rows["station"]),
+                             ["ITE00100554", "ITE00100554", "USC00000001"])
+            self.assertEqual(list(rows["year"]), [1763, 1764, 1763])
+            self.assertEqual(rows["start"][0], len(header))
+            self.assertEqual(rows["end"][2], os.path.getsize(href))
+
+    def test_query(self):
+        with TemporaryDirectory() as tmp_dir:
+            href = os.path.join(tmp_dir, "data.csv")
+            write_two_stations(href)
+            index.build_index(href)
+
+            frame = index.query(href,
+                                "ITE00100554",
+                                element="TMAX",
+                                start=17640101,
+                                end=17640131)
+            self.assertEqual(len(frame), 31)
+            self.assertEqual(set(frame["ELEMENT"]), {"TMAX"})
+            self.assertEqual(frame["YEAR/MONTH/DAY"].iloc[0], "17640101")
+
+            self.assertEqual(len(index.query(href, "USC00000001")), 10)
+            self.assertEqual(len(index.query(href, "UNKNOWN")), 0)
+
+    def test_query_reads_only_needed_ranges(self):
+        with TemporaryDirectory() as tmp_dir:
+            href = os.path.join(tmp_dir, "data.csv")
+            write_two_stations(href)
+            index.build_index(href)
+            rows, _ = index.read_index(href + index.INDEX_SUFFIX)
+
+            fs = fsspec.filesystem("file")
+            with mock.patch.object(type(fs),
+                                   "cat_file",
+                                   autospec=True,
+                                   side_effect=type(fs).cat_file) as cat:
+                index.query(href, "USC00000001")
+            (_, _), kwargs = cat.call_args
+            self.assertEqual(cat.call_count, 1)
+            self.assertEqual(kwargs["start"], rows["start"][2])
+            self.assertEqual(kwargs["end"], rows["end"][2])
+
+    def test_compressed_asset_is_rejected(self):
+        with self.assertRaises(ValueError):
+            index.build_index("data.csv.gz")
+
+    def test_create_item_with_index(self):
+        item = stac.create_item(DATA_HREF,
+                                index_href=DATA_HREF + index.INDEX_SUFFIX)
+
+        self.assertEqual(item.assets["index"].roles, ["metadata", "index"])
+        item.validate()
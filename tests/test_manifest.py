@@ -0,0 +1,103 @@
+import os
+import unittest
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+import pystac
+
+from stactools.ghcnd import manifest, validation
+
+from .utils import copy_by_year
+
+
+class ManifestTest(unittest.TestCase):
+    def test_populate_incremental(self):
+        with TemporaryDirectory() as tmp_dir:
+            sources = copy_by_year(tmp_dir)
+            destination = os.path.join(tmp_dir, "stac")
+
+            changed = manifest.populate_incremental(sources, destination)
+            self.assertEqual(changed, sources)
+
+            changed = manifest.populate_incremental(sources, destination)
+            self.assertEqual(changed, [])
+
+            collection = pystac.read_file(
+                os.path.join(destination, "collection.json"))
+            item_ids = sorted(item.id for item in collection.get_all_items())
+            self.assertEqual(item_ids, ["GHCNd-1763", "GHCNd-1764"])
+            self.assertEqual(
+                collection.extent.temporal.intervals[0][1].year, 1764)
+            collection.validate()
+
+            with open(sources[1], "a") as file:
+                file.write("\n")
+            changed = manifest.populate_incremental(sources, destination)
+            self.assertEqual(changed, [sources[1]])
+
+            changed = manifest.populate_incremental(sources[1:], destination)
+            self.assertEqual(changed, [])
+            self.assertFalse(
+                os.path.exists(
+                    os.path.join(destination, "GHCNd-1763",
+                                 "GHCNd-1763.json")))
+            collection = pystac.read_file(
+                os.path.join(destination, "collection.json"))
+            self.assertEqual([item.id for item in collection.get_all_items()],
+                             ["GHCNd-1764"])
+
+    def test_populate_incremental_validation(self):
+        with TemporaryDirectory() as tmp_dir:
+            source, = copy_by_year(tmp_dir, (1763, ))
+            destination = os.path.join(tmp_dir, "stac")
+            schema_dir = os.path.join(tmp_dir, "schemas")
+
+            with mock.patch.object(validation, "validate_dict") as items, \
+                    mock.patch.object(validation,
+                                      "use_schema_cache") as schemas, \
+                    mock.patch.object(pystac.Collection,
+                                      "validate") as collection:
+                manifest.populate_incremental([source],
+                                              destination,
+                                              validate_mode="sample",
+                                              schema_dir=schema_dir,
+                                              offline=True)
+                items.assert_called_once()
+                schemas.assert_called_with(schema_dir, True)
+                collection.assert_called_once()
+
+                with open(source, "a") as file:
+                    file.write("\n")
+                items.reset_mock()
+                collection.reset_mock()
+                manifest.populate_incremental([source],
+                                              destination,
+                                              validate_mode="none")
+                items.assert_not_called()
+                collection.assert_not_called()
+
+    def test_populate_incremental_checksum(self):
+        with TemporaryDirectory() as tmp_dir:
+            source, = copy_by_year(tmp_dir, (1763, ))
+            destination = os.path.join(tmp_dir, "stac")
+            options = {"checksum": True, "validate_mode": "none"}
+
+            changed = manifest.populate_incremental([source], destination,
+                                                    **options)
+            self.assertEqual(changed, [source])
+            entry = manifest.BuildManifest.load(destination).entries[source]
+            self.assertEqual(entry["source"]["file:checksum"][:4], "1220")
+
+            # Same size and modification time, different content
+            stat = os.stat(source)
+            with open(source, "r+") as file:
+                file.seek(stat.st_size - 2)
+                file.write("X")
+            os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            changed = manifest.populate_incremental([source], destination,
+                                                    **options)
+            self.assertEqual(changed, [source])
+
+            changed = manifest.populate_incremental([source], destination,
+                                                    **options)
+            self.assertEqual(changed, [])
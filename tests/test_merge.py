@@ -0,0 +1,68 @@
+import csv
+import gzip
+import os
+import unittest
+from tempfile import TemporaryDirectory
+
+from stactools.ghcnd import merge
+
+DATA_HREF = "tests/data/1763-1764.csv"
+STATIONS_HREF = "tests/data/ghcnd-stations.txt"
+
+
+def write_by_year(tmp_dir):
+    """Split the test data into headerless, gzipped by_year files"""
+    with open(DATA_HREF, newline="") as source:
+        rows = list(csv.reader(source))[1:]
+    hrefs = []
+    for year in ("1763", "1764"):
+        href = os.path.join(tmp_dir, f"{year}.csv.gz")
+        with gzip.open(href, "wt", newline="") as file:
+            csv.writer(file, lineterminator="\n").writerows(
+                row[:len(merge.DATA_COLUMNS)] for row in rows
+                if row[1].startswith(year))
+        hrefs.append(href)
+    return hrefs
+
+
+class MergeTest(unittest.TestCase):
+    def test_build_asset(self):
+        with TemporaryDirectory() as tmp_dir:
+            destination = os.path.join(tmp_dir, "merged.csv")
+            merge.build_asset(write_by_year(tmp_dir),
+                              destination,
+                              stations_href=STATIONS_HREF,
+                              workers=2,
+                              chunksize=100)
+
+            with open(destination, newline="") as file:
+                rows = list(csv.reader(file))
+            self.assertEqual(rows[0], merge.MERGED_COLUMNS)
+            self.assertEqual(len(rows), 1463)
+            dates = [row[1] for row in rows[1:]]
+            self.assertEqual(dates[0][:4], "1763")
+            self.assertEqual(dates[-1][:4], "1764")
+            # Years are written in order, rows in the order of their file
+            years = [date[:4] for date in dates]
+            self.assertEqual(years, sorted(years))
+
+            merged = dict(zip(merge.MERGED_COLUMNS, rows[1]))
+            self.assertEqual(merged["ID"], "ITE00100554")
+            self.assertEqual(merged["NAME"], "MILAN")
+            self.assertEqual(merged["geometry"], "POINT (9.1892 45.4717)")
+
+    def test_unknown_station(self):
+        with TemporaryDirectory() as tmp_dir:
+            href = os.path.join(tmp_dir, "1763.csv")
+            with open(href, "w") as file:
+                file.write("XXX00000000,17630101,TMAX,10,,,E,\n")
+            destination = os.path.join(tmp_dir, "merged.csv.gz")
+            merge.build_asset([href], destination, stations_href=STATIONS_HREF)
+
+            with gzip.open(destination, "rt", newline="") as file:
+                rows = list(csv.reader(file))
+            self.assertEqual(len(rows), 2)
+            self.assertEqual(rows[1][:8], [
+                "XXX00000000", "17630101", "TMAX", "10", "", "", "E", ""
+            ])
+            self.assertEqual(set(rows[1][8:]), {""})
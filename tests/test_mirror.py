@@ -0,0 +1,187 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import unittest
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from tempfile import TemporaryDirectory
+
+from stactools.ghcnd import mirror
+
+
+class ArchiveHandler(SimpleHTTPRequestHandler):
+    """Stand-in for the GHCNd server: static files with ETags, conditional
+    requests and byte ranges, logging the request headers of each file"""
+    requests = []  # type: ignore
+
+    def log_message(self, *args):
+        pass
+
+    def _etag(self, path):
+        with open(path, "rb") as file:
+            return '"' + hashlib.md5(file.read()).hexdigest() + '"'
+
+    def do_GET(self):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            return super().do_GET()
+        type(self).requests.append((self.path, dict(self.headers)))
+        if not os.path.exists(path):
+            return self.send_error(404)
+        etag = self._etag(path)
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        with open(path, "rb") as file:
+            content = file.read()
+        start = 0
+        range_header = self.headers.get("Range")
+        if range_header and self.headers.get("If-Range", etag) == etag:
+            start = int(range_header[len("bytes="):].rstrip("-"))
+            self.send_response(206)
+            self.send_header(
+                "Content-Range",
+                f"bytes {start}-{len(content) - 1}/{len(content)}")
+        else:
+            self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(content) - start))
+        self.end_headers()
+        self.wfile.write(content[start:])
+
+
+class MirrorTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.archive = os.path.join(self.tmp_dir.name, "archive")
+        os.makedirs(os.path.join(self.archive, mirror.YEARS_PATH))
+        for path in mirror.METADATA_PATHS:
+            with open(os.path.join(self.archive, path), "w") as file:
+                file.write(f"{path}\n")
+        with open("tests/data/1763-1764.csv", "rb") as source:
+            data = source.read()
+        for year in ("1763", "1764"):
+            with gzip.open(self.year_path(self.archive, year), "wb") as file:
+                file.write(data)
+        self.destination = os.path.join(self.tmp_dir.name, "mirror")
+
+        ArchiveHandler.requests = []
+        handler = partial(ArchiveHandler, directory=self.archive)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        host, port = self.server.server_address
+        self.base_url = f"http://{host}:{port}/"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.tmp_dir.cleanup()
+
+    def year_path(self, root, year):
+        return os.path.join(root, mirror.YEARS_PATH, f"{year}.csv.gz")
+
+    def assert_mirrored(self):
+        for path in mirror.METADATA_PATHS + [
+                mirror.YEARS_PATH + f"{year}.csv.gz"
+                for year in ("1763", "1764")
+        ]:
+            with open(os.path.join(self.archive, path), "rb") as expected:
+                with open(os.path.join(self.destination, path), "rb") as file:
+                    self.assertEqual(file.read(), expected.read(), path)
+
+    def test_mirror_and_refresh(self):
+        result = mirror.mirror(self.destination, base_url=self.base_url)
+        self.assertEqual(len(result.downloaded), 6)
+        self.assertEqual(result.failed, {})
+        self.assert_mirrored()
+
+        # Only the changed file is downloaded again
+        with open(self.year_path(self.archive, "1764"), "ab") as file:
+            file.write(b"changed")
+        result = mirror.mirror(self.destination, base_url=self.base_url)
+        self.assertEqual(result.downloaded,
+                         [mirror.YEARS_PATH + "1764.csv.gz"])
+        self.assertEqual(len(result.not_modified), 5)
+        self.assert_mirrored()
+
+    def test_resume_partial_download(self):
+        mirror.mirror(self.destination, base_url=self.base_url, years=[1763])
+        path = self.year_path(self.destination, "1763")
+        key = mirror.YEARS_PATH + "1763.csv.gz"
+
+        # Simulate a download interrupted after 100 bytes
+        state_href = os.path.join(self.destination, mirror.STATE_FILE_NAME)
+        with open(state_href) as file:
+            state = json.load(file)
+        state[key]["partial"] = {"etag": state[key].pop("etag")}
+        with open(state_href, "w") as file:
+            json.dump(state, file)
+        with open(path, "rb") as file:
+            head = file.read(100)
+        os.remove(path)
+        with open(path + mirror.PART_SUFFIX, "wb") as file:
+            file.write(head)
+
+        ArchiveHandler.requests = []
+        result = mirror.mirror(self.destination,
+                               base_url=self.base_url,
+                               years=[1763],
+                               paths=[])
+        self.assertEqual(result.resumed, [key])
+        (_, headers), = ArchiveHandler.requests
+        self.assertEqual(headers["Range"], "bytes=100-")
+        with open(self.year_path(self.archive, "1763"), "rb") as expected:
+            with open(path, "rb") as file:
+                self.assertEqual(file.read(), expected.read())
+        self.assertFalse(os.path.exists(path + mirror.PART_SUFFIX))
+
+    def test_changed_partial_download_restarts(self):
+        mirror.mirror(self.destination, base_url=self.base_url, years=[1763])
+        path = self.year_path(self.destination, "1763")
+        key = mirror.YEARS_PATH + "1763.csv.gz"
+        state_href = os.path.join(self.destination, mirror.STATE_FILE_NAME)
+        with open(state_href) as file:
+            state = json.load(file)
+        state[key]["partial"] = {"etag": '"outdated"'}
+        with open(state_href, "w") as file:
+            json.dump(state, file)
+        shutil.move(path, path + mirror.PART_SUFFIX)
+
+        result = mirror.mirror(self.destination,
+                               base_url=self.base_url,
+                               years=[1763],
+                               paths=[])
+        self.assertEqual(result.downloaded, [key])
+        with open(self.year_path(self.archive, "1763"), "rb") as expected:
+            with open(path, "rb") as file:
+                self.assertEqual(file.read(), expected.read())
+
+    def test_missing_file_fails(self):
+        result = mirror.mirror(self.destination,
+                               base_url=self.base_url,
+                               years=[1800],
+                               paths=[],
+                               retries=0)
+        self.assertEqual(list(result.failed),
+                         [mirror.YEARS_PATH + "1800.csv.gz"])
+
+    def test_max_bandwidth(self):
+        size = sum(
+            os.path.getsize(self.year_path(self.archive, year))
+            for year in ("1763", "1764"))
+        rate = size / 0.5
+        start = time.monotonic()
+        mirror.mirror(self.destination,
+                      base_url=self.base_url,
+                      years=[1763, 1764],
+                      paths=[],
+                      max_bandwidth=rate,
+                      concurrency=2)
+        self.assertGreaterEqual(time.monotonic() - start, 0.4)
@@ -0,0 +1,112 @@
+import json
+import os.path
+import unittest
+from tempfile import TemporaryDirectory
+
+import numpy as np
+import pyarrow.dataset as ds
+from shapely import wkb
+
+from stactools.ghcnd import parquet, stac
+from stactools.ghcnd.constants import PARQUET_MEDIA_TYPE
+from stactools.ghcnd.merge import DATA_COLUMNS
+
+from .test_merge import STATIONS_HREF, write_by_year
+
+
+class ParquetTest(unittest.TestCase):
+    def test_points_to_wkb(self):
+        geometries = parquet.points_to_wkb(np.array([9.1892, np.nan]),
+                                           np.array([45.4717, 1.0]))
+
+        point = wkb.loads(geometries[0].as_py())
+        self.assertEqual((point.x, point.y), (9.1892, 45.4717))
+        self.assertIsNone(geometries[1].as_py())
+
+    def test_convert_to_parquet(self):
+        with TemporaryDirectory() as tmp_dir:
+            destination = os.path.join(tmp_dir, "ghcnd.parquet")
+            parquet.convert_to_parquet("tests/data/1763-1764.csv",
+                                       destination,
+                                       chunksize=500)
+
+            self.assertEqual(sorted(os.listdir(destination)),
+                             ["year=1763", "year=1764"])
+
+            dataset = parquet.open_dataset(destination)
+            table = dataset.to_table()
+            self.assertEqual(table.num_rows, 1462)
+            geo = json.loads(dataset.schema.metadata[b"geo"])
+            self.assertEqual(geo["primary_column"], "geometry")
+            self.assertEqual(table.column("DATA VALUE").type, "int32")
+
+            first = table.slice(0, 1).to_pylist()[0]
+            self.assertEqual(first["ID"], "ITE00100554")
+            self.assertEqual(first["M-FLAG"], "")
+            self.assertEqual(wkb.loads(first["geometry"]).x, 9.1892)
+
+            item = stac.create_item(destination)
+            data_asset = item.assets["data"]
+            self.assertEqual(data_asset.media_type, PARQUET_MEDIA_TYPE)
+            self.assertGreater(data_asset.extra_fields["file:size"], 0)
+
+    def test_convert_by_year_in_parallel(self):
+        with TemporaryDirectory() as tmp_dir:
+            hrefs = write_by_year(tmp_dir)
+            merged = os.path.join(tmp_dir, "merged.parquet")
+            serial = os.path.join(tmp_dir, "serial.parquet")
+            parallel = os.path.join(tmp_dir, "parallel.parquet")
+            parquet.convert_to_parquet("tests/data/1763-1764.csv", merged)
+            parquet.convert_to_parquet(hrefs,
+                                       serial,
+                                       chunksize=500,
+                                       stations=STATIONS_HREF)
+            parquet.convert_to_parquet(hrefs,
+                                       parallel,
+                                       workers=2,
+                                       stations=STATIONS_HREF)
+
+            def rows(href, columns=None):
+                table = parquet.open_dataset(href).to_table(columns=columns)
+                key = ["YEAR/MONTH/DAY", "ELEMENT"]
+                return table.sort_by([(name, "ascending")
+                                      for name in key]).to_pylist()
+
+            self.assertEqual(rows(parallel), rows(serial))
+            # The station columns of the test data do not match the station
+            # file, compare the joined location
+            columns = DATA_COLUMNS + ["LONGITUDE", "LATITUDE", "geometry"]
+            self.assertEqual(len(rows(merged, columns)), 1462)
+            self.assertEqual(rows(serial, columns), rows(merged, columns))
+            self.assertEqual(rows(serial)[0]["NAME"], "MILAN")
+
+    def test_convert_to_parquet_by_element(self):
+        with TemporaryDirectory() as tmp_dir:
+            destination = os.path.join(tmp_dir, "ghcnd.parquet")
+            parquet.convert_to_parquet("tests/data/1763-1764.csv",
+                                       destination,
+                                       partition_by_element=True)
+
+            self.assertEqual(
+                sorted(os.listdir(os.path.join(destination, "year=1763"))),
+                ["ELEMENT=TMAX", "ELEMENT=TMIN"])
+            table = parquet.open_dataset(destination).to_table(
+                filter=ds.field("ELEMENT") == "TMAX")
+            self.assertEqual(set(table.column("ELEMENT").to_pylist()),
+                             {"TMAX"})
+
+    def test_convert_to_parquet_again(self):
+        with TemporaryDirectory() as tmp_dir:
+            destination = os.path.join(tmp_dir, "ghcnd.parquet")
+            parquet.convert_to_parquet("tests/data/1763-1764.csv",
+                                       destination,
+                                       chunksize=500)
+            parquet.convert_to_parquet("tests/data/1763-1764.csv",
+                                       destination,
+                                       partition_by_element=True)
+
+            self.assertEqual(
+                parquet.open_dataset(destination).to_table().num_rows, 1462)
+            self.assertEqual(
+                sorted(os.listdir(os.path.join(destination, "year=1763"))),
+                ["ELEMENT=TMAX", "ELEMENT=TMIN"])
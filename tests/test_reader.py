@@ -0,0 +1,87 @@
+import subprocess
+import sys
+import unittest
+from tempfile import TemporaryDirectory
+
+import pyarrow as pa
+
+from stactools.ghcnd import reader
+from stactools.ghcnd.merge import DATA_COLUMNS
+
+from .test_merge import write_by_year
+
+DATA_HREF = "tests/data/1763-1764.csv"
+
+
+class ReaderTest(unittest.TestCase):
+    def test_iter_batches(self):
+        batches = list(
+            reader.iter_batches(DATA_HREF,
+                                columns=["ID", "DATA VALUE", "M-FLAG"],
+                                column_types={
+                                    "DATA VALUE": pa.int32(),
+                                    "M-FLAG": pa.string()
+                                },
+                                block_size=10_000))
+
+        self.assertGreater(len(batches), 1)
+        table = pa.Table.from_batches(batches)
+        self.assertEqual(table.num_rows, 1462)
+        self.assertEqual(table.column_names, ["ID", "DATA VALUE", "M-FLAG"])
+        self.assertEqual(table.column("DATA VALUE").type, pa.int32())
+        self.assertEqual(table.column("M-FLAG")[0].as_py(), "")
+
+    def test_iter_tables_in_parallel(self):
+        with TemporaryDirectory() as tmp_dir:
+            hrefs = write_by_year(tmp_dir)
+            options = {
+                "columns": ["ID", "YEAR/MONTH/DAY", "DATA VALUE"],
+                "column_types": {
+                    "YEAR/MONTH/DAY": pa.string()
+                },
+                "column_names": DATA_COLUMNS,
+            }
+            serial = list(reader.iter_tables(hrefs, workers=1, **options))
+            parallel = list(reader.iter_tables(hrefs, workers=2, **options))
+
+            self.assertEqual([href for href, _ in parallel], hrefs)
+            self.assertTrue(
+                pa.concat_tables(table for _, table in parallel).equals(
+                    pa.concat_tables(table for _, table in serial)))
+            dates = parallel[1][1].column("YEAR/MONTH/DAY").to_pylist()
+            self.assertEqual(len(dates), 732)
+            self.assertTrue(all(date.startswith("1764") for date in dates))
+
+    def test_iter_tables_stops_early(self):
+        with TemporaryDirectory() as tmp_dir:
+            hrefs = write_by_year(tmp_dir) * 3
+            tables = reader.iter_tables(hrefs,
+                                        workers=2,
+                                        column_names=DATA_COLUMNS)
+            href, table = next(tables)
+            tables.close()
+
+            # The data stays valid after its block is unlinked
+            self.assertEqual(href, hrefs[0])
+            self.assertEqual(table.num_rows, 730)
+            self.assertEqual(table.column("ID")[0].as_py(), "ITE00100554")
+            self.assertEqual(table.column_names, DATA_COLUMNS)
+
+    def test_iter_tables_releases_shared_memory(self):
+        with TemporaryDirectory() as tmp_dir:
+            hrefs = write_by_year(tmp_dir)
+            # The resource tracker reports leaked or twice registered
+            # blocks when the interpreter exits
+            script = ("import sys\n"
+                      "from stactools.ghcnd import reader\n"
+                      "from stactools.ghcnd.merge import DATA_COLUMNS\n"
+                      "for _ in reader.iter_tables(sys.argv[1:], workers=2,\n"
+                      "                            column_names=DATA_COLUMNS):\n"
+                      "    pass\n")
+            result = subprocess.run([sys.executable, "-c", script, *hrefs],
+                                    capture_output=True,
+                                    text=True,
+                                    timeout=120)
+
+            self.assertEqual(result.returncode, 0, msg=result.stderr)
+            self.assertNotIn("resource_tracker", result.stderr)
@@ -0,0 +1,61 @@
+import gzip
+import unittest
+from tempfile import TemporaryDirectory
+
+from stactools.ghcnd import scan
+
+from .test_merge import write_by_year
+
+
+class ScanTest(unittest.TestCase):
+    def test_scan_data_asset(self):
+        result = scan.scan_data_asset("tests/data/1763-1764.csv",
+                                      chunksize=100)
+
+        self.assertEqual(result.row_count, 1462)
+        self.assertEqual(result.min_date, 17630101)
+        self.assertEqual(result.max_date, 17641231)
+        self.assertEqual(result.bbox, [9.1892, 45.4717, 9.1892, 45.4717])
+        self.assertEqual(result.element_counts, {"TMAX": 731, "TMIN": 731})
+        self.assertEqual(result.flag_counts, {
+            "M-FLAG": {
+                "": 1462
+            },
+            "Q-FLAG": {
+                "": 1445,
+                "I": 17
+            },
+            "S-FLAG": {
+                "E": 1462
+            },
+        })
+        statistics = result.element_statistics
+        self.assertEqual(list(statistics), ["TMAX", "TMIN"])
+        self.assertEqual(statistics["TMAX"]["count"], 731)
+        self.assertEqual(statistics["TMAX"]["minimum"], -39)
+        self.assertEqual(statistics["TMAX"]["maximum"], 309)
+        self.assertAlmostEqual(statistics["TMAX"]["mean"], 150.7373461)
+        self.assertEqual(statistics["TMIN"]["minimum"], -63)
+
+    def test_chunksize_does_not_change_result(self):
+        small = scan.scan_data_asset("tests/data/1763-1764.csv", chunksize=7)
+        large = scan.scan_data_asset("tests/data/1763-1764.csv")
+
+        self.assertEqual(small, large)
+
+    def test_scan_by_year(self):
+        with TemporaryDirectory() as tmp_dir:
+            href = write_by_year(tmp_dir)[0]
+            with gzip.open(href, "rb") as file:
+                self.assertFalse(scan.has_header(file))
+                self.assertEqual(file.tell(), 0)
+            with open("tests/data/1763-1764.csv", "rb") as file:
+                self.assertTrue(scan.has_header(file))
+
+            result = scan.scan_data_asset(href, chunksize=100)
+        self.assertEqual(result.row_count, 730)
+        self.assertEqual((result.min_date, result.max_date),
+                         (17630101, 17631231))
+        self.assertIsNone(result.bbox)
+        self.assertEqual(result.element_counts, {"TMAX": 365, "TMIN": 365})
+        self.assertEqual(result.flag_counts["S-FLAG"], {"E": 730})
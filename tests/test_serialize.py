@@ -0,0 +1,82 @@
+import json
+import os
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from pystac import CatalogType
+
+from stactools.ghcnd import serialize, stac
+
+DATA_HREF = "tests/data/1763-1764.csv"
+
+
+class SerializeTest(unittest.TestCase):
+    def test_fragment_encoder(self):
+        columns = [{"name": "ID", "type": "str"}]
+        encoder = serialize.FragmentEncoder([("table:columns", columns)])
+        value = {
+            "properties": {
+                "table:columns": columns,
+                "title": "GHCNd"
+            },
+            "assets": {
+                "data": {
+                    "table:columns": [{
+                        "name": "ID",
+                        "type": "str"
+                    }]
+                },
+                "other": {
+                    "table:columns": []
+                },
+            },
+        }
+
+        data = encoder.encode(value)
+
+        self.assertNotIn(b"\\u0000", data)
+        self.assertEqual(json.loads(data), value)
+        self.assertIs(value["properties"]["table:columns"], columns)
+
+    def test_write_files(self):
+        with TemporaryDirectory() as tmp_dir:
+            files = [(os.path.join(tmp_dir, f"{n}", f"{n}.json"), b"{}")
+                     for n in range(5)]
+
+            count = serialize.write_files(files, workers=2, batch_size=2)
+
+            self.assertEqual(count, 5)
+            for href, _ in files:
+                with open(href, "rb") as file:
+                    self.assertEqual(file.read(), b"{}")
+
+    def test_save_catalog(self):
+        def read(destination):
+            objects = {}
+            for path in Path(destination).rglob("*.json"):
+                stac_dict = json.loads(path.read_text())
+                # The order of links has no meaning
+                stac_dict["links"].sort(key=lambda link: link["rel"])
+                objects[path.relative_to(destination)] = stac_dict
+            return objects
+
+        def create(catalog_type, destination):
+            collection = stac.create_collection()
+            collection.catalog_type = catalog_type
+            collection.add_item(stac.create_item(os.path.abspath(DATA_HREF)))
+            collection.normalize_hrefs(destination)
+            return collection
+
+        for catalog_type in CatalogType:
+            with self.subTest(catalog_type=catalog_type), \
+                    TemporaryDirectory() as tmp_dir:
+                create(catalog_type, tmp_dir).save()
+                expected = read(tmp_dir)
+                for path in Path(tmp_dir).rglob("*.json"):
+                    path.unlink()
+
+                count = serialize.save_catalog(create(catalog_type, tmp_dir))
+
+                self.assertEqual(count, 2)
+                self.assertEqual(read(tmp_dir), expected)
@@ -1,8 +1,11 @@
 import unittest
+from tempfile import TemporaryDirectory
 
 from stactools.ghcnd import stac
 from stactools.ghcnd.constants import DOI, GHCND_EPSG, GHCND_ID, LICENSE
 
+from .utils import copy_by_year
+
 
 class StacTest(unittest.TestCase):
     def test_create_collection(self):
@@ -26,3 +29,80 @@ class StacTest(unittest.TestCase):
 
         # Validate
         item.validate()
+
+    def test_create_item_for_year(self):
+        item = stac.create_item("tests/data/1763-1764.csv", year=1763)
+
+        self.assertEqual(item.id, "GHCNd-1763")
+        self.assertEqual(item.properties["start_datetime"],
+                         "1763-01-01T00:00:00Z")
+        self.assertEqual(item.properties["end_datetime"],
+                         "1763-12-31T23:59:59Z")
+
+        item.validate()
+
+    def test_year_from_href(self):
+        self.assertEqual(
+            stac.year_from_href("https://example.com/by_year/1763.csv.gz"),
+            1763)
+        self.assertIsNone(stac.year_from_href("tests/data/1763-1764.csv"))
+
+    def test_create_items(self):
+        with TemporaryDirectory() as tmp_dir:
+            items = stac.create_items(copy_by_year(tmp_dir), workers=2)
+
+        self.assertEqual([item.id for item in items],
+                         ["GHCNd-1763", "GHCNd-1764"])
+        for item in items:
+            self.assertEqual(len(item.assets), 4)
+
+    def test_check_item_ids(self):
+        stac.check_item_ids(["by_year/1763.csv.gz", "by_year/1764.csv.gz"])
+        for hrefs in (["1763-1764.csv", "ghcnd.parquet"],
+                      ["by_year/1763.csv.gz", "mirror/1763.csv.gz"]):
+            with self.assertRaises(ValueError):
+                stac.check_item_ids(hrefs)
+            with self.assertRaises(ValueError):
+                stac.create_items(hrefs)
+
+    def test_create_item_with_scan(self):
+        item = stac.create_item("tests/data/1763-1764.csv", scan=True)
+
+        self.assertEqual(item.properties["start_datetime"],
+                         "1763-01-01T00:00:00Z")
+        self.assertEqual(item.properties["end_datetime"],
+                         "1764-12-31T23:59:59Z")
+        self.assertEqual(item.bbox, [9.1892, 45.4717, 9.1892, 45.4717])
+        self.assertEqual(item.geometry["type"], "Point")
+        self.assertEqual(item.properties["table:row_count"], 1462)
+        self.assertEqual(
+            item.assets["data"].extra_fields["ghcnd:element_counts"], {
+                "TMAX": 731,
+                "TMIN": 731
+            })
+        data_fields = item.assets["data"].extra_fields
+        self.assertEqual(data_fields["ghcnd:flag_counts"]["Q-FLAG"], {
+            "": 1445,
+            "I": 17
+        })
+        statistics = data_fields["ghcnd:element_statistics"]
+        self.assertEqual(statistics["TMIN"]["maximum"], 236)
+
+        item.validate()
+
+    def test_item_factory(self):
+        factory = stac.ItemFactory()
+        with TemporaryDirectory() as tmp_dir:
+            hrefs = copy_by_year(tmp_dir)
+            items = list(factory.create_items(hrefs))
+            expected = stac.create_item(hrefs[0], year=1763)
+        self.assertEqual(len(items), 2)
+        item = items[0]
+
+        self.assertEqual(item.to_dict(), expected.to_dict())
+        self.assertEqual(item.stac_extensions, expected.stac_extensions)
+        self.assertEqual(
+            [c["name"] for c in item.properties["table:columns"]][:2],
+            ["YEAR/MONTH/DAY", "ELEMENT"])
+
+        item.validate()
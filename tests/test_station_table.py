@@ -0,0 +1,50 @@
+import pickle
+import unittest
+from tempfile import TemporaryDirectory
+
+import pyarrow as pa
+
+from stactools.ghcnd.station_table import StationTable
+
+
+class StationTableTest(unittest.TestCase):
+    def setUp(self):
+        self.stations = StationTable.from_table(
+            pa.table({
+                "ID": ["USW00094728", "ITE00100554", "ASN00008255"],
+                "NAME": ["NEW YORK", "MILAN", "YALGOO"],
+            }))
+
+    def test_lookup(self):
+        self.assertEqual(len(self.stations), 3)
+        self.assertEqual(self.stations.table.column("ID").to_pylist(),
+                         ["ASN00008255", "ITE00100554", "USW00094728"])
+        rows = self.stations.lookup(
+            ["ITE00100554", "XXX00000000", "USW00094728", "ZZZ99999999"])
+        self.assertEqual(list(rows), [1, -1, 2, -1])
+
+    def test_take(self):
+        table = self.stations.take(["USW00094728", "XXX00000000"])
+
+        self.assertEqual(table.column_names, ["ID", "NAME"])
+        self.assertEqual(table.column("NAME").to_pylist(), ["NEW YORK", None])
+
+    def test_share(self):
+        with TemporaryDirectory() as tmp_dir:
+            shared = self.stations.share(tmp_dir)
+            payload = pickle.dumps(shared)
+            attached = pickle.loads(payload)
+
+            self.assertLess(len(payload), 200)
+            self.assertEqual(attached.path, shared.path)
+            self.assertEqual(list(attached.lookup(["ITE00100554"])), [1])
+            self.assertEqual(
+                attached.take(["ITE00100554"]).column("NAME").to_pylist(),
+                ["MILAN"])
+            del shared, attached
+
+    def test_empty(self):
+        stations = StationTable.from_table(
+            pa.table({"ID": pa.array([], pa.string())}))
+
+        self.assertEqual(list(stations.lookup(["ITE00100554"])), [-1])
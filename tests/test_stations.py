@@ -0,0 +1,142 @@
+import json
+import os
+import unittest
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+import pyarrow as pa
+import pystac
+
+from stactools.ghcnd import stations
+from stactools.ghcnd.cache import AssetCache
+
+STATIONS_HREF = "tests/data/ghcnd-stations.txt"
+INVENTORY_HREF = "tests/data/ghcnd-inventory.txt"
+
+
+class StationsTest(unittest.TestCase):
+    def test_read_stations(self):
+        result = list(stations.read_stations(STATIONS_HREF))
+
+        self.assertEqual(len(result), 7)
+        self.assertEqual(
+            result[6], {
+                "ID": "USW00094728",
+                "LATITUDE": 40.7789,
+                "LONGITUDE": -73.9692,
+                "ELEVATION": 39.6,
+                "STATE": "NY",
+                "NAME": "NEW YORK CNTRL PK TWR",
+                "GSN FLAG": None,
+                "HCN/CRN FLAT": "HCN",
+                "WMO ID": "72506",
+            })
+
+    def test_parse_stations(self):
+        with open(STATIONS_HREF, "rb") as file:
+            data = file.read()
+        # Trailing blanks and the final newline are optional
+        trimmed = b"\n".join(line.rstrip() for line in data.splitlines())
+
+        table = stations.parse_stations(trimmed)
+
+        self.assertEqual(table.num_rows, 7)
+        self.assertEqual(table.schema.field("LATITUDE").type, pa.float64())
+        self.assertEqual(table.column("STATE").to_pylist()[3:5],
+                         ["AL", "AL"])
+        self.assertEqual(table.column("WMO ID").to_pylist()[:2],
+                         [None, "41196"])
+        self.assertTrue(table.equals(stations.parse_stations(data)))
+
+    def test_read_inventory(self):
+        inventory = stations.read_inventory(INVENTORY_HREF)
+
+        self.assertEqual(inventory["ITE00100554"], {
+            "TMAX": [1763, 2021],
+            "TMIN": [1763, 2020]
+        })
+
+    def test_parsed_table_cache(self):
+        with TemporaryDirectory() as tmp_dir:
+            cache = AssetCache(tmp_dir)
+            first = list(stations.read_stations(STATIONS_HREF, cache))
+
+            with mock.patch("stactools.ghcnd.stations.fsspec") as fsspec:
+                second = list(stations.read_stations(STATIONS_HREF, cache))
+                fsspec.open.assert_not_called()
+            self.assertEqual(first, second)
+
+    def test_create_station_item(self):
+        station = next(stations.read_stations(STATIONS_HREF))
+        item_dict = stations.create_station_item(station)
+
+        self.assertEqual(item_dict["id"], "GHCNd-ACW00011604")
+        self.assertEqual(item_dict["geometry"], {
+            "type": "Point",
+            "coordinates": [-61.7833, 17.1167]
+        })
+        self.assertEqual(item_dict["properties"]["ghcnd:elevation"], 10.1)
+        self.assertEqual(item_dict["assets"]["data"]["href"],
+                         stations.station_data_href("ACW00011604"))
+        pystac.Item.from_dict(item_dict).validate()
+
+    def test_shard_stations(self):
+        ids = [s["ID"] for s in stations.read_stations(STATIONS_HREF)]
+
+        shards = stations.shard_stations(ids, max_size=2)
+
+        self.assertEqual(list(shards),
+                         ["AC", "AE", "IT", "US1", "USC", "USW"])
+        self.assertEqual(shards["USC"], ["USC00010008", "USC00010063"])
+        self.assertEqual(stations.shard_path("USC"), "US/USC")
+
+    def test_populate_stations(self):
+        with TemporaryDirectory() as tmp_dir:
+            count = stations.populate_stations(
+                stations.read_stations(STATIONS_HREF),
+                tmp_dir,
+                workers=2,
+                max_shard_size=2)
+
+            self.assertEqual(count, 7)
+            with open(os.path.join(tmp_dir, "US", "catalog.json")) as file:
+                us = json.load(file)
+            self.assertEqual(
+                [link["href"] for link in us["links"] if link["rel"] == "child"],
+                ["./US1/catalog.json", "./USC/catalog.json",
+                 "./USW/catalog.json"])
+
+            collection = pystac.read_file(
+                os.path.join(tmp_dir, "collection.json"))
+            items = list(collection.get_all_items())
+            self.assertEqual(len(items), 7)
+            self.assertEqual(collection.extent.spatial.bboxes[0],
+                             [-150.0167, 17.1167, 55.517, 61.1558])
+            item = collection.get_item("GHCNd-USC00010063", recursive=True)
+            self.assertEqual(item.get_parent().id, "ghcnd-USC")
+            self.assertEqual(item.get_root().id, "ghcnd")
+
+    def test_populate_stations_unsorted(self):
+        unsorted = sorted(stations.read_stations(STATIONS_HREF),
+                          key=lambda station: station["ID"][-1])
+        with TemporaryDirectory() as tmp_dir:
+            with self.assertRaises(ValueError):
+                stations.populate_stations(unsorted,
+                                           tmp_dir,
+                                           validate_mode="none")
+
+    def test_populate_stations_with_inventory(self):
+        with TemporaryDirectory() as tmp_dir:
+            stations.populate_stations(
+                stations.read_stations(STATIONS_HREF),
+                tmp_dir,
+                inventory=stations.read_inventory(INVENTORY_HREF))
+
+            item = pystac.read_file(
+                os.path.join(tmp_dir, "IT", "GHCNd-ITE00100554.json"))
+            self.assertEqual(item.properties["start_datetime"],
+                             "1763-01-01T00:00:00Z")
+            self.assertEqual(item.properties["end_datetime"],
+                             "2021-12-31T23:59:59Z")
+            self.assertEqual(item.properties["ghcnd:element_years"]["TMIN"],
+                             [1763, 2020])
@@ -0,0 +1,75 @@
+import unittest
+
+from stactools.ghcnd import stac
+from stactools.ghcnd.summary import CollectionSummary, reduce_summaries
+
+DATA_HREF = "tests/data/1763-1764.csv"
+
+
+def summary(start, end, bbox, elements, row_count):
+    return CollectionSummary.from_item_dict({
+        "bbox": bbox,
+        "properties": {
+            "start_datetime": f"{start}-01-01T00:00:00Z",
+            "end_datetime": f"{end}-12-31T23:59:59Z",
+            "table:row_count": row_count,
+        },
+        "assets": {
+            "data": {
+                "ghcnd:element_counts": dict.fromkeys(elements, 1)
+            }
+        },
+    })
+
+
+class SummaryTest(unittest.TestCase):
+    def setUp(self):
+        self.summaries = [
+            summary(1800, 1800, [0, 0, 1, 1], ["PRCP"], 10),
+            summary(1763, 1764, [-5, 2, 0, 3], ["TMAX", "TMIN"], 30),
+            summary(1900, 1901, [1, -1, 2, 0], ["PRCP", "SNOW"], 20),
+        ]
+
+    def test_merge(self):
+        result = reduce_summaries(self.summaries)
+
+        self.assertEqual(result.item_count, 3)
+        self.assertEqual(result.start_datetime.year, 1763)
+        self.assertEqual(result.end_datetime.year, 1901)
+        self.assertEqual(result.bbox, [-5, -1, 2, 3])
+        self.assertEqual(result.elements, {"PRCP", "SNOW", "TMAX", "TMIN"})
+        self.assertEqual(result.row_count, 60)
+        self.assertEqual(
+            (result.min_item_row_count, result.max_item_row_count), (10, 30))
+
+    def test_merge_is_associative_and_commutative(self):
+        a, b, c = self.summaries
+        expected = a.merge(b).merge(c)
+
+        self.assertEqual(a.merge(b.merge(c)), expected)
+        self.assertEqual(c.merge(a).merge(b), expected)
+        self.assertEqual(CollectionSummary().merge(expected), expected)
+        self.assertEqual(expected.merge(CollectionSummary()), expected)
+
+    def test_to_dict(self):
+        result = reduce_summaries(self.summaries)
+
+        self.assertEqual(CollectionSummary.from_dict(result.to_dict()),
+                         result)
+
+    def test_apply(self):
+        item = stac.create_item(DATA_HREF, scan=True)
+        collection = stac.create_collection()
+        CollectionSummary.from_item(item).apply(collection)
+
+        interval = collection.extent.temporal.intervals[0]
+        self.assertEqual((interval[0].year, interval[1].year), (1763, 1764))
+        self.assertEqual(collection.extent.spatial.bboxes[0], item.bbox)
+        summaries = collection.summaries.to_dict()
+        self.assertEqual(summaries["ghcnd:elements"], ["TMAX", "TMIN"])
+        self.assertEqual(summaries["table:row_count"], {
+            "minimum": 1462,
+            "maximum": 1462
+        })
+        self.assertEqual(collection.extra_fields["ghcnd:row_count"], 1462)
+        collection.validate()
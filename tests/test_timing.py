@@ -0,0 +1,59 @@
+import os
+import unittest
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from stactools.ghcnd import stac, timing, validation
+
+from .utils import copy_by_year
+
+
+class TimingTest(unittest.TestCase):
+    def test_profiler(self):
+        with timing.Profiler() as profiler:
+            with timing.span("outer", href="a"):
+                with timing.span("inner"):
+                    pass
+        with timing.span("ignored"):
+            pass
+
+        self.assertEqual([span.name for span in profiler.spans],
+                         ["inner", "outer"])
+        self.assertEqual(profiler.spans[1].args, {"href": "a"})
+        self.assertEqual(profiler.summary()["outer"]["count"], 1)
+
+        trace = profiler.to_chrome_trace()
+        self.assertEqual(len(trace["traceEvents"]), 2)
+        self.assertEqual(trace["traceEvents"][0]["ph"], "X")
+
+    def test_hook(self):
+        names = []
+
+        def hook(span):
+            names.append(span.name)
+
+        timing.add_timing_hook(hook)
+        try:
+            stac.create_item("tests/data/1763-1764.csv")
+        finally:
+            timing.remove_timing_hook(hook)
+
+        self.assertIn("asset_size", names)
+        self.assertFalse(timing.is_enabled())
+
+    def test_spans_from_workers(self):
+        with timing.Profiler() as profiler, TemporaryDirectory() as tmp_dir, \
+                mock.patch.object(validation, "validate_dict"):
+            stac.create_items(copy_by_year(tmp_dir),
+                              workers=2,
+                              validate_mode="full")
+
+        names = [span.name for span in profiler.spans]
+        self.assertEqual(names.count("create_item"), 2)
+        self.assertEqual(names.count("validate_item"), 2)
+        self.assertEqual(names.count("create_items"), 1)
+        worker_pids = {
+            span.pid
+            for span in profiler.spans if span.name == "create_item"
+        }
+        self.assertNotIn(os.getpid(), worker_pids)
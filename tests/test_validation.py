@@ -0,0 +1,103 @@
+import json
+import os
+import pickle
+import unittest
+from tempfile import TemporaryDirectory
+
+import pystac
+from pystac.validation import (
+    JsonSchemaSTACValidator,
+    RegisteredValidator,
+    set_validator,
+)
+
+from stactools.ghcnd import stac, validation
+
+
+class ValidationTest(unittest.TestCase):
+    def tearDown(self):
+        set_validator(JsonSchemaSTACValidator())
+
+    def test_select(self):
+        objects = list(range(10))
+
+        self.assertEqual(validation.select(objects, "full"), objects)
+        self.assertEqual(validation.select(objects, "none"), [])
+        sample = validation.select(objects, "sample", sample_size=3)
+        self.assertEqual(len(sample), 3)
+        self.assertEqual(sample,
+                         validation.select(objects, "sample", sample_size=3))
+        with self.assertRaises(ValueError):
+            validation.select(objects, "partial")
+
+    def test_schema_cache_offline(self):
+        with TemporaryDirectory() as tmp_dir:
+            schema_cache = validation.SchemaCache(tmp_dir, offline=True)
+            root = "https://example.com/schemas/root.json"
+            child = "https://example.com/schemas/child.json"
+            for uri, schema in [(root, {
+                    "$ref": "child.json#/definitions/a"
+            }), (child, {
+                    "definitions": {
+                        "a": {
+                            "type": "object"
+                        }
+                    }
+            })]:
+                with open(schema_cache.path(uri), "w") as file:
+                    json.dump({"uri": uri, "schema": schema}, file)
+
+            self.assertEqual(schema_cache.preload([root]), [child, root])
+            with self.assertRaises(pystac.STACError):
+                schema_cache.fetch("https://example.com/schemas/missing.json")
+
+    def test_use_schema_cache(self):
+        with TemporaryDirectory() as tmp_dir:
+            validation.use_schema_cache(tmp_dir)
+            validator = RegisteredValidator.get_validator()
+            validation.use_schema_cache(tmp_dir)
+            self.assertIs(RegisteredValidator.get_validator(), validator)
+
+            validation.use_schema_cache(tmp_dir, offline=True)
+            validator = RegisteredValidator.get_validator()
+            self.assertIsInstance(validator, validation.CachedSchemaValidator)
+            self.assertTrue(validator.schemas.offline)
+
+    def test_validate_dict_error_can_be_pickled(self):
+        item_dict = {
+            "type": "Feature",
+            "stac_version": pystac.get_stac_version(),
+            "id": "GHCNd",
+            "properties": {},
+            "links": [],
+            "assets": {},
+        }
+        with self.assertRaises(pystac.STACValidationError) as context:
+            validation.validate_dict(item_dict)
+
+        error = pickle.loads(pickle.dumps(context.exception))
+        self.assertIn("geometry", str(error))
+
+    def test_validate_items_with_schema_dir(self):
+        items = [stac.create_item("tests/data/1763-1764.csv")] * 3
+        with TemporaryDirectory() as tmp_dir:
+            count = validation.validate_items(items,
+                                              workers=2,
+                                              schema_dir=tmp_dir)
+            self.assertEqual(count, 3)
+            self.assertTrue(os.listdir(tmp_dir))
+
+            # Every schema is now stored locally
+            count = validation.validate_items(items,
+                                              mode="sample",
+                                              sample_size=1,
+                                              schema_dir=tmp_dir,
+                                              offline=True)
+            self.assertEqual(count, 1)
+
+    def test_invalid_item(self):
+        item = stac.create_item("tests/data/1763-1764.csv")
+        item.properties["proj:epsg"] = "4326"
+        with TemporaryDirectory() as tmp_dir:
+            with self.assertRaises(pystac.STACValidationError):
+                validation.validate_items([item], schema_dir=tmp_dir)
@@ -0,0 +1,14 @@
+import os
+import shutil
+
+DATA_HREF = "tests/data/1763-1764.csv"
+
+
+def copy_by_year(tmp_dir, years=(1763, 1764)):
+    """Copies of the test data named like by_year files, one per year"""
+    hrefs = []
+    for year in years:
+        href = os.path.join(tmp_dir, f"{year}.csv")
+        shutil.copy(DATA_HREF, href)
+        hrefs.append(href)
+    return hrefs